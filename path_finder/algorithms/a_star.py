@@ -1,31 +1,118 @@
 import time
+import math
 import heapq
 import numpy as np
-from collections import defaultdict
+import networkx as nx
+from collections import OrderedDict, defaultdict
+
+try:
+    from path_finder.utils.instrumentation import Instrumentation, guarded
+except ImportError:
+    from utils.instrumentation import Instrumentation, guarded
 
 class AStar:
-    def __init__(self, graph_builder):
-        """Initialize A* search algorithm for route optimization."""
+    def __init__(self, graph_builder, instrumentation=None):
+        """
+        Initialize A* search algorithm for route optimization.
+        
+        Args:
+            instrumentation: Optional Instrumentation (e.g. with memory tracing
+                or profiling enabled); a plain one is used otherwise
+        """
         self.graph_builder = graph_builder
+        self.instrumentation = instrumentation or Instrumentation()
         self.nodes = None
         self.graph = None
+        
+        # Flat per-node arrays for point-to-point search (built on demand)
+        self._indexed_graph = None
+        self._node_index = None
+        self._lat_rad = None
+        self._lng_rad = None
+        self._landmarks = None
+        self._landmark_table = None
+        self.last_search_stats = {}
+    
+    def _index_graph(self):
+        """Map graph nodes to array positions and cache their coordinates in radians."""
+        graph = self.graph if self.graph is not None else self.graph_builder.graph
+        if graph is None:
+            raise ValueError("Graph must be built before searching it")
+        
+        if self._indexed_graph is not graph:
+            nodes = list(graph.nodes())
+            self._node_index = {node: idx for idx, node in enumerate(nodes)}
+            self._lat_rad = np.radians([graph.nodes[node]['lat'] for node in nodes]).tolist()
+            self._lng_rad = np.radians([graph.nodes[node]['lng'] for node in nodes]).tolist()
+            self._landmarks = None
+            self._landmark_table = None
+            self._indexed_graph = graph
+        
+        return graph
     
     def _heuristic(self, node1, node2):
         """
         Calculate the heuristic between two nodes (straight-line distance).
         Uses the haversine distance as an admissible heuristic.
+        
+        Coordinates come from flat arrays built once per graph, and the formula
+        runs on Python floats, which is much cheaper than NumPy for scalars.
         """
-        lat1, lng1 = self.graph_builder.graph.nodes[node1]['lat'], self.graph_builder.graph.nodes[node1]['lng']
-        lat2, lng2 = self.graph_builder.graph.nodes[node2]['lat'], self.graph_builder.graph.nodes[node2]['lng']
+        self._index_graph()
+        i, j = self._node_index[node1], self._node_index[node2]
+        lat1, lng1, lat2, lng2 = self._lat_rad[i], self._lng_rad[i], self._lat_rad[j], self._lng_rad[j]
         
-        # Use haversine distance as heuristic
-        return self._haversine_distance(lat1, lng1, lat2, lng2) * 1000  # Convert km to meters
+        a = math.sin((lat2 - lat1) / 2.0)**2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2.0)**2
+        return 2 * math.asin(math.sqrt(a)) * 6371 * 1000  # Earth radius in meters
+    
+    def prepare_landmarks(self, num_landmarks=8, weight='weight'):
+        """
+        Precompute shortest-path distances from a set of landmarks (ALT preprocessing).
+        
+        Landmarks are chosen by farthest-point selection: each new landmark is
+        the node whose shortest-path distance to the landmarks chosen so far is
+        largest, which spreads them towards the edges of the network where they
+        give the tightest bounds. One Dijkstra run per landmark fills a flat
+        (nodes x landmarks) table.
+        
+        Args:
+            num_landmarks: Number of landmarks to select
+            weight: Edge attribute used as the path cost
+        
+        Returns:
+            List of the selected landmark nodes
+        """
+        graph = self._index_graph()
+        nodes = list(self._node_index)
+        num_landmarks = min(num_landmarks, len(nodes))
+        
+        table = np.full((len(nodes), num_landmarks), np.inf)
+        closest = np.full(len(nodes), np.inf)
+        landmarks = []
+        
+        # Start from the node farthest from an arbitrary first node
+        lengths = nx.single_source_dijkstra_path_length(graph, nodes[0], weight=weight)
+        candidate = max(lengths, key=lengths.get)
+        
+        for column in range(num_landmarks):
+            landmarks.append(candidate)
+            lengths = nx.single_source_dijkstra_path_length(graph, candidate, weight=weight)
+            for node, length in lengths.items():
+                table[self._node_index[node], column] = length
+            
+            np.minimum(closest, table[:, column], out=closest)
+            reachable = np.where(np.isfinite(closest), closest, -1.0)
+            candidate = nodes[int(np.argmax(reachable))]
+        
+        self._landmarks = landmarks
+        self._landmark_table = table
+        return landmarks
     
     def _haversine_distance(self, lat1, lon1, lat2, lon2):
         """Calculate the great circle distance between two points on earth."""
         # Convert decimal degrees to radians
         lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-
+        
         # Haversine formula
         dlon = lon2 - lon1
         dlat = lat2 - lat1
@@ -42,101 +129,530 @@ class AStar:
             total_path.append(current)
         return total_path[::-1]  # Reverse to get path from start to end
     
-    def find_optimal_path(self, start=0):
+    @guarded
+    def find_optimal_path(self, start=0, heuristic='nearest', time_windows=None):
         """
         Use A* search to find the optimal path to visit all nodes starting from start_node.
         This implementation solves a variation of the Traveling Salesman Problem.
         
+        At every step each unvisited node is scored as f = g + h, where g is the
+        edge from the current node and h is a lower-bound estimate for visiting
+        the nodes that would remain afterwards. Two estimates are available:
+        
+        - 'nearest': sum of every remaining node's cheapest edge to another
+          remaining node. Derived from sorted neighbour lists that are updated
+          incrementally as nodes are removed, so one step costs O(n) instead of
+          the O(n^3) of recomputing every minimum edge per candidate.
+        - 'mst': weight of the minimum spanning tree over the remaining nodes.
+          The tree is maintained across steps; removing a leaf is O(1) and an
+          inner node only requires reconnecting the components it leaves behind.
+        
+        With time windows, the clock is advanced along the path and only
+        candidates that can still be served within their window are scored;
+        when none can, the one that would be least late is taken. Checking
+        every candidate is one vectorized expression per step, so the
+        construction stays O(n) per step.
+        
         Args:
             start: The index of the starting node (default is the first node)
-            
+            heuristic: 'nearest' (default) or 'mst'
+            time_windows: Optional utils.time_windows.TimeWindows
+        
         Returns:
             Dictionary with the result: path, distance, duration, and computation time
         """
-        start_time = time.time()
+        if heuristic not in ('nearest', 'mst'):
+            raise ValueError("heuristic must be 'nearest' or 'mst'")
+        
+        start_time = time.perf_counter()
+        instrumentation = self.instrumentation
+        instrumentation.start()
         
         # Prepare graph data
-        self.graph = self.graph_builder.graph
-        self.nodes = list(self.graph.nodes())
-        unvisited = set(self.nodes)
-        unvisited.remove(start)
+        with instrumentation.phase('matrices'):
+            self.graph = self.graph_builder.graph
+            weights = self.graph_builder.get_weight_matrix()
+            durations = self.graph_builder.get_weight_matrix('duration')
+        n = len(weights)
+        self.nodes = list(range(n))
+        
+        unvisited = np.ones(n, dtype=bool)
+        unvisited[start] = False
+        
+        with instrumentation.phase('heuristic_setup'):
+            if heuristic == 'nearest':
+                lookahead = _NearestRemaining(weights, unvisited)
+            else:
+                lookahead = _RemainingMST(weights, np.flatnonzero(unvisited))
         
         # Initialize the current path with just the start node
         current_path = [start]
-        total_distance = 0
-        total_duration = 0
+        total_distance = 0.0
+        total_duration = 0.0
+        
+        # Service start at the current node and time warp so far (time windows only)
+        if time_windows is not None:
+            clock = time_windows.earliest[start]
+            time_warp = 0.0
         
         # Continue until all nodes are visited
-        while unvisited:
-            current = current_path[-1]
-            
-            # Find the next best node to visit
-            best_next_node = None
-            best_cost = float('inf')
-            
-            for next_node in unvisited:
-                # g(n) - the cost to reach this node
-                g_cost = self.graph[current][next_node]['weight']
+        with instrumentation.phase('construction'):
+            for _ in range(n - 1):
+                current = current_path[-1]
+                candidates = np.flatnonzero(unvisited)
                 
-                # h(n) - the heuristic estimate to the goal (remaining unvisited nodes)
-                h_cost = 0
-                if len(unvisited) > 1:
-                    # Estimate the cost to visit all remaining nodes
-                    # This is a simple minimum spanning tree heuristic
-                    remaining = unvisited.copy()
-                    remaining.remove(next_node)
-                    min_edges = []
-                    
-                    for node in remaining:
-                        min_edge = float('inf')
-                        for other in remaining:
-                            if node != other:
-                                edge_cost = self.graph[node][other]['weight']
-                                min_edge = min(min_edge, edge_cost)
-                        if min_edge != float('inf'):
-                            min_edges.append(min_edge)
-                    
-                    if min_edges:
-                        h_cost = sum(min_edges)
+                # Find the next best node to visit
+                if time_windows is not None:
+                    departure = clock + time_windows.service_times[current]
+                    arrival = departure + durations[current, candidates]
+                    lateness = np.maximum(arrival, time_windows.earliest[candidates]) - time_windows.latest[candidates]
+                    best_next_node = self._select_time_windowed(weights, current, candidates, lookahead,
+                                                                heuristic, lateness)
+                elif heuristic == 'nearest':
+                    best_next_node = self._select_nearest(weights, current, candidates, lookahead)
+                else:
+                    best_next_node = self._select_mst(weights, current, candidates, lookahead)
                 
-                # f(n) = g(n) + h(n)
-                f_cost = g_cost + h_cost
+                if time_windows is not None:
+                    begin = max(departure + durations[current, best_next_node], time_windows.earliest[best_next_node])
+                    warp = max(0.0, begin - time_windows.latest[best_next_node])
+                    clock = begin - warp
+                    time_warp += warp
                 
-                if f_cost < best_cost:
-                    best_cost = f_cost
-                    best_next_node = next_node
-            
-            # Add the best node to our path
-            current_path.append(best_next_node)
-            total_distance += self.graph[current][best_next_node]['weight']
-            total_duration += self.graph[current][best_next_node]['duration']
-            unvisited.remove(best_next_node)
+                # Add the best node to our path
+                current_path.append(best_next_node)
+                total_distance += weights[current, best_next_node]
+                total_duration += durations[current, best_next_node]
+                unvisited[best_next_node] = False
+                lookahead.remove(best_next_node)
+        
+        # Every step scores each remaining node once
+        instrumentation.count('heuristic_evaluations', n * (n - 1) // 2)
         
         # Calculate computation time
-        computation_time = time.time() - start_time
+        computation_time = time.perf_counter() - start_time
         
-        return {
+        result = {
             'algorithm': 'A* Search',
             'path': current_path,
-            'distance': total_distance,
-            'duration': total_duration,
-            'computation_time': computation_time
+            'distance': float(total_distance),
+            'duration': float(total_duration),
+            'computation_time': computation_time,
+            'instrumentation': instrumentation.stop('A* Search')
+        }
+        if time_windows is not None:
+            result['time_warp'] = float(time_warp)
+            result['feasible'] = time_warp == 0
+        return result
+    
+    def _select_time_windowed(self, weights, current, candidates, lookahead, heuristic, lateness):
+        """
+        Pick the candidate with the lowest f = g + h among those that can be
+        served in time (lateness <= 0), or the least late one if none can.
+        """
+        # The MST lookahead removes the chosen node using this step's layout,
+        # so it is prepared whichever way the node is picked
+        if heuristic == 'mst':
+            lookahead.prepare()
+        
+        on_time = lateness <= 0
+        if not on_time.any():
+            return int(candidates[np.argmin(lateness)])
+        
+        if heuristic == 'nearest':
+            f_costs = weights[current, candidates] + lookahead.estimates(candidates)
+        else:
+            f_costs = weights[current, candidates] + np.array([lookahead.weight_without(node) for node in candidates])
+        
+        return int(candidates[np.argmin(np.where(on_time, f_costs, np.inf))])
+    
+    def _select_nearest(self, weights, current, candidates, lookahead):
+        """
+        Pick the candidate with the lowest f = g + h under the 'nearest' estimate.
+        
+        The vectorized estimate can differ from a sequential sum in the last
+        bits, so candidates within a tiny tolerance of the best are re-scored
+        with the exact sequential sum. Ties are broken by the lowest node index,
+        which keeps tours identical to a straightforward evaluation.
+        """
+        f_costs = weights[current, candidates] + lookahead.estimates(candidates)
+        best = f_costs.min()
+        tied = candidates[f_costs <= best + 1e-9 * (abs(best) + 1.0)]
+        
+        if len(tied) == 1:
+            return int(tied[0])
+        
+        best_next_node = None
+        best_cost = float('inf')
+        for next_node in tied:
+            f_cost = weights[current, next_node] + lookahead.exact_estimate(next_node, candidates)
+            if f_cost < best_cost:
+                best_cost = f_cost
+                best_next_node = int(next_node)
+        
+        return best_next_node
+    
+    def _select_mst(self, weights, current, candidates, lookahead):
+        """Pick the candidate with the lowest f = g + h under the 'mst' estimate."""
+        lookahead.prepare()
+        
+        best_next_node = None
+        best_cost = float('inf')
+        for next_node in candidates:
+            f_cost = weights[current, next_node] + lookahead.weight_without(next_node)
+            if f_cost < best_cost:
+                best_cost = f_cost
+                best_next_node = int(next_node)
+        
+        return best_next_node
+    
+    @guarded
+    def find_beam_path(self, start=0, beam_width=10):
+        """
+        Build a route with beam search: keep the beam_width best partial routes per step.
+        
+        Partial routes are stored as arrays (one row per route) together with a
+        packed visited bitset and their accumulated cost g. Each child is scored
+        with f = g + edge + h, where h is the same nearest-remaining estimate as
+        find_optimal_path. Both are carried incrementally: every route keeps its
+        own _NearestRemaining, copied from its parent and updated for the one
+        node it added, so scoring all children of a route costs O(n) instead of
+        rebuilding the estimate over the remaining sub-matrix. Children that
+        reach the same (last node, visited set) are merged, keeping the cheaper one.
+        
+        A width of 1 follows the greedy lookahead; wider beams cost roughly
+        beam_width times as much per step and usually find shorter routes.
+        Results are deterministic.
+        
+        Args:
+            start: The index of the starting node (default is the first node)
+            beam_width: Number of partial routes kept after every step
+        
+        Returns:
+            Dictionary with the result: path, distance, duration, and computation time
+        """
+        if beam_width < 1:
+            raise ValueError("beam_width must be at least 1")
+        
+        start_time = time.perf_counter()
+        instrumentation = self.instrumentation
+        instrumentation.start()
+        
+        with instrumentation.phase('matrices'):
+            weights = self.graph_builder.get_weight_matrix()
+            durations = self.graph_builder.get_weight_matrix('duration')
+        n = len(weights)
+        generated = 0
+        
+        visited = np.zeros((1, n), dtype=bool)
+        visited[0, start] = True
+        routes = np.full((1, 1), start, dtype=np.int32)
+        bitsets = np.packbits(visited, axis=1)
+        g_costs = np.zeros(1)
+        with instrumentation.phase('heuristic_setup'):
+            lookaheads = [_NearestRemaining(weights, ~visited[0])]
+        
+        for _ in range(n - 1):
+            # Score every child; a route contributes at most beam_width of them
+            with instrumentation.phase('expansion'):
+                parents, nodes, f_parts, g_parts = [], [], [], []
+                for row, lookahead in enumerate(lookaheads):
+                    candidates = np.flatnonzero(lookahead.alive)
+                    g_next = g_costs[row] + weights[routes[row, -1], candidates]
+                    f_next = g_next + lookahead.estimates(candidates)
+                    best = np.argsort(f_next, kind='stable')[:beam_width]
+                    parents.append(np.full(len(best), row))
+                    nodes.append(candidates[best])
+                    f_parts.append(f_next[best])
+                    g_parts.append(g_next[best])
+                parents, nodes = np.concatenate(parents), np.concatenate(nodes)
+                f_costs, child_g = np.concatenate(f_parts), np.concatenate(g_parts)
+                generated += len(nodes)
+            
+            selection_start = time.perf_counter()
+            # Deterministic order: f, then parent row, then node index
+            order = np.lexsort((nodes, parents, f_costs))
+            keep = []
+            seen = set()
+            for idx in order:
+                key = (int(nodes[idx]), bitsets[parents[idx]].tobytes())
+                if key in seen:
+                    continue
+                seen.add(key)
+                keep.append(idx)
+                if len(keep) == beam_width:
+                    break
+            keep = np.array(keep)
+            
+            visited = np.unpackbits(bitsets[parents[keep]], axis=1, count=n).astype(bool)
+            visited[np.arange(len(keep)), nodes[keep]] = True
+            bitsets = np.packbits(visited, axis=1)
+            routes = np.column_stack([routes[parents[keep]], nodes[keep]])
+            g_costs = child_g[keep]
+            instrumentation.add_time('selection', time.perf_counter() - selection_start)
+            
+            with instrumentation.phase('heuristic_update'):
+                children = []
+                for idx in keep:
+                    lookahead = lookaheads[parents[idx]].copy()
+                    lookahead.remove(int(nodes[idx]))
+                    children.append(lookahead)
+                lookaheads = children
+        
+        best_path = [int(node) for node in routes[int(np.argmin(g_costs))]]
+        total_distance = sum(weights[a, b] for a, b in zip(best_path, best_path[1:]))
+        total_duration = sum(durations[a, b] for a, b in zip(best_path, best_path[1:]))
+        
+        computation_time = time.perf_counter() - start_time
+        instrumentation.count('states_generated', generated)
+        
+        return {
+            'algorithm': 'A* Search (Beam)',
+            'path': best_path,
+            'distance': float(total_distance),
+            'duration': float(total_duration),
+            'computation_time': computation_time,
+            'beam_width': beam_width,
+            'instrumentation': instrumentation.stop('A* Search (Beam)')
         }
     
-    def a_star_search(self, start, goal):
+    @guarded
+    def find_exact_path(self, start=0, max_states=2000000):
+        """
+        Find a provably shortest path visiting all nodes with A* over subset states.
+        
+        A state is (current node, set of visited nodes), packed into one integer
+        key (visited bitmask shifted left by the node bits, OR current node).
+        The heuristic is the cheapest edge from the current node into the
+        unvisited set plus the minimum spanning tree of the unvisited set,
+        which is admissible and consistent, so the first goal state popped is
+        optimal and closed states never need reopening. Spanning tree weights
+        are cached per unvisited mask, for at most max_states masks (least
+        recently used first out).
+        
+        The tour from find_optimal_path serves as an upper bound for pruning.
+        Once more than max_states states have been stored, the search switches
+        to IDA* (depth-first with an increasing f threshold), which only needs
+        memory proportional to the path length. The A* states are dropped
+        before it starts; its threshold starts at the lowest f left on the A*
+        open list, so work done so far still counts.
+        
+        Args:
+            start: The index of the starting node (default is the first node)
+            max_states: Number of stored states after which to fall back to IDA*
+        
+        Returns:
+            Dictionary with the result: path, distance, duration, computation time,
+            the search that finished ('A*' or 'IDA*') and the number of expanded states
+        """
+        start_time = time.perf_counter()
+        instrumentation = self.instrumentation
+        instrumentation.start()
+        
+        with instrumentation.phase('matrices'):
+            weights = self.graph_builder.get_weight_matrix()
+            durations = self.graph_builder.get_weight_matrix('duration')
+        n = len(weights)
+        shift = max(1, (n - 1).bit_length())
+        node_mask = (1 << shift) - 1
+        full = (1 << n) - 1
+        mst_cache = OrderedDict()
+        
+        def heuristic(node, visited):
+            unvisited = full & ~visited
+            if not unvisited:
+                return 0.0
+            mst = mst_cache.get(unvisited)
+            if mst is None:
+                mst = mst_cache[unvisited] = _mst_weight(weights, _bits(unvisited))
+                if len(mst_cache) > max_states:
+                    mst_cache.popitem(last=False)
+            else:
+                mst_cache.move_to_end(unvisited)
+            return weights[node, _bits(unvisited)].min() + mst
+        
+        # Greedy tour as incumbent upper bound (its phases are reported too)
+        with instrumentation.phase('upper_bound'):
+            greedy = self.find_optimal_path(start)
+        best_path = greedy['path']
+        upper_bound = greedy['distance'] + 1e-9
+        
+        start_key = (1 << start) << shift | start
+        g_score = {start_key: 0.0}
+        came_from = {}
+        closed = set()
+        open_queue = [(heuristic(start, 1 << start), 0.0, start_key)]
+        expanded = 0
+        states_stored = None
+        search = 'A*'
+        search_start = time.perf_counter()
+        
+        while open_queue:
+            f_cost, neg_g, key = heapq.heappop(open_queue)
+            if key in closed:
+                continue
+            
+            visited, current = key >> shift, key & node_mask
+            if visited == full:
+                best_path = self._reconstruct_path(came_from, key)
+                best_path = [k & node_mask for k in best_path]
+                break
+            
+            if len(g_score) > max_states:
+                # Memory cap reached: drop the A* states and finish with IDA*
+                # from the current lower bound
+                search = 'IDA*'
+                states_stored = len(g_score)
+                g_score.clear()
+                came_from.clear()
+                closed.clear()
+                open_queue.clear()
+                best_path, ida_expanded = self._ida_star(
+                    weights, start, heuristic, f_cost, upper_bound, best_path)
+                expanded += ida_expanded
+                break
+            
+            closed.add(key)
+            expanded += 1
+            g_current = -neg_g
+            
+            for next_node in _bits(full & ~visited):
+                next_visited = visited | (1 << next_node)
+                next_key = next_visited << shift | next_node
+                if next_key in closed:
+                    continue
+                
+                tentative_g = g_current + weights[current, next_node]
+                if tentative_g >= g_score.get(next_key, float('inf')):
+                    continue
+                
+                f_next = tentative_g + heuristic(next_node, next_visited)
+                if f_next > upper_bound:
+                    continue
+                
+                g_score[next_key] = tentative_g
+                came_from[next_key] = key
+                heapq.heappush(open_queue, (f_next, -tentative_g, next_key))
+        
+        instrumentation.add_time('search', time.perf_counter() - search_start)
+        instrumentation.count('states_expanded', expanded)
+        instrumentation.gauge('states_stored', len(g_score) if states_stored is None else states_stored)
+        instrumentation.gauge('mst_cache_size', len(mst_cache))
+        
+        total_distance = sum(weights[a, b] for a, b in zip(best_path, best_path[1:]))
+        total_duration = sum(durations[a, b] for a, b in zip(best_path, best_path[1:]))
+        
+        return {
+            'algorithm': 'A* Search (Exact)',
+            'path': [int(node) for node in best_path],
+            'distance': float(total_distance),
+            'duration': float(total_duration),
+            'computation_time': time.perf_counter() - start_time,
+            'optimal': True,
+            'search': search,
+            'states_expanded': expanded,
+            'instrumentation': instrumentation.stop('A* Search (Exact)')
+        }
+    
+    def _ida_star(self, weights, start, heuristic, threshold, upper_bound, incumbent):
+        """
+        Iterative deepening A* over the same subset states as find_exact_path.
+        
+        Each iteration is a depth-first branch and bound limited to f <= bound
+        that keeps the cheapest complete path it meets. With real-valued costs
+        almost every f value is distinct, so the bound grows by at least 1% per
+        iteration instead of to the next f value; optimality is unaffected
+        because an iteration only stops early once a complete path is found,
+        and it then returns the cheapest path within the bound.
+        
+        Returns the optimal path and the number of expanded states. If no path
+        is cheaper than upper_bound, the incumbent path is returned.
+        """
+        n = len(weights)
+        full = (1 << n) - 1
+        path = [start]
+        best = {'cost': upper_bound, 'path': incumbent}
+        expanded = 0
+        
+        def search(node, visited, g_cost, bound):
+            nonlocal expanded
+            f_cost = g_cost + heuristic(node, visited)
+            if f_cost > bound or f_cost >= best['cost']:
+                return f_cost
+            if visited == full:
+                best['cost'] = g_cost
+                best['path'] = list(path)
+                return f_cost
+            
+            expanded += 1
+            children = []
+            for next_node in _bits(full & ~visited):
+                next_visited = visited | (1 << next_node)
+                g_next = g_cost + weights[node, next_node]
+                children.append((g_next + heuristic(next_node, next_visited), next_node, g_next, next_visited))
+            children.sort()
+            
+            minimum = float('inf')
+            for _, next_node, g_next, next_visited in children:
+                path.append(next_node)
+                minimum = min(minimum, search(next_node, next_visited, g_next, bound))
+                path.pop()
+            return minimum
+        
+        bound = threshold
+        while True:
+            exceeded = search(start, 1 << start, 0.0, bound)
+            if best['path'] is not incumbent or bound >= upper_bound or exceeded == float('inf'):
+                return best['path'], expanded
+            bound = min(max(exceeded, bound * 1.01), upper_bound)
+    
+    def a_star_search(self, start, goal, heuristic='haversine'):
         """
         Standard A* search between two points.
         
         This is a helper function for solving the point-to-point pathfinding problem,
         as opposed to the full TSP-like problem solved by find_optimal_path.
         
+        Two heuristics are available:
+        
+        - 'haversine': straight-line distance between the coordinates. Only a
+          lower bound when edge weights are road distances in meters.
+        - 'alt': landmark bounds from prepare_landmarks(). By the triangle
+          inequality |d(L, goal) - d(L, node)| <= d(node, goal) for every
+          landmark L, so the maximum over landmarks is admissible for any
+          non-negative weights and usually much tighter than haversine.
+        
+        The number of expanded nodes of the last call is kept in
+        last_search_stats.
+        
         Args:
             start: The starting node
             goal: The goal node
-            
+            heuristic: 'haversine' (default) or 'alt'
+        
         Returns:
             Path from start to goal, or None if no path exists
         """
+        graph = self._index_graph()
+        
+        if heuristic == 'alt':
+            if self._landmark_table is None:
+                raise ValueError("Call prepare_landmarks() before using the 'alt' heuristic")
+            table = self._landmark_table
+            node_index = self._node_index
+            goal_row = table[node_index[goal]]
+            
+            def estimate(node):
+                bound = np.abs(table[node_index[node]] - goal_row).max()
+                return bound if np.isfinite(bound) else 0.0
+        elif heuristic == 'haversine':
+            def estimate(node):
+                return self._heuristic(node, goal)
+        else:
+            raise ValueError("heuristic must be 'haversine' or 'alt'")
+        
+        expanded = 0
+        
         # The set of nodes already evaluated
         closed_set = set()
         
@@ -153,29 +669,33 @@ class AStar:
         # For each node, the total cost of getting from the start node to the goal
         # by passing by that node. f_score(n) = g_score(n) + heuristic(n)
         f_score = defaultdict(lambda: float('inf'))
-        f_score[start] = self._heuristic(start, goal)
+        f_score[start] = estimate(start)
         
         # Use a priority queue for efficient retrieval of lowest f_score node
         open_queue = [(f_score[start], start)]
         
-        while open_set:
+        while open_queue:
             # Get the node in open_set having the lowest f_score value
             current = heapq.heappop(open_queue)[1]
+            if current in closed_set:
+                continue  # Stale queue entry for a node that was reached more cheaply
             
             if current == goal:
+                self.last_search_stats = {'heuristic': heuristic, 'expanded': expanded}
                 return self._reconstruct_path(came_from, current)
             
             open_set.remove(current)
             closed_set.add(current)
+            expanded += 1
             
             # For all neighbors of the current node
-            for neighbor in self.graph.neighbors(current):
+            for neighbor in graph.neighbors(current):
                 if neighbor in closed_set:
                     continue  # Ignore already evaluated neighbors
                 
                 # d(current, neighbor) is the weight of the edge from current to neighbor
                 # tentative_g_score is the distance from start to the neighbor through current
-                tentative_g_score = g_score[current] + self.graph[current][neighbor]['weight']
+                tentative_g_score = g_score[current] + graph[current][neighbor]['weight']
                 
                 if neighbor not in open_set:
                     open_set.add(neighbor)
@@ -185,7 +705,277 @@ class AStar:
                 # This path is the best until now. Record it!
                 came_from[neighbor] = current
                 g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = g_score[neighbor] + self._heuristic(neighbor, goal)
+                f_score[neighbor] = g_score[neighbor] + estimate(neighbor)
                 heapq.heappush(open_queue, (f_score[neighbor], neighbor))
         
-        return None  # No path was found 
\ No newline at end of file
+        self.last_search_stats = {'heuristic': heuristic, 'expanded': expanded}
+        return None  # No path was found
+
+def _bits(mask):
+    """Indices of the set bits of an integer bitmask, in ascending order."""
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
+def _mst_weight(weights, nodes):
+    """Weight of the minimum spanning tree over nodes (Prim's algorithm)."""
+    if len(nodes) <= 1:
+        return 0.0
+    
+    sub = weights[np.ix_(nodes, nodes)]
+    in_tree = np.zeros(len(nodes), dtype=bool)
+    in_tree[0] = True
+    best = sub[0].copy()
+    total = 0.0
+    
+    for _ in range(len(nodes) - 1):
+        candidate_costs = np.where(in_tree, np.inf, best)
+        nxt = int(np.argmin(candidate_costs))
+        total += candidate_costs[nxt]
+        in_tree[nxt] = True
+        np.minimum(best, sub[nxt], out=best)
+    
+    return total
+
+
+class _NearestRemaining:
+    """
+    Cheapest and second-cheapest edge from every unvisited node to another unvisited node.
+    
+    Each node's neighbours are sorted once. Two pointers per node only ever move
+    forward as nodes are removed, so maintaining the structure for a whole tour
+    costs O(n^2) in total.
+    """
+    
+    def __init__(self, weights, alive):
+        self.weights = weights
+        self.alive = alive.copy()
+        n = len(weights)
+        
+        masked = weights.copy()
+        np.fill_diagonal(masked, np.inf)
+        self.order = np.argsort(masked, axis=1, kind='stable')
+        
+        self.first_pos = np.zeros(n, dtype=np.intp)
+        self.second_pos = np.zeros(n, dtype=np.intp)
+        self.nearest = np.full(n, -1, dtype=np.intp)
+        self.nearest_cost = np.full(n, np.inf)
+        self.second_cost = np.full(n, np.inf)
+        self.second_node = np.full(n, -1, dtype=np.intp)
+        
+        for node in np.flatnonzero(self.alive):
+            self.first_pos[node] = self._advance(node, 0)
+            self.second_pos[node] = self._advance(node, self.first_pos[node] + 1)
+            self._refresh(node)
+    
+    def copy(self):
+        """Independent copy of the state; the sorted neighbour order is shared."""
+        other = object.__new__(_NearestRemaining)
+        other.weights = self.weights
+        other.order = self.order
+        for name in ('alive', 'first_pos', 'second_pos', 'nearest', 'nearest_cost', 'second_cost', 'second_node'):
+            setattr(other, name, getattr(self, name).copy())
+        return other
+    
+    def _advance(self, node, pos):
+        """Move a pointer forward to the next unvisited neighbour of node."""
+        row = self.order[node]
+        while pos < len(row) and (row[pos] == node or not self.alive[row[pos]]):
+            pos += 1
+        return pos
+    
+    def _refresh(self, node):
+        """Recompute the cached neighbour ids and costs from the pointers."""
+        row = self.order[node]
+        for pos, ids, costs in ((self.first_pos[node], self.nearest, self.nearest_cost),
+                                (self.second_pos[node], self.second_node, self.second_cost)):
+            if pos < len(row):
+                ids[node] = row[pos]
+                costs[node] = self.weights[node, row[pos]]
+            else:
+                ids[node] = -1
+                costs[node] = np.inf
+    
+    def remove(self, node):
+        """Mark a node as visited and repair the pointers that referenced it."""
+        self.alive[node] = False
+        affected = np.flatnonzero(self.alive & ((self.nearest == node) | (self.second_node == node)))
+        
+        for other in affected:
+            if self.nearest[other] == node:
+                self.first_pos[other] = self.second_pos[other]
+            self.second_pos[other] = self._advance(other, self.second_pos[other] + 1)
+            self._refresh(other)
+    
+    def estimates(self, candidates):
+        """
+        Estimate for every candidate c: the sum over the other candidates of
+        their cheapest edge once c has been removed as well.
+        
+        A node only loses its cheapest edge if it pointed at c, in which case
+        it falls back to its second-cheapest one.
+        """
+        if len(candidates) <= 2:
+            return np.zeros(len(candidates))
+        
+        nearest_cost = self.nearest_cost[candidates]
+        fallback = np.bincount(
+            self.nearest[candidates],
+            weights=self.second_cost[candidates] - nearest_cost,
+            minlength=len(self.weights)
+        )
+        return nearest_cost.sum() - nearest_cost + fallback[candidates]
+    
+    def exact_estimate(self, removed, candidates):
+        """Same estimate for one candidate, summed sequentially in node order."""
+        if len(candidates) <= 2:
+            return 0
+        
+        costs = np.where(self.nearest[candidates] == removed,
+                         self.second_cost[candidates],
+                         self.nearest_cost[candidates])
+        return sum(costs[candidates != removed].tolist())
+
+
+class _RemainingMST:
+    """
+    Minimum spanning tree over the unvisited nodes, kept up to date as nodes are removed.
+    
+    Removing a leaf simply drops its edge. Removing an inner node splits the tree
+    into one component per incident edge; the cheapest way to reconnect them is a
+    spanning tree over the components, which only needs the rows of the smaller
+    components because the matrix is symmetric.
+    """
+    
+    def __init__(self, weights, nodes):
+        self.weights = weights
+        self.adjacency = {int(node): {} for node in nodes}
+        self.total = 0.0
+        
+        # Prim's algorithm on the dense sub-matrix
+        if len(nodes) > 1:
+            sub = weights[np.ix_(nodes, nodes)]
+            in_tree = np.zeros(len(nodes), dtype=bool)
+            in_tree[0] = True
+            best = sub[0].copy()
+            parent = np.zeros(len(nodes), dtype=np.intp)
+            
+            for _ in range(len(nodes) - 1):
+                candidate_costs = np.where(in_tree, np.inf, best)
+                nxt = int(np.argmin(candidate_costs))
+                self._add_edge(int(nodes[parent[nxt]]), int(nodes[nxt]), sub[parent[nxt], nxt])
+                in_tree[nxt] = True
+                closer = sub[nxt] < best
+                best[closer] = sub[nxt][closer]
+                parent[closer] = nxt
+    
+    def _add_edge(self, u, v, weight):
+        self.adjacency[u][v] = weight
+        self.adjacency[v][u] = weight
+        self.total += weight
+    
+    def prepare(self):
+        """Root the current tree and cache its preorder layout for this step."""
+        nodes = sorted(self.adjacency)
+        root = nodes[0]
+        
+        self.preorder = []
+        self.children = {}
+        stack = [(root, None)]
+        while stack:
+            node, parent = stack.pop()
+            self.preorder.append(node)
+            self.children[node] = [child for child in self.adjacency[node] if child != parent]
+            stack.extend((child, node) for child in reversed(self.children[node]))
+        
+        self.position = {node: idx for idx, node in enumerate(self.preorder)}
+        self.subtree_size = {}
+        for node in reversed(self.preorder):
+            self.subtree_size[node] = 1 + sum(self.subtree_size[child] for child in self.children[node])
+        
+        order = np.array(self.preorder, dtype=np.intp)
+        self.ordered_weights = self.weights[np.ix_(order, order)]
+    
+    def weight_without(self, node):
+        """Weight of the minimum spanning tree over the unvisited nodes except node."""
+        incident = self.adjacency[node]
+        base = self.total - sum(incident.values())
+        if len(incident) <= 1:
+            return base
+        return base + self._reconnect(node)[0]
+    
+    def remove(self, node):
+        """Remove a visited node and reconnect the tree it leaves behind."""
+        incident = self.adjacency.pop(node)
+        self.total -= sum(incident.values())
+        for other in incident:
+            del self.adjacency[other][node]
+        
+        if len(incident) > 1:
+            _, edges = self._reconnect(node, with_edges=True)
+            for u, v, weight in edges:
+                self._add_edge(u, v, weight)
+    
+    def _reconnect(self, node, with_edges=False):
+        """Cheapest set of edges joining the components left after removing node."""
+        k = len(self.preorder)
+        pos = self.position[node]
+        end = pos + self.subtree_size[node]
+        
+        # Each child subtree is a contiguous preorder range; the rest of the tree wraps around it
+        components = [np.arange(self.position[child], self.position[child] + self.subtree_size[child])
+                      for child in self.children[node]]
+        segment_starts = [int(comp[0]) for comp in components]
+        segment_owner = list(range(len(components)))
+        
+        rest = np.concatenate([np.arange(0, pos), np.arange(end, k)])
+        if len(rest):
+            rest_id = len(components)
+            components.append(rest)
+            if pos > 0:
+                segment_starts.insert(0, 0)
+                segment_owner.insert(0, rest_id)
+            if end < k:
+                segment_starts.append(end)
+                segment_owner.append(rest_id)
+        
+        # Column segments for reduceat: [rest head], the removed node itself, children, [rest tail]
+        insert_at = 1 if pos > 0 else 0
+        segment_starts.insert(insert_at, pos)
+        segment_owner.insert(insert_at, -1)
+        segment_owner = np.array(segment_owner)
+        
+        m = len(components)
+        between = np.full((m, m), np.inf)
+        largest = max(range(m), key=lambda idx: len(components[idx]))
+        for idx, rows in enumerate(components):
+            if idx == largest:
+                continue
+            segment_min = np.minimum.reduceat(self.ordered_weights[rows], segment_starts, axis=1).min(axis=0)
+            for owner, value in zip(segment_owner, segment_min):
+                if owner >= 0 and owner != idx and value < between[idx, owner]:
+                    between[idx, owner] = between[owner, idx] = value
+        
+        # Prim's algorithm over the (few) components
+        in_tree = [0]
+        pairs = []
+        weight = 0.0
+        while len(in_tree) < m:
+            i, j = min(((i, j) for i in in_tree for j in range(m) if j not in in_tree),
+                       key=lambda pair: between[pair])
+            weight += between[i, j]
+            pairs.append((i, j))
+            in_tree.append(j)
+        
+        edges = []
+        if with_edges:
+            for i, j in pairs:
+                block = self.ordered_weights[np.ix_(components[i], components[j])]
+                a, b = np.unravel_index(np.argmin(block), block.shape)
+                edges.append((self.preorder[components[i][a]], self.preorder[components[j][b]], block[a, b]))
+        
+        return weight, edges
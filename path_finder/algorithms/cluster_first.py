@@ -0,0 +1,429 @@
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.utils.instrumentation import Instrumentation, guarded
+    from path_finder.algorithms.a_star import AStar
+except ImportError:
+    from utils.graph import GraphBuilder
+    from utils.instrumentation import Instrumentation, guarded
+    from algorithms.a_star import AStar
+
+
+def _astar_route(graph_builder):
+    """Default route solver: greedy A* construction from the depot."""
+    return AStar(graph_builder).find_optimal_path(), {}
+
+
+def _solve_cluster(cluster, solver, params, locations_df, distance_matrix, duration_matrix, seed):
+    """Process entry point: route one cluster (local node 0 is the depot)."""
+    random.seed(seed)
+    np.random.seed(seed)
+    result, _ = solver(GraphBuilder(locations_df, distance_matrix, duration_matrix), **params)
+    return cluster, [int(node) for node in result['path']]
+
+
+class ClusterFirstPlanner:
+    def __init__(self, graph_builder, num_vehicles, capacity=None, demands=None, depot=0,
+                 route_solver=None, clustering='kmeans', max_workers=None, max_iterations=50,
+                 repair_rounds=10, neighbour_routes=3, seed=0, instrumentation=None):
+        """
+        Plan routes for a fleet: cluster first, route second, then repair.
+        
+        Stops are partitioned into one cluster per vehicle with a
+        capacity-aware k-means (on the stop coordinates) or k-medoids (on the
+        weight matrix). Each cluster plus the depot is then routed as its own
+        small instance by one of the single-route solvers, in a process pool.
+        Finally, stops near cluster boundaries are moved or swapped between
+        neighbouring routes while that shortens the total distance. Only the
+        cluster sub-matrices are ever copied, so a day of 10,000 stops costs
+        about as much as 50 instances of 200.
+        
+        Routes are open paths starting at the depot, like the single-route
+        solvers' paths.
+        
+        Args:
+            graph_builder: GraphBuilder with the locations and both matrices
+            num_vehicles: Number of routes to plan
+            capacity: Load limit per vehicle (default: the average load plus
+                10%, which also balances the number of stops per route)
+            demands: Load of every stop (default: 1 per stop; the depot's is ignored)
+            depot: Index of the depot, where every route starts
+            route_solver: (solver function, params) as in utils.runner, e.g.
+                (solve_genetic, {'generations': 50}); default: greedy A*
+            clustering: 'kmeans' or 'kmedoids'
+            max_workers: Processes routing clusters in parallel (default:
+                os.cpu_count()); 1 routes them in this process
+            max_iterations: Limit on clustering iterations
+            repair_rounds: Limit on passes of inter-route moves over all stops
+            neighbour_routes: Routes (nearest cluster centres) a stop may move to
+            seed: Seed for the clustering initialization and the route solvers
+            instrumentation: Optional Instrumentation to time the phases
+        """
+        if graph_builder is None:
+            raise ValueError("graph_builder must be provided!")
+        if clustering not in ('kmeans', 'kmedoids'):
+            raise ValueError("clustering must be 'kmeans' or 'kmedoids'")
+        
+        self.graph_builder = graph_builder
+        self.num_vehicles = num_vehicles
+        self.capacity = capacity
+        self.demands = demands
+        self.depot = depot
+        self.route_solver = route_solver or (_astar_route, {})
+        self.clustering = clustering
+        self.max_workers = max_workers
+        self.max_iterations = max_iterations
+        self.repair_rounds = repair_rounds
+        self.neighbour_routes = neighbour_routes
+        self.seed = seed
+        self.instrumentation = instrumentation or Instrumentation()
+        
+        # The source matrices are used in place: weight(i, j) reads the upper
+        # triangle, like GraphBuilder.get_weight_matrix(), without building
+        # the symmetric (n, n) copy
+        self._distances = np.asarray(graph_builder.distance_matrix, dtype=np.float64)
+        self._durations = np.asarray(graph_builder.duration_matrix, dtype=np.float64)
+        self._weights = self._durations if graph_builder.weight_type == 'duration' else self._distances
+    
+    def _weight(self, a, b, matrix=None):
+        """Weights between node arrays a and b (elementwise, broadcasting)."""
+        matrix = self._weights if matrix is None else matrix
+        a, b = np.asarray(a), np.asarray(b)
+        return matrix[np.minimum(a, b), np.maximum(a, b)]
+    
+    def _route_cost(self, route, matrix=None):
+        return float(self._weight(route[:-1], route[1:], matrix).sum()) if len(route) > 1 else 0.0
+    
+    @guarded
+    def optimize(self):
+        """
+        Plan one route per vehicle.
+        
+        Returns:
+            Dictionary with the usual algorithm, path, distance, duration and
+            computation time, where path is the routes one after another (each
+            starting at the depot; the joins between routes are not driven, so
+            per-leg consumers should use routes) and distance/duration are the fleet totals,
+            plus routes, route_distances, route_durations, route_loads,
+            vehicles_used and makespan (duration of the longest route), the
+            capacity used and capacity_overload: the load of every route above
+            it, nonzero only when uneven demands could not be packed
+        """
+        start_time = time.perf_counter()
+        instrumentation = self.instrumentation
+        instrumentation.start()
+        
+        n = len(self._weights)
+        k = self.num_vehicles
+        stops = np.array([node for node in range(n) if node != self.depot], dtype=np.intp)
+        if k < 1:
+            raise ValueError("num_vehicles must be at least 1")
+        if len(stops) < k:
+            raise ValueError(f"{k} vehicles need at least {k} stops, got {len(stops)}")
+        
+        demands = np.ones(n) if self.demands is None else np.asarray(self.demands, dtype=np.float64)
+        demands = demands[stops]
+        capacity = self.capacity
+        if capacity is None:
+            capacity = max(math.ceil(1.1 * demands.sum() / k), demands.max())
+        if demands.max() > capacity or demands.sum() > k * capacity:
+            raise ValueError(f"Demands ({demands.sum():g}) do not fit in {k} vehicles of capacity {capacity:g}")
+        
+        with instrumentation.phase('clustering'):
+            labels, centres, iterations = self._cluster(stops, demands, capacity)
+        instrumentation.count('clustering_iterations', iterations)
+        
+        with instrumentation.phase('routing'):
+            routes = self._route_clusters(stops, labels)
+        
+        with instrumentation.phase('repair'):
+            loads = np.bincount(labels, weights=demands, minlength=k)
+            moves = self._repair(routes, stops, demands, loads, capacity, centres)
+        instrumentation.count('repair_moves', moves)
+        
+        # The assignment falls back to the emptiest cluster when uneven demands
+        # leave no cluster with room, and repair may not undo that
+        overload = np.maximum(loads - capacity, 0.0)
+        instrumentation.count('overloaded_routes', int(np.count_nonzero(overload)))
+        
+        route_distances = [self._route_cost(route) for route in routes]
+        route_durations = [self._route_cost(route, self._durations) for route in routes]
+        computation_time = time.perf_counter() - start_time
+        
+        return {
+            'algorithm': 'Multi-Vehicle',
+            'path': [node for route in routes for node in route],
+            'distance': float(sum(route_distances)),
+            'duration': float(sum(route_durations)),
+            'computation_time': computation_time,
+            'routes': routes,
+            'route_distances': route_distances,
+            'route_durations': route_durations,
+            'route_loads': loads.tolist(),
+            'capacity': float(capacity),
+            'capacity_overload': overload.tolist(),
+            'vehicles_used': sum(len(route) > 1 for route in routes),
+            'makespan': float(max(route_durations)),
+            'instrumentation': instrumentation.stop('Multi-Vehicle')
+        }
+    
+    def _cluster(self, stops, demands, capacity):
+        """
+        Capacity-aware k-means or k-medoids over the stops.
+        
+        Both alternate a capacity-aware assignment with a centre update until
+        the assignment stops changing. The centres start from a k-means++
+        style spread-out choice of stops.
+        
+        Returns:
+            (cluster label per stop, centres as (k, 2) planar coordinates,
+             iterations)
+        """
+        k = self.num_vehicles
+        rng = np.random.default_rng(self.seed)
+        coords = self.graph_builder.locations_df[['lat', 'lng']].to_numpy(dtype=np.float64)[stops]
+        # Plane where a degree of longitude is as long as one of latitude
+        points = np.column_stack([coords[:, 1] * math.cos(math.radians(coords[:, 0].mean())), coords[:, 0]])
+        
+        chosen = [int(rng.integers(len(stops)))]
+        nearest = ((points - points[chosen[0]]) ** 2).sum(axis=1)
+        for _ in range(1, k):
+            total = nearest.sum()
+            chosen.append(int(rng.choice(len(stops), p=nearest / total)) if total > 0
+                          else int(rng.choice(np.setdiff1d(np.arange(len(stops)), chosen))))
+            nearest = np.minimum(nearest, ((points - points[chosen[-1]]) ** 2).sum(axis=1))
+        
+        medoids = stops[chosen]
+        centres = points[chosen]
+        labels = None
+        for iteration in range(1, self.max_iterations + 1):
+            if self.clustering == 'kmeans':
+                costs = ((points[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)
+            else:
+                costs = self._weight(stops[:, None], medoids[None, :])
+            
+            new_labels = _capacitated_assignment(costs, demands, capacity)
+            # Full capacities can make a few stops flip between clusters forever
+            if labels is not None and np.count_nonzero(new_labels != labels) <= len(stops) // 1000:
+                labels = new_labels
+                break
+            labels = new_labels
+            
+            for cluster in range(k):
+                members = np.flatnonzero(labels == cluster)
+                if not len(members):
+                    # Restart an empty cluster at the stop farthest from its own centre
+                    members = np.array([np.argmax(costs[np.arange(len(stops)), labels])])
+                    labels[members] = cluster
+                    centres[cluster] = points[members[0]]
+                    medoids[cluster] = stops[members[0]]
+                    continue
+                if self.clustering == 'kmeans':
+                    centres[cluster] = np.average(points[members], axis=0, weights=demands[members])
+                else:
+                    within = self._weight(stops[members][:, None], stops[members][None, :]).sum(axis=1)
+                    medoids[cluster] = stops[members[np.argmin(within)]]
+            if self.clustering == 'kmedoids':
+                centres = points[np.searchsorted(stops, medoids)]
+        
+        return labels, centres, iteration
+    
+    def _route_clusters(self, stops, labels):
+        """Route every cluster with the route solver; returns the routes in global node indices."""
+        solver, params = self.route_solver
+        tasks = []
+        local_paths = {}
+        for cluster in range(self.num_vehicles):
+            nodes = np.concatenate([[self.depot], stops[labels == cluster]])
+            rows, cols = np.minimum.outer(nodes, nodes), np.maximum.outer(nodes, nodes)
+            if len(nodes) <= 2:
+                # Nothing to order
+                local_paths[cluster] = list(range(len(nodes)))
+                continue
+            tasks.append((cluster, solver, params,
+                          self.graph_builder.locations_df.iloc[nodes].reset_index(drop=True),
+                          self._distances[rows, cols], self._durations[rows, cols], self.seed + cluster))
+        
+        max_workers = min(self.max_workers or os.cpu_count() or 1, max(len(tasks), 1))
+        # Processes started by ConcurrentRunner are daemonic and cannot have children
+        if mp.current_process().daemon:
+            max_workers = 1
+        
+        if max_workers <= 1:
+            for task in tasks:
+                cluster, path = _solve_cluster(*task)
+                local_paths[cluster] = path
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_solve_cluster, *task) for task in tasks]
+                for future in as_completed(futures):
+                    cluster, path = future.result()
+                    local_paths[cluster] = path
+        
+        routes = []
+        for cluster in range(self.num_vehicles):
+            nodes = np.concatenate([[self.depot], stops[labels == cluster]])
+            order = [int(nodes[node]) for node in local_paths[cluster] if node != 0]
+            # A solver that does not start at node 0 (e.g. a GA with start=None) leaves
+            # the depot anywhere in the path; start from the end of the order nearer to it
+            if (order and local_paths[cluster][0] != 0
+                    and self._weight(self.depot, order[-1]) < self._weight(self.depot, order[0])):
+                order.reverse()
+            routes.append([self.depot] + order)
+        
+        self.instrumentation.count('clusters_routed', len(tasks))
+        return routes
+    
+    def _repair(self, routes, stops, demands, loads, capacity, centres):
+        """
+        Improve the cluster boundaries with inter-route moves, in place.
+        
+        Every stop may be relocated to its best insertion point in one of the
+        routes whose cluster centre is nearest to it, or swapped with a stop
+        of such a route, whichever shortens the total distance most without
+        exceeding a vehicle's capacity. All insertion points and swap partners
+        of a route are scored in one NumPy expression from the stop's weights
+        to the route and the route's cached leg weights. Passes over all stops
+        repeat until none improves or repair_rounds is reached.
+        
+        Returns:
+            Number of moves applied
+        """
+        k = self.num_vehicles
+        weights = self._weights
+        demand_of = np.zeros(len(weights))
+        demand_of[stops] = demands
+        route_of = {node: r for r, route in enumerate(routes) for node in route[1:]}
+        
+        def weight(i, j):
+            return weights[i, j] if i < j else weights[j, i]
+        
+        # Route arrays and their leg weights, rebuilt after a route changes
+        cache = {}
+        
+        def route_arrays(r):
+            if r not in cache:
+                nodes = np.asarray(routes[r], dtype=np.intp)
+                cache[r] = (nodes, self._weight(nodes[:-1], nodes[1:]))
+            return cache[r]
+        
+        coords = self.graph_builder.locations_df[['lat', 'lng']].to_numpy(dtype=np.float64)[stops]
+        points = np.column_stack([coords[:, 1] * math.cos(math.radians(coords[:, 0].mean())), coords[:, 0]])
+        centre_costs = ((points[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)
+        nearby = np.argsort(centre_costs, axis=1)[:, :min(self.neighbour_routes + 1, k)].tolist()
+        
+        moves = 0
+        for _ in range(self.repair_rounds):
+            improved = 0
+            for index, node in enumerate(stops.tolist()):
+                a = route_of[node]
+                route_a = routes[a]
+                p = route_a.index(node)
+                prev = route_a[p - 1]
+                following = route_a[p + 1] if p + 1 < len(route_a) else None
+                
+                # Saving from taking the node out of its route
+                removal = weight(prev, node)
+                if following is not None:
+                    removal += weight(node, following) - weight(prev, following)
+                
+                best_gain, best_move = 1e-9, None
+                for b in nearby[index]:
+                    if b == a:
+                        continue
+                    nodes_b, legs_b = route_arrays(b)
+                    to_node = self._weight(node, nodes_b)
+                    
+                    # Relocate: insert between consecutive nodes of b, or append
+                    if loads[b] + demand_of[node] <= capacity:
+                        insertion = np.append(to_node[:-1] + to_node[1:] - legs_b, to_node[-1])
+                        position = int(np.argmin(insertion))
+                        gain = removal - insertion[position]
+                        if gain > best_gain:
+                            best_gain, best_move = gain, ('relocate', b, position + 1)
+                    
+                    # Swap with each stop u of b: node takes u's place and vice versa
+                    if len(nodes_b) < 2:
+                        continue
+                    others = nodes_b[1:]
+                    fits = ((loads[a] - demand_of[node] + demand_of[others] <= capacity)
+                            & (loads[b] - demand_of[others] + demand_of[node] <= capacity))
+                    if not fits.any():
+                        continue
+                    change_b = to_node[:-1] - legs_b + np.append(to_node[2:] - legs_b[1:], 0.0)
+                    change_a = self._weight(prev, others) - weight(prev, node)
+                    if following is not None:
+                        change_a += self._weight(others, following) - weight(node, following)
+                    gains = np.where(fits, -(change_a + change_b), -np.inf)
+                    q = int(np.argmax(gains))
+                    if gains[q] > best_gain:
+                        best_gain, best_move = gains[q], ('swap', b, q + 1)
+                
+                if best_move is None:
+                    continue
+                kind, b, position = best_move
+                if kind == 'relocate':
+                    route_a.pop(p)
+                    routes[b].insert(position, node)
+                    loads[a] -= demand_of[node]
+                    loads[b] += demand_of[node]
+                else:
+                    other = routes[b][position]
+                    route_a[p], routes[b][position] = other, node
+                    route_of[other] = a
+                    loads[a] += demand_of[other] - demand_of[node]
+                    loads[b] += demand_of[node] - demand_of[other]
+                route_of[node] = b
+                cache.pop(a, None)
+                cache.pop(b, None)
+                improved += 1
+            
+            moves += improved
+            if not improved:
+                break
+        
+        return moves
+
+
+def _capacitated_assignment(costs, demands, capacity):
+    """
+    Assign every stop to its cheapest cluster that still has room.
+    
+    Stops with the largest regret (the extra cost of their second choice over
+    their first) are placed first, so the stops that would lose most from
+    being pushed out of a full cluster keep their preferred one.
+    
+    Args:
+        costs: (stops, clusters) assignment costs
+    """
+    n, k = costs.shape
+    preferences = np.argsort(costs, axis=1)
+    if k > 1:
+        ranked = np.take_along_axis(costs, preferences[:, :2], axis=1)
+        order = np.argsort(ranked[:, 0] - ranked[:, 1], kind='stable')
+    else:
+        order = np.arange(n)
+    
+    labels = np.empty(n, dtype=np.intp)
+    loads = np.zeros(k)
+    for stop in order.tolist():
+        for cluster in preferences[stop].tolist():
+            if loads[cluster] + demands[stop] <= capacity:
+                labels[stop] = cluster
+                loads[cluster] += demands[stop]
+                break
+        else:
+            # Unlucky packing of uneven demands: take the emptiest cluster
+            # (over capacity; optimize() reports it as capacity_overload)
+            cluster = int(np.argmin(loads))
+            labels[stop] = cluster
+            loads[cluster] += demands[stop]
+    return labels
@@ -4,10 +4,31 @@ import numpy as np
 import matplotlib.pyplot as plt
 from deap import base, creator, tools, algorithms
 
+try:
+    from path_finder.utils.instrumentation import Instrumentation, guarded
+except ImportError:
+    from utils.instrumentation import Instrumentation, guarded
+
 class GeneticAlgorithm:
     def __init__(self, graph_builder, population_size=100, generations=100, 
-                 crossover_prob=0.8, mutation_prob=0.2, elite_size=10):
-        """Initialize the Genetic Algorithm for route optimization."""
+                 crossover_prob=0.8, mutation_prob=0.2, elite_size=10, instrumentation=None,
+                 time_windows=None, time_window_penalty=100.0, start=0):
+        """
+        Initialize the Genetic Algorithm for route optimization.
+        
+        Args:
+            start: Node every route starts from, like the other solvers'
+                start argument; only the order of the other stops evolves.
+                None evolves a free permutation (any first stop), which is
+                an easier problem than the fixed-start one
+            instrumentation: Optional Instrumentation (e.g. with memory tracing
+                or profiling enabled); a plain one is used otherwise
+            time_windows: Optional utils.time_windows.TimeWindows; routes that
+                miss windows stay in the population but their fitness is
+                penalized by their time warp. The schedule is simulated from
+                the start node, so time windows need a fixed start
+            time_window_penalty: Fitness added per second of time warp
+        """
         if graph_builder is None:
             raise ValueError("graph_builder must be provided!")
         if not hasattr(graph_builder, 'locations'):
@@ -19,7 +40,23 @@ class GeneticAlgorithm:
         self.crossover_prob = crossover_prob
         self.mutation_prob = mutation_prob
         self.elite_size = elite_size
-        self.history = {'best': [], 'avg': []}
+        self.history = {'best': [], 'avg': [], 'time': []}
+        self.instrumentation = instrumentation or Instrumentation()
+        self.time_windows = time_windows
+        self.time_window_penalty = time_window_penalty
+        n_locations = len(graph_builder.locations)
+        if start is not None and not 0 <= start < n_locations:
+            raise ValueError(f"start must be a node index below {n_locations}")
+        if start is None and time_windows is not None:
+            raise ValueError("Time windows are scored from the start node; pass a start (e.g. 0) with them")
+        self.start = start
+        # Genes are indices into self._stops: DEAP's ordered crossover needs permutations of 0..k-1
+        self._stops = [node for node in range(n_locations) if node != start]
+        self._duration_rows = None
+        if time_windows is not None:
+            self._duration_rows = graph_builder.get_weight_matrix('duration').tolist()
+        self._fitness_calls = 0
+        self._fitness_time = 0.0
         
         # Set up DEAP genetic algorithm components
         creator.create("FitnessMin", base.Fitness, weights=(-1.0,))  # Minimization problem
@@ -33,10 +70,10 @@ class GeneticAlgorithm:
     def _setup_toolbox(self):
         """Set up the genetic algorithm toolbox with operators."""
         # Register the permutation of indices as a representation of individuals
-        n_locations = len(self.graph_builder.locations)
+        n_genes = len(self._stops)
         
-        # Create an individual as a randomly shuffled list of location indices
-        self.toolbox.register("indices", random.sample, range(n_locations), n_locations)
+        # Create an individual as a randomly shuffled list of stop indices
+        self.toolbox.register("indices", random.sample, range(n_genes), n_genes)
         self.toolbox.register("individual", tools.initIterate, creator.Individual, self.toolbox.indices)
         self.toolbox.register("population", tools.initRepeat, list, self.toolbox.individual)
         
@@ -48,30 +85,54 @@ class GeneticAlgorithm:
         self.toolbox.register("mutate", tools.mutShuffleIndexes, indpb=0.05)  # Shuffle mutation
         self.toolbox.register("select", tools.selTournament, tournsize=3)  # Tournament selection
     
+    def _route(self, individual):
+        """The route an individual encodes: the start node, then its stops in order."""
+        stops = [self._stops[gene] for gene in individual]
+        return stops if self.start is None else [self.start] + stops
+    
     def _fitness_function(self, individual):
         """Calculate the fitness of an individual (total route distance)."""
+        start = time.perf_counter()
         total_distance = 0
+        route = self._route(individual)
         
         # Calculate the total distance of the route represented by the individual
-        for i in range(len(individual) - 1):
-            from_loc = individual[i]
-            to_loc = individual[i + 1]
+        for i in range(len(route) - 1):
+            from_loc = route[i]
+            to_loc = route[i + 1]
             total_distance += self.graph_builder.graph[from_loc][to_loc]['weight']
         
         # Add distance back to starting point if needed (TSP)
-        # total_distance += self.graph_builder.graph[individual[-1]][individual[0]]['weight']
+        # total_distance += self.graph_builder.graph[route[-1]][route[0]]['weight']
+        
+        if self.time_windows is not None:
+            total_distance += self.time_window_penalty * self.time_windows.time_warp(route, self._duration_rows)
         
+        self._fitness_calls += 1
+        self._fitness_time += time.perf_counter() - start
         return (total_distance,)  # Return as tuple for DEAP
     
+    @guarded
     def optimize(self, start_time=None):
-        """Run the genetic algorithm optimization."""
-        start = time.time() if start_time is None else start_time
+        """
+        Run the genetic algorithm optimization.
+        
+        Args:
+            start_time: Optional time.perf_counter() value to measure the
+                computation time from (default: now)
+        """
+        start = time.perf_counter() if start_time is None else start_time
+        instrumentation = self.instrumentation
+        instrumentation.start()
         
         # Reset history
-        self.history = {'best': [], 'avg': []}
+        self.history = {'best': [], 'avg': [], 'time': []}
+        self._fitness_calls = 0
+        self._fitness_time = 0.0
         
         # Initialize the population
-        pop = self.toolbox.population(n=self.population_size)
+        with instrumentation.phase('initial_population'):
+            pop = self.toolbox.population(n=self.population_size)
         
         # Hall of Fame to keep track of the best individual
         hof = tools.HallOfFame(1)
@@ -81,29 +142,39 @@ class GeneticAlgorithm:
         stats.register("avg", np.mean)
         stats.register("min", np.min)
         stats.register("max", np.max)
+        # Seconds since the start at which each generation finished (for time-to-target curves)
+        stats.register("time", lambda fitnesses: time.perf_counter() - start)
         
         # Run the algorithm
-        pop, logbook = algorithms.eaSimple(
-            pop, self.toolbox, 
-            cxpb=self.crossover_prob, 
-            mutpb=self.mutation_prob,
-            ngen=self.generations,
-            stats=stats,
-            halloffame=hof,
-            verbose=False
-        )
+        with instrumentation.phase('evolution'):
+            pop, logbook = algorithms.eaSimple(
+                pop, self.toolbox, 
+                cxpb=self.crossover_prob, 
+                mutpb=self.mutation_prob,
+                ngen=self.generations,
+                stats=stats,
+                halloffame=hof,
+                verbose=False
+            )
+        
+        # Fitness calls happen inside the evolution phase; they are timed in
+        # _fitness_function and reported as their own (nested) phase
+        instrumentation.add_time('fitness', self._fitness_time)
+        instrumentation.count('fitness_evaluations', self._fitness_calls)
+        instrumentation.count('generations', self.generations)
         
         # Extract statistics for visualization
         for gen in range(self.generations + 1):
             if gen < len(logbook):
                 self.history['best'].append(logbook[gen]['min'])
                 self.history['avg'].append(logbook[gen]['avg'])
+                self.history['time'].append(logbook[gen]['time'])
         
         best_individual = hof[0]
         best_fitness = best_individual.fitness.values[0]
         
         # Get the path and distance
-        best_path = list(best_individual)
+        best_path = self._route(best_individual)
         best_distance = best_fitness
         
         # Calculate duration based on the best path
@@ -113,8 +184,16 @@ class GeneticAlgorithm:
             to_loc = best_path[i + 1]
             best_duration += self.graph_builder.graph[from_loc][to_loc]['duration']
         
+        # The fitness includes the time window penalty; report the plain distance
+        extra = {}
+        if self.time_windows is not None:
+            time_warp = self.time_windows.time_warp(best_path, self._duration_rows)
+            best_distance = sum(self.graph_builder.graph[a][b]['weight'] for a, b in zip(best_path, best_path[1:]))
+            extra = {'time_warp': time_warp, 'feasible': time_warp == 0}
+        
         # Measure total runtime
-        total_time = time.time() - start
+        total_time = time.perf_counter() - start
+        report = instrumentation.stop(self.__class__.__name__)
         
         return {
             'algorithm': 'Genetic Algorithm',
@@ -123,7 +202,9 @@ class GeneticAlgorithm:
             'duration': best_duration,
             'computation_time': total_time,
             'generations': self.generations,
-            'population_size': self.population_size
+            'population_size': self.population_size,
+            **extra,
+            'instrumentation': report
         }
     
     def plot_evolution(self, figsize=(10, 6)):
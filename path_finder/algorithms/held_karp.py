@@ -0,0 +1,142 @@
+import time
+import numpy as np
+
+try:
+    from path_finder.utils.instrumentation import Instrumentation, guarded
+except ImportError:
+    from utils.instrumentation import Instrumentation, guarded
+
+class HeldKarp:
+    def __init__(self, graph_builder, closed_tour=False, max_nodes=21, instrumentation=None):
+        """
+        Initialize the Held-Karp dynamic-programming solver.
+        
+        Held-Karp is exact but needs O(2^n * n) memory, so it is meant as a
+        reference solver for small instances (up to about 20 stops).
+        
+        Args:
+            graph_builder: GraphBuilder with the distance and duration matrices
+            closed_tour: If True, the route returns to the start node
+            max_nodes: Refuse instances larger than this to protect memory
+            instrumentation: Optional Instrumentation to time the DP phases
+        """
+        if graph_builder is None:
+            raise ValueError("graph_builder must be provided!")
+        
+        self.graph_builder = graph_builder
+        self.closed_tour = closed_tour
+        self.max_nodes = max_nodes
+        self.instrumentation = instrumentation or Instrumentation()
+    
+    @guarded
+    def optimize(self, start=0):
+        """
+        Solve the instance to optimality.
+        
+        The DP table dp[mask, j] holds the cheapest way to leave the start node,
+        visit exactly the nodes in mask and end at node j. Masks are processed
+        layer by layer (by number of visited nodes); within a layer every mask
+        ending in j is relaxed at once with NumPy over all predecessors k:
+        
+            dp[mask, j] = min_k dp[mask without j, k] + w(k, j)
+        
+        The table is float32 with an int8 predecessor table next to it, about
+        5 bytes per entry. The reported distance is recomputed in float64 from
+        the reconstructed path.
+        
+        Args:
+            start: The index of the starting node (default is the first node)
+            
+        Returns:
+            Dictionary with the result: path, distance, duration, and computation time
+        """
+        start_time = time.perf_counter()
+        
+        weights = self.graph_builder.get_weight_matrix()
+        durations = self.graph_builder.get_weight_matrix('duration')
+        n = len(weights)
+        
+        if n > self.max_nodes:
+            raise ValueError(f"Held-Karp is limited to {self.max_nodes} stops, got {n}")
+        
+        self.instrumentation.start()
+        self.instrumentation.add_time('setup', time.perf_counter() - start_time)
+        
+        others = np.array([node for node in range(n) if node != start], dtype=np.intp)
+        m = len(others)
+        
+        if m == 0:
+            path = [start]
+        else:
+            path = self._solve(weights, start, others)
+        
+        total_distance = sum(weights[a, b] for a, b in zip(path, path[1:]))
+        total_duration = sum(durations[a, b] for a, b in zip(path, path[1:]))
+        
+        computation_time = time.perf_counter() - start_time
+        
+        return {
+            'algorithm': 'Held-Karp',
+            'path': path,
+            'distance': float(total_distance),
+            'duration': float(total_duration),
+            'computation_time': computation_time,
+            'optimal': True,
+            'closed_tour': self.closed_tour,
+            'instrumentation': self.instrumentation.stop('Held-Karp')
+        }
+    
+    def _solve(self, weights, start, others):
+        """Fill the DP table and reconstruct the best path."""
+        m = len(others)
+        num_masks = 1 << m
+        instrumentation = self.instrumentation
+        dp_start = time.perf_counter()
+        inner = weights[np.ix_(others, others)].astype(np.float32)
+        
+        dp = np.full((num_masks, m), np.inf, dtype=np.float32)
+        parent = np.full((num_masks, m), -1, dtype=np.int8)
+        
+        singles = 1 << np.arange(m)
+        dp[singles, np.arange(m)] = weights[start, others]
+        
+        masks = np.arange(num_masks, dtype=np.int64)
+        popcount = np.zeros(num_masks, dtype=np.int8)
+        for bit in range(m):
+            popcount += ((masks >> bit) & 1).astype(np.int8)
+        
+        for size in range(2, m + 1):
+            layer = masks[popcount == size]
+            for j in range(m):
+                with_j = layer[(layer >> j) & 1 == 1]
+                candidates = dp[with_j ^ (1 << j)] + inner[:, j]
+                best = candidates.argmin(axis=1)
+                dp[with_j, j] = candidates[np.arange(len(with_j)), best]
+                parent[with_j, j] = best
+        
+        instrumentation.add_time('dp', time.perf_counter() - dp_start)
+        instrumentation.count('dp_cells', m * num_masks)
+        instrumentation.gauge('table_bytes', dp.nbytes + parent.nbytes)
+        path_start = time.perf_counter()
+        
+        full = num_masks - 1
+        final_costs = dp[full].astype(np.float64)
+        if self.closed_tour:
+            final_costs += weights[others, start]
+        
+        # Walk the predecessor table back from the best final node
+        j = int(np.argmin(final_costs))
+        mask = full
+        reversed_path = []
+        while j >= 0:
+            reversed_path.append(int(others[j]))
+            previous = int(parent[mask, j])
+            mask ^= 1 << j
+            j = previous
+        
+        path = [start] + reversed_path[::-1]
+        if self.closed_tour:
+            path.append(start)
+        
+        instrumentation.add_time('path_extraction', time.perf_counter() - path_start)
+        return path
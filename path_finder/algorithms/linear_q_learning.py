@@ -0,0 +1,279 @@
+import numpy as np
+import time
+import matplotlib.pyplot as plt
+
+try:
+    from path_finder.utils.instrumentation import Instrumentation, guarded
+except ImportError:
+    from utils.instrumentation import Instrumentation, guarded
+
+# Features of one (current node, candidate, unvisited set) action.
+# Distances are divided by the instance's mean nearest-neighbour distance, so
+# the same weights mean the same thing on a small or large, dense or sparse
+# instance and can be reused across routes. The per-candidate features are
+# centred on their mean over the candidates; the last three features hold
+# those means and, together with bias and remaining_fraction, describe the state.
+FEATURE_NAMES = (
+    'bias',
+    'step_distance',           # distance from the current node to the candidate
+    'nearest_rank',            # rank of the candidate by step distance (0 = nearest, 1 = farthest)
+    'remaining_spread',        # mean distance from the candidate to the other unvisited nodes, relative to the instance mean
+    'remaining_nearest',       # distance from the candidate to its nearest other unvisited node
+    'remaining_fraction',      # share of the nodes still unvisited
+    'mean_step_distance',
+    'mean_remaining_spread',
+    'mean_remaining_nearest',
+)
+
+
+class LinearQLearning:
+    def __init__(self, graph_builder, learning_rate=0.1, discount_factor=0.9,
+                 exploration_rate=0.1, episodes=300, weights=None, evaluation_interval=10,
+                 instrumentation=None):
+        """
+        Initialize Q-learning with a linear action-value function.
+        
+        Instead of a table over (node, visited set) states, Q(s, a) is the dot
+        product of a small feature vector (see FEATURE_NAMES) with a weight
+        vector. Memory does not grow with the number of stops, so this variant
+        keeps learning on instances far beyond tabular scale.
+        
+        Training starts from the nearest-neighbour policy (a weight of -1 on
+        step_distance) unless weights are given. The TD updates do not make
+        the greedy tour shorter at every step, so the greedy policy is rolled
+        out every evaluation_interval episodes and the shortest tour is
+        returned; the result is never longer than the tour of the initial
+        weights (the nearest-neighbour tour by default).
+        
+        Args:
+            learning_rate: Step size of the SGD update, which is normalized by
+                the mean squared feature norm of the episode
+            weights: Initial weights, e.g. from load_weights() or another
+                instance. optimize() continues training from the current
+                weights, so one instance can be trained on several routes.
+            evaluation_interval: Episodes between two greedy rollouts
+            instrumentation: Optional Instrumentation (see QLearning)
+        """
+        self.graph_builder = graph_builder
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+        self.exploration_rate = exploration_rate
+        self.episodes = episodes
+        if weights is None:
+            weights = np.zeros(len(FEATURE_NAMES))
+            weights[FEATURE_NAMES.index('step_distance')] = -1.0
+        self.weights = np.asarray(weights, dtype=float).copy()
+        self.evaluation_interval = max(1, evaluation_interval)
+        self.reward_history = []
+        self.instrumentation = instrumentation or Instrumentation()
+    
+    def save_weights(self, filepath):
+        """Save the learned weights (and feature names) to a .npz file."""
+        np.savez(filepath, weights=self.weights, feature_names=np.array(FEATURE_NAMES))
+    
+    def load_weights(self, filepath):
+        """Load weights written by save_weights()."""
+        with np.load(filepath) as data:
+            if tuple(data['feature_names']) != FEATURE_NAMES:
+                raise ValueError("Saved weights were trained on a different feature set")
+            self.weights = data['weights'].astype(float)
+    
+    def _features(self, current_node, unvisited, spread_sums, nearest_costs, num_nodes):
+        """
+        Feature matrix of every action available from current_node.
+        
+        Args:
+            unvisited: Array of the unvisited nodes (the candidate actions)
+            spread_sums: Sum of the distances from every node to the unvisited set
+            nearest_costs: Distance from every unvisited node to its nearest other unvisited node
+        
+        Returns:
+            Array of shape (len(unvisited), len(FEATURE_NAMES))
+        """
+        count = len(unvisited)
+        features = np.empty((count, len(FEATURE_NAMES)))
+        
+        step = self._scaled[current_node, unvisited]
+        features[:, 0] = 1.0
+        features[:, 1] = step
+        features[:, 2] = np.argsort(np.argsort(step)) / max(count - 1, 1)
+        
+        if count > 1:
+            # The diagonal is zero, so the candidate does not add to its own sum
+            features[:, 3] = spread_sums[unvisited] / ((count - 1) * self._mean_scaled)
+            features[:, 4] = nearest_costs[unvisited]
+        else:
+            features[:, 3:5] = 0.0
+        
+        # Centre the per-candidate features so they only explain the difference
+        # between actions; the state value is carried by the state features
+        features[:, 6:9] = features[:, [1, 3, 4]].mean(axis=0)
+        features[:, 1:5] -= features[:, 1:5].mean(axis=0)
+        features[:, 5] = count / num_nodes
+        return features
+    
+    def _prepare(self):
+        """Read the weight matrix and derive the distance scale of the instance."""
+        self._weights = self.graph_builder.get_weight_matrix()
+        num_nodes = len(self._weights)
+        if num_nodes > 1:
+            off_diagonal = self._weights + np.diag(np.full(num_nodes, np.inf))
+            scale = off_diagonal.min(axis=1).mean()
+        else:
+            scale = 1.0
+        self._scaled = self._weights / (scale if scale > 0 else 1.0)
+        self._mean_scaled = max(self._scaled.sum() / max(num_nodes * (num_nodes - 1), 1), 1e-12)
+        return num_nodes
+    
+    @guarded
+    def optimize(self, start=0):
+        """Train the weights on this instance and return the best greedy tour seen while training."""
+        start_time = time.perf_counter()
+        instrumentation = self.instrumentation
+        instrumentation.start()
+        
+        with instrumentation.phase('setup'):
+            self.graph = self.graph_builder.graph
+            num_nodes = self._prepare()
+            durations = self.graph_builder.get_weight_matrix('duration')
+        
+        self.reward_history = []
+        # The greedy policy is scored every evaluation_interval episodes (and
+        # before training) and its best tour is kept, since the TD updates do
+        # not improve the greedy tour monotonically
+        best_path, best_length = None, np.inf
+        evaluations = 0
+        with instrumentation.phase('training'):
+            for episode in range(self.episodes + 1):
+                if episode % self.evaluation_interval == 0 or episode == self.episodes:
+                    with instrumentation.phase('path_extraction'):
+                        path = self._rollout(start, num_nodes, explore=False)[0]
+                    evaluations += 1
+                    length = self._weights[path[:-1], path[1:]].sum()
+                    if length < best_length:
+                        best_path, best_length = path, length
+                if episode < self.episodes:
+                    self.reward_history.append(self._train_episode(start, num_nodes))
+                    self.exploration_rate = max(0.01, self.exploration_rate * 0.99)
+        instrumentation.count('episodes', self.episodes)
+        instrumentation.count('steps', self.episodes * (num_nodes - 1))
+        instrumentation.count('greedy_evaluations', evaluations)
+        
+        total_distance = 0
+        total_duration = 0
+        for from_node, to_node in zip(best_path, best_path[1:]):
+            total_distance += self._weights[from_node, to_node]
+            total_duration += durations[from_node, to_node]
+        
+        computation_time = time.perf_counter() - start_time
+        
+        return {
+            'algorithm': 'Q-Learning (Linear)',
+            'path': best_path,
+            'distance': float(total_distance),
+            'duration': float(total_duration),
+            'computation_time': computation_time,
+            'episodes': self.episodes,
+            'feature_weights': dict(zip(FEATURE_NAMES, self.weights.tolist())),
+            'instrumentation': instrumentation.stop('Q-Learning (Linear)')
+        }
+    
+    def _rollout(self, start, num_nodes, explore=True):
+        """
+        Build one tour with the epsilon-greedy (or greedy) policy.
+        
+        Returns:
+            The path, the feature vector of every chosen action, the step
+            rewards and the best Q-value available after each step
+            (0 after the last one)
+        """
+        scaled = self._scaled
+        unvisited = np.array([node for node in range(num_nodes) if node != start], dtype=np.intp)
+        spread_sums = scaled[:, unvisited].sum(axis=1)
+        
+        # Nearest other unvisited node of every unvisited node; only the nodes
+        # whose nearest one gets visited need a new search, so a tour costs O(n^2)
+        nearest_nodes = np.full(num_nodes, -1, dtype=np.intp)
+        nearest_costs = np.zeros(num_nodes)
+        if len(unvisited) > 1:
+            others = scaled[np.ix_(unvisited, unvisited)]
+            np.fill_diagonal(others, np.inf)
+            nearest_nodes[unvisited] = unvisited[others.argmin(axis=1)]
+            nearest_costs[unvisited] = others.min(axis=1)
+        
+        current_node = start
+        path = [start]
+        chosen, rewards, next_values = [], [], []
+        
+        while len(unvisited):
+            features = self._features(current_node, unvisited, spread_sums, nearest_costs, num_nodes)
+            q_values = features @ self.weights
+            if chosen:
+                next_values.append(q_values.max())
+            
+            if explore and np.random.random() < self.exploration_rate:
+                pick = np.random.randint(len(unvisited))
+            else:
+                pick = int(np.argmax(q_values))
+            
+            next_node = int(unvisited[pick])
+            chosen.append(features[pick])
+            rewards.append(-scaled[current_node, next_node])
+            
+            unvisited = np.delete(unvisited, pick)
+            spread_sums -= scaled[:, next_node]
+            affected = unvisited[nearest_nodes[unvisited] == next_node]
+            if len(affected) and len(unvisited) > 1:
+                rows = scaled[np.ix_(affected, unvisited)]
+                rows[np.arange(len(affected)), np.searchsorted(unvisited, affected)] = np.inf
+                nearest_nodes[affected] = unvisited[rows.argmin(axis=1)]
+                nearest_costs[affected] = rows.min(axis=1)
+            path.append(next_node)
+            current_node = next_node
+        
+        next_values.append(0.0)
+        return path, chosen, rewards, next_values
+    
+    def _train_episode(self, start, num_nodes):
+        """
+        Run one episode and apply a single vectorized SGD step over its transitions.
+        
+        Targets are the one-step TD targets computed with the weights the
+        episode was played with. Returns the total reward of the episode.
+        """
+        _, chosen, rewards, next_values = self._rollout(start, num_nodes)
+        if not chosen:
+            return 0.0
+        
+        features = np.array(chosen)
+        rewards = np.array(rewards)
+        targets = rewards + self.discount_factor * np.array(next_values)
+        errors = targets - features @ self.weights
+        # Normalized step: the same learning rate is stable whatever the feature magnitudes
+        norm = np.einsum('ij,ij->i', features, features).mean()
+        self.weights += self.learning_rate * features.T @ errors / (len(errors) * max(norm, 1e-12))
+        
+        return float(rewards.sum())
+    
+    def plot_learning_progress(self, figsize=(10, 6), window_size=50):
+        """Plot the learning progress (rewards over episodes)."""
+        plt.figure(figsize=figsize)
+        
+        plt.plot(self.reward_history, alpha=0.4, color='blue', label='Raw Rewards')
+        
+        if len(self.reward_history) >= window_size:
+            moving_avg = np.convolve(
+                self.reward_history,
+                np.ones(window_size)/window_size,
+                mode='valid'
+            )
+            plt.plot(range(window_size-1, len(self.reward_history)),
+                    moving_avg, color='red', label=f'Moving Avg ({window_size} episodes)')
+        
+        plt.title('Linear Q-Learning Rewards Over Episodes')
+        plt.xlabel('Episode')
+        plt.ylabel('Total Reward (tour length in nearest-neighbour units, negated)')
+        plt.legend()
+        plt.grid(True)
+        
+        return plt.gcf()
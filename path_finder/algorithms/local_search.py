@@ -0,0 +1,376 @@
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    from path_finder.utils.instrumentation import Instrumentation, guarded
+    from path_finder.algorithms.a_star import AStar
+except ImportError:
+    from utils.instrumentation import Instrumentation, guarded
+    from algorithms.a_star import AStar
+
+
+def nearest_neighbours(weights, k, chunk=256):
+    """
+    The k nearest other nodes of every node, nearest first, as an (n, k) array.
+    
+    Weights are read from the upper triangle of the source matrix, like
+    GraphBuilder.get_weight_matrix(), a chunk of rows at a time, so no
+    symmetric copy of the matrix is built.
+    """
+    n = len(weights)
+    k = min(k, n - 1)
+    lists = []
+    columns = np.arange(n)
+    for start in range(0, n, chunk):
+        rows = np.arange(start, min(start + chunk, n))
+        # Symmetric rows from the upper triangle: w(i, j) = source[min, max]
+        block = np.where(columns[None, :] >= rows[:, None], weights[rows], weights[:, rows].T)
+        block[np.arange(len(rows)), rows] = np.inf
+        nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(block, nearest, axis=1), axis=1, kind='stable')
+        lists.append(np.take_along_axis(nearest, order, axis=1))
+    return np.concatenate(lists)
+
+
+class LocalSearch:
+    def __init__(self, graph_builder, neighbours=10, construction='nearest', max_segment=3, time_limit=None,
+                 time_windows=None, time_window_penalty=100.0, instrumentation=None):
+        """
+        Improve a constructed route with 2-opt and Or-opt moves.
+        
+        The route is an open path from a fixed start node, held as an array
+        of nodes plus the position of every node, so a move's change in
+        length is computed from a handful of weights and applying it only
+        touches the positions between its ends. Moves are restricted to the
+        k nearest neighbours of each node, and don't-look bits (a queue of
+        active nodes) skip nodes around which nothing changed since they
+        last failed to improve.
+        
+        - 2-opt: replace two edges by two others, reversing the path between them.
+        - Or-opt: move a segment of up to max_segment stops next to one of its
+          first stop's neighbours, in either direction (the segment insertion
+          moves of 3-opt).
+        
+        Weights are read from the upper triangle of the source matrix, like
+        GraphBuilder.get_weight_matrix(), without building the symmetric
+        copy, so tours of 10,000 stops need no memory beyond the matrices.
+        
+        Args:
+            graph_builder: GraphBuilder with the distance and duration matrices
+            neighbours: Candidate list length per node
+            construction: Start route when optimize() is not given one:
+                'nearest' (nearest neighbour over the candidate lists) or
+                'astar' (AStar.find_optimal_path; slower, for a few thousand stops)
+            max_segment: Longest segment moved by Or-opt
+            time_limit: Optional limit in seconds for the improvement phase
+            time_windows: Optional utils.time_windows.TimeWindows; moves are
+                then judged by distance plus time_window_penalty per second of
+                time warp, with the time warp of a candidate route joined from
+                O(log n) segment summaries (utils.time_windows.RouteTimes)
+            time_window_penalty: Cost added per second of time warp
+            instrumentation: Optional Instrumentation to time the phases
+        """
+        if graph_builder is None:
+            raise ValueError("graph_builder must be provided!")
+        if construction not in ('nearest', 'astar'):
+            raise ValueError("construction must be 'nearest' or 'astar'")
+        
+        self.graph_builder = graph_builder
+        self.neighbours = neighbours
+        self.construction = construction
+        self.max_segment = max_segment
+        self.time_limit = time_limit
+        self.time_windows = time_windows
+        self.time_window_penalty = time_window_penalty
+        self.instrumentation = instrumentation or Instrumentation()
+        
+        self._distances = np.asarray(graph_builder.distance_matrix, dtype=np.float64)
+        self._durations = np.asarray(graph_builder.duration_matrix, dtype=np.float64)
+        self._weights = self._durations if graph_builder.weight_type == 'duration' else self._distances
+    
+    def _weight(self, a, b):
+        """Weight of edge (a, b); edges to None (past either end of the path) cost nothing."""
+        if a is None or b is None:
+            return 0.0
+        return self._weights[a, b] if a < b else self._weights[b, a]
+    
+    def _path_cost(self, path, matrix):
+        path = np.asarray(path)
+        return float(matrix[np.minimum(path[:-1], path[1:]), np.maximum(path[:-1], path[1:])].sum())
+    
+    def _neighbour_lists(self):
+        """The k nearest other nodes of every node, nearest first, as lists."""
+        return nearest_neighbours(self._weights, self.neighbours).tolist()
+    
+    def _nearest_neighbour_path(self, start, neighbour_lists):
+        """Greedy path: go to the nearest unvisited candidate, else scan the whole row."""
+        weights = self._weights
+        n = len(weights)
+        visited = np.zeros(n, dtype=bool)
+        visited[start] = True
+        path = [start]
+        current = start
+        for _ in range(n - 1):
+            following = next((node for node in neighbour_lists[current] if not visited[node]), None)
+            if following is None:
+                row = np.concatenate([weights[:current, current], weights[current, current:]])
+                following = int(np.argmin(np.where(visited, np.inf, row)))
+            visited[following] = True
+            path.append(following)
+            current = following
+        return path
+    
+    @guarded
+    def optimize(self, start=0, initial_path=None):
+        """
+        Construct a route (unless initial_path is given) and improve it until
+        no candidate move helps or the time limit is reached.
+        
+        Args:
+            start: The index of the starting node (ignored with initial_path)
+            initial_path: Optional route to improve, e.g. another solver's path;
+                its first node stays first
+        
+        Returns:
+            Dictionary with the result: path, distance, duration, and computation time
+        """
+        start_time = time.perf_counter()
+        instrumentation = self.instrumentation
+        instrumentation.start()
+        
+        with instrumentation.phase('neighbour_lists'):
+            neighbour_lists = self._neighbour_lists()
+        
+        with instrumentation.phase('construction'):
+            if initial_path is not None:
+                path = [int(node) for node in initial_path]
+            elif self.construction == 'astar':
+                path = AStar(self.graph_builder).find_optimal_path(start=start)['path']
+            else:
+                path = self._nearest_neighbour_path(start, neighbour_lists)
+        initial_distance = self._path_cost(path, self._distances)
+        
+        with instrumentation.phase('search'):
+            path, stats = self._improve(path, neighbour_lists, start_time)
+        for name, value in stats.items():
+            instrumentation.count(name, value)
+        
+        distance = self._path_cost(path, self._distances)
+        computation_time = time.perf_counter() - start_time
+        
+        result = {
+            'algorithm': 'Local Search',
+            'path': path,
+            'distance': distance,
+            'duration': self._path_cost(path, self._durations),
+            'computation_time': computation_time,
+            'initial_distance': initial_distance,
+            'improvement_pct': 100 * (initial_distance - distance) / initial_distance if initial_distance else 0.0,
+            'instrumentation': instrumentation.stop('Local Search')
+        }
+        if self.time_windows is not None:
+            time_warp = self.time_windows.time_warp(path, self.graph_builder.get_weight_matrix('duration'))
+            result['time_warp'] = time_warp
+            result['feasible'] = time_warp == 0
+        return result
+    
+    def _improve(self, path, neighbour_lists, start_time):
+        """Apply improving moves, node by node from the don't-look queue, until none is left."""
+        n = len(path)
+        order = np.asarray(path, dtype=np.intp)
+        position = np.empty(n, dtype=np.intp)
+        position[order] = np.arange(n)
+        deadline = None if self.time_limit is None else start_time + self.time_limit
+        stats = {'two_opt_moves': 0, 'or_opt_moves': 0, 'move_evaluations': 0}
+        
+        route_times = None
+        if self.time_windows is not None:
+            route_times = self.time_windows.route(order.tolist(), self.graph_builder.get_weight_matrix('duration'))
+        
+        def node_at(index):
+            return int(order[index]) if 0 <= index < n else None
+        
+        # Every node starts active; a node re-enters the queue when one of its edges changes
+        queue = deque(order[1:].tolist() + order[:1].tolist())
+        active = np.ones(n, dtype=bool)
+        checks = 0
+        
+        while queue:
+            checks += 1
+            if deadline is not None and checks % 100 == 0 and time.perf_counter() > deadline:
+                break
+            a = queue.popleft()
+            active[a] = False
+            
+            i = int(position[a])
+            best = self._best_two_opt(a, i, order, position, neighbour_lists[a], node_at, route_times, stats)
+            or_move = self._best_or_opt(a, i, order, position, neighbour_lists[a], node_at, route_times, stats)
+            if or_move is not None and (best is None or or_move[0] < best[0]):
+                best = or_move
+            if best is None:
+                continue
+            
+            if best[1] == '2-opt':
+                _, _, left, right = best
+                touched = [node_at(left - 1), node_at(left), node_at(right), node_at(right + 1)]
+                low, high = left, right
+                order[low:high + 1] = order[low:high + 1][::-1].copy()
+                stats['two_opt_moves'] += 1
+            else:
+                _, _, p, length, after, reverse = best
+                segment = order[p:p + length].copy()
+                if reverse:
+                    segment = segment[::-1]
+                touched = [node_at(p - 1), node_at(p + length), int(segment[0]), int(segment[-1]),
+                           int(order[after]), node_at(after + 1)]
+                if after < p:
+                    low, high = after + 1, p + length - 1
+                    order[low:high + 1] = np.concatenate([segment, order[after + 1:p]])
+                elif after >= p + length:
+                    low, high = p, after
+                    order[low:high + 1] = np.concatenate([order[p + length:after + 1], segment])
+                else:
+                    low, high = p, p + length - 1
+                    order[low:high + 1] = segment
+                stats['or_opt_moves'] += 1
+            
+            position[order[low:high + 1]] = np.arange(low, high + 1)
+            if route_times is not None:
+                route_times.update(low, order[low:high + 1].tolist())
+            for node in touched + [a]:
+                if node is not None and not active[node]:
+                    active[node] = True
+                    queue.append(node)
+        
+        return [int(node) for node in order], stats
+    
+    def _penalized(self, distance_change, warp_of, route_times):
+        """
+        Total cost change of a move: the distance change plus, with time
+        windows, the penalty for the change in time warp. warp_of() builds the
+        moved route's time warp from summaries and is only called when the
+        move can still pay off.
+        """
+        if route_times is None:
+            return distance_change
+        current_warp = route_times.time_warp
+        if distance_change - self.time_window_penalty * current_warp >= -1e-9:
+            return distance_change
+        warp_change = warp_of() - current_warp
+        # Summaries joined in a different order differ by rounding, which the
+        # penalty would otherwise turn into phantom improvements
+        if abs(warp_change) <= 1e-9 * route_times.duration:
+            warp_change = 0.0
+        return distance_change + self.time_window_penalty * warp_change
+    
+    def _warp_slack(self, route_times):
+        """Most a move can save by reducing time warp; the distance-based scan cutoffs allow for it."""
+        return 0.0 if route_times is None else self.time_window_penalty * route_times.time_warp
+    
+    def _best_two_opt(self, a, i, order, position, candidates, node_at, route_times, stats):
+        """
+        Best 2-opt move that adds an edge from a to one of its candidates.
+        
+        The edge a-c replaces either a-succ(a) (with succ(a)-succ(c) replacing
+        c-succ(c)) or pred(a)-a (with pred(a)-pred(c) replacing pred(c)-c).
+        Candidates are sorted by weight, so the scan stops at the first c
+        that is not closer to a than both of a's current neighbours (by more
+        than the time warp penalty the move could save).
+        
+        Returns:
+            (change, '2-opt', left, right) to reverse order[left..right], or None
+        """
+        weight = self._weight
+        best = None
+        succ_a, pred_a = node_at(i + 1), node_at(i - 1)
+        slack = self._warp_slack(route_times)
+        
+        for c in candidates:
+            j = int(position[c])
+            w_ac = weight(a, c) - slack
+            # Successor side: a-c and succ(a)-succ(c) replace a-succ(a) and c-succ(c)
+            if succ_a is not None and w_ac >= weight(a, succ_a) and (pred_a is None or w_ac >= weight(pred_a, a)):
+                break
+            succ_c, pred_c = node_at(j + 1), node_at(j - 1)
+            for left, right, old1, old2, new1, new2 in (
+                    (min(i, j) + 1, max(i, j), (a, succ_a), (c, succ_c), (a, c), (succ_a, succ_c)),
+                    (min(i, j), max(i, j) - 1, (pred_a, a), (pred_c, c), (a, c), (pred_a, pred_c))):
+                # The start node stays first; edges past the end of the path cost nothing
+                if left < 1 or left >= right:
+                    continue
+                stats['move_evaluations'] += 1
+                change = (weight(*new1) + weight(*new2)) - (weight(*old1) + weight(*old2))
+                change = self._penalized(change, lambda: route_times.combine(
+                    route_times.before(left), route_times.block(left, right, reverse=True),
+                    route_times.after(right + 1))[1], route_times)
+                if change < -1e-9 and (best is None or change < best[0]):
+                    best = (change, '2-opt', left, right)
+        return best
+    
+    def _best_or_opt(self, a, i, order, position, candidates, node_at, route_times, stats):
+        """
+        Best Or-opt move of a segment starting at a, placed next to one of a's candidates.
+        
+        The segment goes between c and its successor (a next to c) or, reversed,
+        between c's predecessor and c. The scan stops at the first candidate
+        farther from a than the segment's removal saves (plus the time warp
+        penalty the move could save).
+        
+        Returns:
+            (change, 'or-opt', p, length, after, reverse): move order[p:p + length]
+            (reversed if reverse) to just after position `after`, or None
+        """
+        weight = self._weight
+        n = len(order)
+        if i < 1:
+            return None
+        
+        best = None
+        prev = node_at(i - 1)
+        slack = self._warp_slack(route_times)
+        for length in range(1, self.max_segment + 1):
+            if i + length > n:
+                break
+            first, last = a, int(order[i + length - 1])
+            following = node_at(i + length)
+            removal = weight(prev, first) + weight(last, following) - weight(prev, following)
+            
+            for c in candidates:
+                j = int(position[c])
+                if i <= j < i + length:
+                    continue
+                if weight(a, c) - slack >= removal:
+                    break
+                
+                # Neighbours of c once the segment has been taken out
+                succ_c = following if c == prev else node_at(j + 1)
+                pred_c = prev if c == following else node_at(j - 1)
+                
+                options = [(c, succ_c, False)]
+                if pred_c is not None:
+                    options.append((pred_c, c, True))
+                for x, y, reverse in options:
+                    head, tail = (last, first) if reverse else (first, last)
+                    stats['move_evaluations'] += 1
+                    insertion = weight(x, head) + weight(tail, y) - weight(x, y)
+                    after = int(position[x])
+                    change = self._penalized(insertion - removal, lambda: self._or_opt_warp(
+                        route_times, i, length, after, reverse), route_times)
+                    if change < -1e-9 and (best is None or change < best[0]):
+                        best = (change, 'or-opt', i, length, after, reverse)
+        return best
+    
+    def _or_opt_warp(self, route_times, p, length, after, reverse):
+        """Time warp of the route with the segment at p moved after position `after`."""
+        segment = route_times.block(p, p + length - 1, reverse=reverse)
+        if after < p - 1:
+            parts = (route_times.before(after + 1), segment, route_times.block(after + 1, p - 1),
+                     route_times.after(p + length))
+        elif after >= p + length:
+            parts = (route_times.before(p), route_times.block(p + length, after), segment,
+                     route_times.after(after + 1))
+        else:
+            parts = (route_times.before(p), segment, route_times.after(p + length))
+        return route_times.combine(*parts)[1]
@@ -1,27 +1,226 @@
+import os
+import glob
+import hashlib
+import tempfile
+import zipfile
 import numpy as np
 import time
 import matplotlib.pyplot as plt
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from path_finder.utils.instrumentation import Instrumentation, guarded
+except ImportError:
+    from utils.instrumentation import Instrumentation, guarded
+
+class QTable:
+    """
+    Q-values for packed (node, visited bitmask) states, stored in a NumPy matrix.
+    
+    Each state owns one float32 row with a value per action; a plain dict maps
+    the packed state key to its row. Actions that were never updated hold
+    -inf. The best value and action of every row are cached in Python lists,
+    so the two lookups done per training step never have to scan a row.
+    
+    With max_states set, the least recently used tenth of the rows is evicted
+    whenever the table is full, so memory stays bounded on long runs.
+    """
+    
+    def __init__(self, num_actions, max_states=None, initial_capacity=1024):
+        self.num_actions = num_actions
+        self.max_states = max_states
+        if max_states is not None:
+            initial_capacity = min(initial_capacity, max_states)
+        
+        self.index = {}
+        self.keys = [None] * initial_capacity
+        self.values = np.full((initial_capacity, num_actions), -np.inf, dtype=np.float32)
+        self.row_best_value = [-np.inf] * initial_capacity
+        self.row_best_action = [-1] * initial_capacity
+        self.last_used = [0] * initial_capacity
+        self.free_rows = list(range(initial_capacity - 1, -1, -1))
+        self.clock = 0
+        self.evictions = 0
+    
+    def __len__(self):
+        return len(self.index)
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the table, in bytes."""
+        per_row = 4 * 8  # best value, best action, last used and key slots
+        per_state = 100  # dict entry plus the packed integer key
+        return self.values.nbytes + len(self.keys) * per_row + len(self.index) * per_state
+    
+    def row(self, key, create=False):
+        """Row index of a state, or -1 if the state is unknown and create is False."""
+        row = self.index.get(key, -1)
+        if row < 0 and create:
+            row = self._allocate(key)
+        if row >= 0:
+            self.clock += 1
+            self.last_used[row] = self.clock
+        return row
+    
+    def _allocate(self, key):
+        if not self.free_rows:
+            if self.max_states is not None and len(self.index) >= self.max_states:
+                self._evict(max(1, self.max_states // 10))
+            else:
+                self._grow()
+        
+        row = self.free_rows.pop()
+        self.index[key] = row
+        self.keys[row] = key
+        self.values[row] = -np.inf
+        self.row_best_value[row] = -np.inf
+        self.row_best_action[row] = -1
+        return row
+    
+    def _grow(self):
+        old = len(self.keys)
+        new = old * 2 if self.max_states is None else min(old * 2, self.max_states)
+        self.values = np.vstack([self.values, np.full((new - old, self.num_actions), -np.inf, dtype=np.float32)])
+        self.row_best_value.extend([-np.inf] * (new - old))
+        self.row_best_action.extend([-1] * (new - old))
+        self.last_used.extend([0] * (new - old))
+        self.keys.extend([None] * (new - old))
+        self.free_rows.extend(range(new - 1, old - 1, -1))
+    
+    def _evict(self, count):
+        for row in np.argsort(self.last_used)[:count]:
+            row = int(row)
+            del self.index[self.keys[row]]
+            self.keys[row] = None
+            self.last_used[row] = 0
+            self.free_rows.append(row)
+        self.evictions += count
+    
+    def get(self, key, action):
+        """Q-value of an action (0 if it was never updated)."""
+        row = self.row(key)
+        if row < 0:
+            return 0.0
+        value = self.values[row, action]
+        return float(value) if value != -np.inf else 0.0
+    
+    def max_value(self, key):
+        """Best known Q-value of a state (0 if the state has no values yet)."""
+        row = self.row(key)
+        if row < 0 or self.row_best_action[row] < 0:
+            return 0.0
+        return self.row_best_value[row]
+    
+    def best_action(self, key):
+        """Action with the highest known Q-value, or None if the state has no values yet."""
+        row = self.row(key)
+        if row < 0 or self.row_best_action[row] < 0:
+            return None
+        return self.row_best_action[row]
+    
+    def to_arrays(self, touched_only=False):
+        """
+        Stored states as (keys, values): a list of packed keys and a (states, actions) matrix.
+        
+        With touched_only, only states read or written since the table was
+        built (or loaded with from_arrays) are included.
+        """
+        keys = [key for key, row in self.index.items() if not touched_only or self.last_used[row] > 0]
+        rows = np.array([self.index[key] for key in keys], dtype=np.intp)
+        return keys, self.values[rows].copy()
+    
+    @classmethod
+    def from_arrays(cls, num_actions, keys, values, max_states=None):
+        """Build a table from the output of to_arrays()."""
+        if max_states is not None:
+            keys, values = keys[:max_states], values[:max_states]
+        
+        table = cls(num_actions, max_states=max_states, initial_capacity=max(1024, len(keys)))
+        count = len(keys)
+        table.index = dict(zip(keys, range(count)))
+        table.keys[:count] = keys
+        table.free_rows = [row for row in table.free_rows if row >= count]
+        
+        if count:
+            table.values[:count] = values
+            table.set_rows(np.arange(count), values.argmax(axis=1), values.max(axis=1))
+        return table
+    
+    def rows(self, keys, create=False):
+        """Row indices for a batch of states (-1 where unknown and create is False)."""
+        return np.array([self.row(key, create) for key in keys], dtype=np.intp)
+    
+    def set_rows(self, rows, actions, values):
+        """
+        Store Q-values for a batch of distinct (row, action) pairs and refresh
+        the cached best action of every touched row.
+        """
+        self.values[rows, actions] = values
+        touched = np.unique(rows)
+        best = self.values[touched].argmax(axis=1)
+        best_values = self.values[touched, best]
+        for row, action, value in zip(touched.tolist(), best.tolist(), best_values.tolist()):
+            self.row_best_action[row] = action if value != -np.inf else -1
+            self.row_best_value[row] = value
+    
+    def set(self, key, action, value):
+        """Store the Q-value of an action."""
+        self.set_row(self.row(key, create=True), action, value)
+    
+    def set_row(self, row, action, value):
+        """Store the Q-value of an action for a row returned by row()."""
+        self.values[row, action] = value
+        value = float(self.values[row, action])  # as stored (float32)
+        
+        if value >= self.row_best_value[row] or self.row_best_action[row] < 0:
+            self.row_best_value[row] = value
+            self.row_best_action[row] = action
+        elif action == self.row_best_action[row]:
+            # The best action got worse: rescan the row
+            best = int(self.values[row].argmax())
+            self.row_best_action[row] = best
+            self.row_best_value[row] = float(self.values[row, best])
+
 
 class QLearning:
     def __init__(self, graph_builder, learning_rate=0.1, discount_factor=0.9, 
-                 exploration_rate=0.1, episodes=1000):
-        """Initialize Q-Learning algorithm for route optimization."""
+                 exploration_rate=0.1, episodes=1000, max_states=None, mask_visited=False,
+                 instrumentation=None):
+        """
+        Initialize Q-Learning algorithm for route optimization.
+        
+        Args:
+            max_states: Optional cap on the number of Q-table states; the least
+                recently used states are evicted once it is reached
+            mask_visited: Only allow moves to unvisited nodes. Every episode then
+                completes in n - 1 steps and no episode is spent learning the
+                revisit penalty, so far fewer episodes are needed to converge
+            instrumentation: Optional Instrumentation (e.g. with memory tracing
+                or profiling enabled); a plain one is used otherwise
+        """
         self.graph_builder = graph_builder
+        self.instrumentation = instrumentation or Instrumentation()
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.exploration_rate = exploration_rate
         self.episodes = episodes
+        self.max_states = max_states
+        self.mask_visited = mask_visited
         self.q_table = None
         self.reward_history = []
+        self._node_bits = 1
+        self._warm_start = None  # (keys, values) set by load_q_table()
     
     def _get_state_key(self, current_node, visited):
-        """Create a unique key for a state (current node + visited nodes)."""
-        # Convert set of visited nodes to a sorted tuple for hashability
-        visited_key = tuple(sorted(visited))
-        return (current_node, visited_key)
+        """
+        Create a unique key for a state (current node + visited nodes).
+        
+        visited is an integer bitmask (bit i set = node i visited); the key packs
+        it together with the current node into a single integer.
+        """
+        return (visited << self._node_bits) | current_node
     
-    def _get_reward(self, from_node, to_node, visited, all_nodes):
+    def _get_reward(self, from_node, to_node, visited, num_visited, num_nodes):
         """
         Define the reward function:
         - Going to an unvisited node: +10
@@ -30,80 +229,115 @@ class QLearning:
         - Step cost based on distance: -distance/1000 (to keep rewards in reasonable range)
         """
         # Base cost (distance-based penalty)
-        distance = self.graph_builder.graph[from_node][to_node]['weight']
+        distance = self._weight_rows[from_node][to_node]
         step_cost = -distance / 1000  # Scale down to keep rewards manageable
         
         # Is this node already visited?
-        if to_node in visited:
+        if visited >> to_node & 1:
             return step_cost - 10  # Penalty for revisiting
         
         # Are we done? (all nodes visited)
-        if len(visited) + 1 == len(all_nodes):
+        if num_visited + 1 == num_nodes:
             return step_cost + 100  # Big bonus for completing tour
         
         # Normal case - new node
         return step_cost + 10  # Reward for visiting new node
     
+    @guarded
     def optimize(self, start=0):
         """Run the Q-learning algorithm to find an optimal path."""
-        start_time = time.time()
+        start_time = time.perf_counter()
+        self.instrumentation.start()
         
         self.graph = self.graph_builder.graph
-        nodes = list(self.graph.nodes())
-        num_nodes = len(nodes)
+        self._weights = self.graph_builder.get_weight_matrix()
+        self._weight_rows = self._weights.tolist()
+        durations = self.graph_builder.get_weight_matrix('duration')
+        num_nodes = len(self._weights)
+        self._node_bits = max(1, (num_nodes - 1).bit_length())
         
-        # Initialize Q-table as a nested defaultdict: state -> action -> q-value
-        self.q_table = defaultdict(lambda: defaultdict(float))
-        
-        # Reset reward history
-        self.reward_history = []
+        # Initialize Q-table: packed state -> row of action values
+        self.q_table = self._new_q_table(num_nodes)
+        self.instrumentation.add_time('setup', time.perf_counter() - start_time)
         
         # Training phase
-        for episode in range(self.episodes):
+        with self.instrumentation.phase('training'):
+            self.reward_history = self._train_episodes(start, num_nodes, self.episodes)
+        
+        return self._build_result(start, num_nodes, durations, start_time)
+    
+    def _train_episodes(self, start, num_nodes, episodes, decay=0.99):
+        """
+        Run training episodes against self.q_table and return their total rewards.
+        
+        The exploration rate is multiplied by decay after every episode.
+        """
+        q_table = self.q_table
+        best_actions = q_table.row_best_action  # grows in place with the table
+        reward_history = []
+        
+        # Neighbour index arrays: every other node is a neighbour in the complete graph
+        neighbor_index = np.array([np.delete(np.arange(num_nodes), node) for node in range(num_nodes)])
+        neighbor_rows = neighbor_index.tolist()
+        total_steps = 0
+        
+        for episode in range(episodes):
             # Start from the designated node
             current_node = start
-            visited = {start}  # Set of visited nodes (including start)
+            visited = 1 << start  # Bitmask of visited nodes (including start)
+            num_visited = 1
             
             total_reward = 0
-            path = [current_node]
             
             # Continue until all nodes are visited or max steps reached
             max_steps = num_nodes * 2  # Allow some backtracking but prevent infinite loops
             step = 0
             
-            while len(visited) < num_nodes and step < max_steps:
-                # Get current state
+            unvisited = np.ones(num_nodes, dtype=bool)
+            unvisited[start] = False
+            
+            # Draw this episode's random numbers in one call instead of one per step
+            explore_draws = (np.random.random(max_steps) < self.exploration_rate).tolist()
+            choice_draws = np.random.random(max_steps).tolist()
+            
+            while num_visited < num_nodes and step < max_steps:
+                # Get current state (its row is created now since it gets updated below)
                 state = self._get_state_key(current_node, visited)
+                row = q_table.row(state, create=True)
                 
-                # Choose action using epsilon-greedy policy
-                if np.random.random() < self.exploration_rate:
-                    # Explore: choose a random neighbor
-                    next_node = np.random.choice(list(self.graph.neighbors(current_node)))
+                # Choose action using epsilon-greedy policy. With masking, a state
+                # only ever stores values for its unvisited neighbours, so the
+                # cached best action is always a valid one.
+                if not explore_draws[step] and best_actions[row] >= 0:
+                    # Exploit: choose the action with the highest Q-value
+                    next_node = best_actions[row]
+                elif self.mask_visited:
+                    # Explore (or nothing learned yet): random unvisited neighbor
+                    options = neighbor_index[current_node]
+                    options = options[unvisited[options]]
+                    next_node = int(options[int(choice_draws[step] * len(options))])
                 else:
-                    # Exploit: choose the best action for this state
-                    # If no values yet in the q_table, default to random
-                    if not self.q_table[state]:
-                        next_node = np.random.choice(list(self.graph.neighbors(current_node)))
-                    else:
-                        # Choose the action with the highest Q-value
-                        next_node = max(self.q_table[state].items(), key=lambda x: x[1])[0]
+                    # Explore (or nothing learned yet): choose a random neighbor
+                    next_node = neighbor_rows[current_node][int(choice_draws[step] * (num_nodes - 1))]
                 
                 # Get reward for this action
-                reward = self._get_reward(current_node, next_node, visited, nodes)
+                reward = self._get_reward(current_node, next_node, visited, num_visited, num_nodes)
                 total_reward += reward
                 
                 # Move to next node
-                visited.add(next_node)
-                path.append(next_node)
-                
-                # Get new state
-                new_state = self._get_state_key(next_node, visited)
+                if not visited >> next_node & 1:
+                    visited |= 1 << next_node
+                    num_visited += 1
+                    unvisited[next_node] = False
                 
                 # Get max Q value for next state
-                max_future_q = max(self.q_table[new_state].values()) if self.q_table[new_state] else 0
+                new_state = self._get_state_key(next_node, visited)
+                max_future_q = q_table.max_value(new_state)
                 
-                # Current Q value
-                current_q = self.q_table[state][next_node]
+                # Current Q value (never-updated actions count as 0)
+                current_q = q_table.values.item(row, next_node)
+                if current_q == -np.inf:
+                    current_q = 0.0
                 
                 # Q-learning update formula
                 new_q = (1 - self.learning_rate) * current_q + self.learning_rate * (
@@ -111,77 +345,441 @@ class QLearning:
                 )
                 
                 # Update Q-table
-                self.q_table[state][next_node] = new_q
+                q_table.set_row(row, next_node, new_q)
                 
                 # Move to the next state
                 current_node = next_node
                 step += 1
             
             # Record rewards for this episode
-            self.reward_history.append(total_reward)
+            reward_history.append(total_reward)
+            total_steps += step
             
             # Decay exploration rate
-            self.exploration_rate = max(0.01, self.exploration_rate * 0.99)
+            self.exploration_rate = max(0.01, self.exploration_rate * decay)
         
+        self.instrumentation.count('episodes', episodes)
+        self.instrumentation.count('steps', total_steps)
+        return reward_history
+    
+    @guarded
+    def optimize_batched(self, start=0, batch_size=64):
+        """
+        Train with batch_size episodes advancing in lockstep.
+        
+        Current nodes, visited sets and rewards of the whole batch are NumPy
+        arrays, and every lockstep step selects actions and applies Q-updates
+        for all episodes at once. Moves are always masked to unvisited nodes,
+        so all episodes of a batch finish together after n - 1 steps.
+        
+        Conflicting updates: when several episodes of a step update the same
+        (state, action) pair, their TD targets are averaged and one update is
+        applied with that mean target. Otherwise updates within a step are
+        independent, and a step's bootstrap values are read before any of its
+        updates are written.
+        
+        The exploration rate decays once per episode, as in optimize().
+        
+        Args:
+            start: The index of the starting node (default is the first node)
+            batch_size: Number of episodes run in lockstep
+        
+        Returns:
+            Same result dictionary as optimize(); reward_history has one entry per episode
+        """
+        start_time = time.perf_counter()
+        self.instrumentation.start()
+        
+        self.graph = self.graph_builder.graph
+        self._weights = self.graph_builder.get_weight_matrix()
+        durations = self.graph_builder.get_weight_matrix('duration')
+        num_nodes = len(self._weights)
+        self._node_bits = max(1, (num_nodes - 1).bit_length())
+        
+        if self.max_states is not None and self.max_states < 2 * batch_size:
+            raise ValueError("max_states must be at least twice the batch size")
+        
+        self.q_table = self._new_q_table(num_nodes)
+        q_table = self.q_table
+        self.reward_history = []
+        training_start = time.perf_counter()
+        self.instrumentation.add_time('setup', training_start - start_time)
+        
+        remaining = self.episodes
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            remaining -= size
+            rewards = self._run_lockstep_batch(start, size, num_nodes)
+            self.reward_history.extend(rewards.tolist())
+            
+            # Decay exploration rate once per episode of the batch
+            self.exploration_rate = max(0.01, self.exploration_rate * 0.99 ** size)
+        
+        self.instrumentation.add_time('training', time.perf_counter() - training_start)
+        self.instrumentation.count('episodes', self.episodes)
+        self.instrumentation.count('steps', self.episodes * (num_nodes - 1))
+        return self._build_result(start, num_nodes, durations, start_time, batch_size=batch_size)
+    
+    def _run_lockstep_batch(self, start, size, num_nodes):
+        """Run one batch of masked episodes in lockstep and return their total rewards."""
+        q_table = self.q_table
+        batch = np.arange(size)
+        shift = self._node_bits
+        
+        current = np.full(size, start, dtype=np.intp)
+        visited = np.zeros((size, num_nodes), dtype=bool)
+        visited[:, start] = True
+        masks = [1 << start] * size
+        totals = np.zeros(size)
+        
+        for step in range(num_nodes - 1):
+            keys = [(mask << shift) | node for mask, node in zip(masks, current.tolist())]
+            rows = q_table.rows(keys, create=True)
+            
+            # Epsilon-greedy over the masked rows
+            masked_q = np.where(visited, -np.inf, q_table.values[rows])
+            greedy = masked_q.argmax(axis=1)
+            known = masked_q[batch, greedy] > -np.inf
+            
+            random_scores = np.random.random((size, num_nodes))
+            random_scores[visited] = -1.0
+            random_choice = random_scores.argmax(axis=1)
+            
+            explore = np.random.random(size) < self.exploration_rate
+            actions = np.where(explore | ~known, random_choice, greedy)
+            
+            # Rewards: step cost plus +10 per new node, +100 for completing the tour
+            bonus = 100.0 if step == num_nodes - 2 else 10.0
+            reward = -self._weights[current, actions] / 1000 + bonus
+            totals += reward
+            
+            # Move to the next states
+            visited[batch, actions] = True
+            masks = [mask | (1 << action) for mask, action in zip(masks, actions.tolist())]
+            next_keys = [(mask << shift) | action for mask, action in zip(masks, actions.tolist())]
+            next_rows = q_table.rows(next_keys)
+            
+            # Bootstrap values are read before this step's updates are written
+            max_future_q = np.zeros(size)
+            seen = next_rows >= 0
+            if seen.any():
+                future = q_table.values[next_rows[seen]].max(axis=1).astype(np.float64)
+                max_future_q[seen] = np.where(np.isfinite(future), future, 0.0)
+            targets = reward + self.discount_factor * max_future_q
+            
+            # Average the targets of identical (state, action) pairs, then update once
+            pairs, inverse = np.unique(rows * num_nodes + actions, return_inverse=True)
+            mean_targets = np.bincount(inverse, weights=targets) / np.bincount(inverse)
+            pair_rows, pair_actions = pairs // num_nodes, pairs % num_nodes
+            
+            current_q = q_table.values[pair_rows, pair_actions].astype(np.float64)
+            current_q[~np.isfinite(current_q)] = 0.0
+            q_table.set_rows(pair_rows, pair_actions,
+                             (1 - self.learning_rate) * current_q + self.learning_rate * mean_targets)
+            
+            current = actions
+        
+        return totals
+    
+    @guarded
+    def optimize_parallel(self, start=0, n_workers=None, rounds=10):
+        """
+        Train with several actor processes and merge their updates in this process.
+        
+        Training is split into rounds. In every round each actor receives a
+        snapshot of the learner's Q-table, runs its share of the episodes with
+        its own random seed and sends back the rows it touched. The learner
+        merges those delta messages: for every (state, action) pair changed by
+        at least one actor, it adds the mean of the actors' changes (a value
+        that was never set counts as 0, as in the update rule).
+        
+        Every actor decays its exploration rate as if its episodes were
+        interleaved with the other actors' episodes, so the overall schedule
+        matches optimize() for the same total number of episodes.
+        
+        Args:
+            start: The index of the starting node (default is the first node)
+            n_workers: Number of actor processes (default: number of CPUs)
+            rounds: Number of snapshot/merge rounds
+        
+        Returns:
+            Same result dictionary as optimize(), plus n_workers and rounds
+        """
+        start_time = time.perf_counter()
+        self.instrumentation.start()
+        
+        self.graph = self.graph_builder.graph
+        self._weights = self.graph_builder.get_weight_matrix()
+        durations = self.graph_builder.get_weight_matrix('duration')
+        num_nodes = len(self._weights)
+        self._node_bits = max(1, (num_nodes - 1).bit_length())
+        n_workers = n_workers or os.cpu_count() or 1
+        rounds = max(1, min(rounds, self.episodes))
+        
+        self.q_table = self._new_q_table(num_nodes)
+        self.reward_history = []
+        
+        params = {
+            'learning_rate': self.learning_rate,
+            'discount_factor': self.discount_factor,
+            'mask_visited': self.mask_visited
+        }
+        decay = 0.99 ** n_workers
+        
+        executor = None
+        if n_workers > 1:
+            executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_actor,
+                                           initargs=(self._weights,))
+        else:
+            _init_actor(self._weights)
+        training_start = time.perf_counter()
+        self.instrumentation.add_time('setup', training_start - start_time)
+        
+        try:
+            round_sizes = np.diff(np.linspace(0, self.episodes, rounds + 1).round().astype(int))
+            for round_episodes in round_sizes:
+                keys, values = self.q_table.to_arrays()
+                shares = np.diff(np.linspace(0, round_episodes, n_workers + 1).round().astype(int))
+                seeds = np.random.randint(2**31 - 1, size=n_workers)
+                jobs = [(params, keys, values, start, int(share), self.exploration_rate, decay, int(seed))
+                        for share, seed in zip(shares, seeds) if share > 0]
+                
+                if executor is None:
+                    results = [_run_actor(*job) for job in jobs]
+                else:
+                    results = list(executor.map(_run_actor, *zip(*jobs)))
+                
+                with self.instrumentation.phase('merge'):
+                    self._merge_actor_updates(results)
+                for _, _, rewards in results:
+                    self.reward_history.extend(rewards)
+                
+                self.exploration_rate = max(0.01, self.exploration_rate * 0.99 ** int(round_episodes))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        # Training includes waiting for the actors and the (nested) merge phase
+        self.instrumentation.add_time('training', time.perf_counter() - training_start)
+        self.instrumentation.count('episodes', self.episodes)
+        return self._build_result(start, num_nodes, durations, start_time, n_workers=n_workers, rounds=rounds)
+    
+    def _merge_actor_updates(self, results):
+        """
+        Apply the mean change per (state, action) pair reported by the actors.
+        
+        Only the rows the actors report are read and written, through a
+        compact index over their union, so a round costs O(touched rows)
+        whatever the size of the table.
+        """
+        q_table = self.q_table
+        for keys, _, _ in results:
+            q_table.rows(keys, create=True)
+        
+        reported = []
+        for keys, values, _ in results:
+            rows = q_table.rows(keys)
+            kept = rows >= 0  # rows can only be missing if max_states forced an eviction
+            reported.append((rows[kept], values[kept].astype(np.float64)))
+        if not reported:
+            return
+        
+        touched, compact = np.unique(np.concatenate([rows for rows, _ in reported]), return_inverse=True)
+        current = q_table.values[touched]
+        base = current.astype(np.float64)
+        base[~np.isfinite(base)] = 0.0
+        change_sum = np.zeros_like(base)
+        change_count = np.zeros(base.shape, dtype=np.int32)
+        
+        offset = 0
+        for rows, values in reported:
+            index = compact[offset:offset + len(rows)]
+            offset += len(rows)
+            changed = np.isfinite(values) & (values != current[index])
+            np.add.at(change_sum, index, np.where(changed, values - base[index], 0.0))
+            np.add.at(change_count, index, changed)
+        
+        changed_rows, changed_actions = np.nonzero(change_count)
+        if len(changed_rows):
+            q_table.set_rows(touched[changed_rows], changed_actions,
+                             base[changed_rows, changed_actions]
+                             + change_sum[changed_rows, changed_actions] / change_count[changed_rows, changed_actions])
+    
+    def _new_q_table(self, num_nodes):
+        """Empty Q-table, or one pre-filled with the states from load_q_table()."""
+        if self._warm_start is None:
+            return QTable(num_nodes, max_states=self.max_states)
+        keys, values = self._warm_start
+        if self.mask_visited and len(keys):
+            # A table saved by an unmasked run holds values for visited nodes;
+            # drop them so the cached best action of every state stays valid
+            mask_bytes = (num_nodes + 7) // 8
+            visited = b''.join((key >> self._node_bits).to_bytes(mask_bytes, 'little') for key in keys)
+            visited = np.unpackbits(np.frombuffer(visited, dtype=np.uint8).reshape(len(keys), mask_bytes),
+                                    axis=1, bitorder='little')[:, :num_nodes].astype(bool)
+            values = np.where(visited, -np.inf, values).astype(np.float32)
+        return QTable.from_arrays(num_nodes, keys, values, max_states=self.max_states)
+    
+    def save_q_table(self, filepath):
+        """
+        Save the trained Q-table to a compressed .npz file.
+        
+        States are stored as the current node plus the visited bitmask in
+        little-endian bytes, together with the stop identifiers (see
+        stop_ids()), so load_q_table() can map them onto another stop set.
+        
+        The file is written next to its destination under a temporary name
+        and then renamed over it, so readers never see a half-written table.
+        """
+        if not filepath.endswith('.npz'):
+            filepath += '.npz'
+        num_nodes = self.q_table.num_actions
+        keys, values = self.q_table.to_arrays()
+        node_mask = (1 << self._node_bits) - 1
+        mask_bytes = (num_nodes + 7) // 8
+        
+        visited = b''.join((key >> self._node_bits).to_bytes(mask_bytes, 'little') for key in keys)
+        directory, name = os.path.split(os.path.abspath(filepath))
+        handle, temporary = tempfile.mkstemp(prefix=f".{name}.", suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    stops=np.array(stop_ids(self.graph_builder.locations_df)),
+                    nodes=np.array([key & node_mask for key in keys], dtype=np.int32),
+                    visited=np.frombuffer(visited, dtype=np.uint8).reshape(len(keys), mask_bytes),
+                    values=values
+                )
+            os.replace(temporary, filepath)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+    
+    def load_q_table(self, filepath, min_overlap=0.5):
+        """
+        Warm-start the next optimize() call from a saved Q-table.
+        
+        The saved stops are matched to the current ones by stop_ids(). Stops
+        only in the saved table are dropped from every state and action;
+        states that then coincide are averaged. Stops only in the current
+        instance start out unvisited and without Q-values.
+        
+        Args:
+            filepath: File written by save_q_table()
+            min_overlap: Minimum share of the current stops that must appear
+                in the saved table; below it nothing is loaded
+        
+        Returns:
+            Number of states loaded (0 if the overlap was too small)
+        """
+        current = stop_ids(self.graph_builder.locations_df)
+        num_nodes = len(current)
+        self._node_bits = max(1, (num_nodes - 1).bit_length())
+        
+        with np.load(filepath) as data:
+            saved_stops = data['stops'].tolist()
+            nodes, visited, values = data['nodes'], data['visited'], data['values']
+        
+        position = {stop: index for index, stop in enumerate(current)}
+        old_to_new = np.array([position.get(stop, -1) for stop in saved_stops], dtype=np.intp)
+        shared = np.flatnonzero(old_to_new >= 0)
+        if len(shared) < min_overlap * num_nodes or len(shared) == 0:
+            self._warm_start = None
+            return 0
+        
+        # Keep the states whose current node still exists, remapped to the new indices
+        kept = old_to_new[nodes] >= 0
+        nodes, visited, values = old_to_new[nodes[kept]], visited[kept], values[kept]
+        
+        old_bits = np.unpackbits(visited, axis=1, bitorder='little')[:, :len(saved_stops)]
+        new_bits = np.zeros((len(nodes), num_nodes), dtype=np.uint8)
+        new_bits[:, old_to_new[shared]] = old_bits[:, shared]
+        new_visited = np.packbits(new_bits, axis=1, bitorder='little')
+        
+        new_values = np.full((len(nodes), num_nodes), -np.inf, dtype=np.float32)
+        new_values[:, old_to_new[shared]] = values[:, shared]
+        
+        # Average the Q-values of states that became identical
+        merged = {}
+        for node, mask_row, row_values in zip(nodes.tolist(), new_visited, new_values):
+            key = (int.from_bytes(mask_row.tobytes(), 'little') << self._node_bits) | node
+            merged.setdefault(key, []).append(row_values)
+        
+        keys = list(merged)
+        rows = []
+        for group in merged.values():
+            if len(group) == 1:
+                rows.append(group[0])
+                continue
+            stacked = np.array(group)
+            known = np.isfinite(stacked)
+            total = np.where(known, stacked, 0.0).sum(axis=0)
+            count = known.sum(axis=0)
+            rows.append(np.where(count > 0, total / np.maximum(count, 1), -np.inf))
+        
+        self._warm_start = (keys, np.array(rows, dtype=np.float32).reshape(len(keys), num_nodes))
+        return len(keys)
+    
+    def _build_result(self, start, num_nodes, durations, start_time, **extra):
+        """Extract the greedy path from the Q-table and assemble the result dictionary."""
         # Find the best path using the trained Q-table
-        best_path = self._get_best_path(start, nodes)
+        with self.instrumentation.phase('path_extraction'):
+            best_path = self._get_best_path(start, num_nodes)
         
         # Calculate distance and duration for the best path
         total_distance = 0
         total_duration = 0
-        for i in range(len(best_path) - 1):
-            from_node = best_path[i]
-            to_node = best_path[i + 1]
-            total_distance += self.graph[from_node][to_node]['weight']
-            total_duration += self.graph[from_node][to_node]['duration']
+        for from_node, to_node in zip(best_path, best_path[1:]):
+            total_distance += self._weights[from_node, to_node]
+            total_duration += durations[from_node, to_node]
         
-        computation_time = time.time() - start_time
+        computation_time = time.perf_counter() - start_time
+        self.instrumentation.gauge('q_table_states', len(self.q_table))
+        self.instrumentation.gauge('q_table_bytes', self.q_table.nbytes)
+        self.instrumentation.gauge('q_table_evictions', self.q_table.evictions)
         
-        return {
+        result = {
             'algorithm': 'Q-Learning',
             'path': best_path,
-            'distance': total_distance,
-            'duration': total_duration,
+            'distance': float(total_distance),
+            'duration': float(total_duration),
             'computation_time': computation_time,
-            'episodes': self.episodes
+            'episodes': self.episodes,
+            'q_table_states': len(self.q_table),
+            'q_table_bytes': self.q_table.nbytes,
+            'q_table_evictions': self.q_table.evictions,
+            'warm_start_states': 0 if self._warm_start is None else len(self._warm_start[0]),
+            'instrumentation': self.instrumentation.stop('Q-Learning')
         }
+        result.update(extra)
+        return result
     
-    def _get_best_path(self, start, nodes):
+    def _get_best_path(self, start, num_nodes):
         """Reconstruct the best path using the trained Q-table."""
         current_node = start
-        visited = {start}
+        visited = 1 << start
         path = [current_node]
         
-        while len(visited) < len(nodes):
+        while len(path) < num_nodes:
             state = self._get_state_key(current_node, visited)
+            next_node = self.q_table.best_action(state)
             
-            # If no Q-values for this state, use a greedy approach
-            if not self.q_table[state]:
-                # Find the closest unvisited node
-                min_distance = float('inf')
-                next_node = None
-                
-                for node in self.graph.neighbors(current_node):
-                    if node not in visited and self.graph[current_node][node]['weight'] < min_distance:
-                        min_distance = self.graph[current_node][node]['weight']
-                        next_node = node
-                
-                # If all neighbors are visited, choose the closest one
-                if next_node is None:
-                    next_node = min(
-                        self.graph.neighbors(current_node),
-                        key=lambda n: self.graph[current_node][n]['weight']
-                    )
-            else:
-                # Choose the best action according to Q-table
-                next_node = max(self.q_table[state].items(), key=lambda x: x[1])[0]
+            # If no Q-values for this state (or the best one revisits), use a greedy approach
+            if next_node is None or visited >> next_node & 1:
+                distances = np.where(self._unvisited_mask(visited, num_nodes), self._weights[current_node], np.inf)
+                next_node = int(np.argmin(distances))
             
-            visited.add(next_node)
+            visited |= 1 << next_node
             path.append(next_node)
             current_node = next_node
         
         return path
     
+    def _unvisited_mask(self, visited, num_nodes):
+        """Boolean array marking the nodes whose bit is not set in visited."""
+        return np.array([not visited >> node & 1 for node in range(num_nodes)])
+    
     def plot_learning_progress(self, figsize=(10, 6), window_size=50):
         """Plot the learning progress (rewards over episodes)."""
         plt.figure(figsize=figsize)
@@ -206,3 +804,105 @@ class QLearning:
         plt.grid(True)
         
         return plt.gcf()
+
+
+def stop_ids(locations_df, decimals=5):
+    """
+    Identifiers of the stops of an instance: coordinates rounded to about a metre.
+    
+    Used to recognise the same stops across runs, whatever their order.
+    """
+    return [f"{lat:.{decimals}f},{lng:.{decimals}f}"
+            for lat, lng in zip(locations_df['lat'], locations_df['lng'])]
+
+
+class QTableStore:
+    """
+    Directory of saved Q-tables, one file per stop set.
+    
+    Files are named after a hash of the sorted stop identifiers, so the same
+    stops in any order share one file. warm_start() loads the exact stop set
+    if it was saved before, otherwise the saved table covering the largest
+    share of the current stops.
+    """
+    
+    def __init__(self, directory="q_tables"):
+        self.directory = directory
+    
+    def path_for(self, stops):
+        """File used for a stop set."""
+        digest = hashlib.sha1("|".join(sorted(stops)).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"qtable_{len(stops)}_{digest}.npz")
+    
+    def save(self, q_learning):
+        """Save the Q-table of a trained QLearning instance under its stop set."""
+        filepath = self.path_for(stop_ids(q_learning.graph_builder.locations_df))
+        os.makedirs(self.directory, exist_ok=True)
+        q_learning.save_q_table(filepath)
+        return filepath
+    
+    def find(self, stops, min_overlap=0.5):
+        """
+        Best saved table for a stop set, or None.
+        
+        Returns the file of the identical stop set if there is one, otherwise
+        the one sharing the most stops (at least min_overlap of them). Files
+        that cannot be read (e.g. not written by save()) are skipped.
+        """
+        exact = self.path_for(stops)
+        if os.path.exists(exact):
+            return exact
+        
+        wanted = set(stops)
+        best_path, best_shared = None, min_overlap * len(stops)
+        for filepath in glob.glob(os.path.join(self.directory, "qtable_*.npz")):
+            try:
+                with np.load(filepath) as data:
+                    shared = len(wanted.intersection(data['stops'].tolist()))
+            except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):
+                continue
+            if shared > best_shared or (best_path is None and shared >= best_shared and shared > 0):
+                best_path, best_shared = filepath, shared
+        return best_path
+    
+    def warm_start(self, q_learning, min_overlap=0.5):
+        """
+        Load the best matching saved table into a QLearning instance.
+        
+        Returns:
+            Number of states loaded (0 if nothing suitable was saved)
+        """
+        filepath = self.find(stop_ids(q_learning.graph_builder.locations_df), min_overlap)
+        if filepath is None:
+            return 0
+        return q_learning.load_q_table(filepath, min_overlap)
+
+
+_ACTOR_WEIGHTS = None
+
+
+def _init_actor(weights):
+    """Share the weight matrix with an actor process once instead of per round."""
+    global _ACTOR_WEIGHTS
+    _ACTOR_WEIGHTS = weights
+
+
+def _run_actor(params, keys, values, start, episodes, exploration_rate, decay, seed):
+    """
+    Run episodes against a Q-table snapshot (one actor, one round).
+    
+    Returns the keys and values of the states the actor touched, plus the
+    total reward of each of its episodes.
+    """
+    np.random.seed(seed)
+    num_nodes = len(_ACTOR_WEIGHTS)
+    
+    actor = QLearning(None, exploration_rate=exploration_rate, **params)
+    actor._weights = _ACTOR_WEIGHTS
+    actor._weight_rows = _ACTOR_WEIGHTS.tolist()
+    actor._node_bits = max(1, (num_nodes - 1).bit_length())
+    actor.q_table = QTable.from_arrays(num_nodes, keys, values)
+    
+    rewards = actor._train_episodes(start, num_nodes, episodes, decay)
+    touched_keys, touched_values = actor.q_table.to_arrays(touched_only=True)
+    return touched_keys, touched_values, rewards
@@ -0,0 +1,392 @@
+import math
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+try:
+    from path_finder.utils.instrumentation import Instrumentation, guarded
+    from path_finder.algorithms.local_search import nearest_neighbours
+except ImportError:
+    from utils.instrumentation import Instrumentation, guarded
+    from algorithms.local_search import nearest_neighbours
+
+
+# Move kinds, sampled with equal probability
+SWAP, INSERT, TWO_OPT = 0, 1, 2
+
+# Weight matrix and neighbour lists shared by the restart workers, set once per process by _init_worker
+_INSTANCE = None
+
+
+def _init_worker(source, neighbours):
+    global _INSTANCE
+    _INSTANCE = (source, neighbours)
+
+
+def _run_restart(path, seed, time_limit, max_moves, settings):
+    """Process entry point: one annealing run on the worker's instance."""
+    return _anneal(*_INSTANCE, path, seed, time_limit, max_moves, **settings)
+
+
+def _weights(source, a, b):
+    """
+    Symmetric weights w(a, b) from the upper triangle of the source matrix,
+    like GraphBuilder.get_weight_matrix(); the sentinel node n (past the end
+    of the path) costs nothing.
+    """
+    n = len(source)
+    low, high = np.minimum(a, b), np.maximum(a, b)
+    return np.where(high < n, source[low, np.minimum(high, n - 1)], 0.0)
+
+
+def _sample_moves(rng, order, position, neighbours, size):
+    """
+    Random moves that put a random node next to one of its nearest neighbours.
+    
+    Returns:
+        (kinds, first, second, valid): positions in 1..n-1 for _move_deltas;
+        moves that would change nothing or move the start node are not valid
+    """
+    n = len(position)
+    kinds = rng.integers(0, 3, size)
+    first = rng.integers(1, n, size)
+    target = position[neighbours[order[first], rng.integers(0, neighbours.shape[1], size)]]
+    
+    # insert: next to the neighbour (after the start node if that is the neighbour);
+    # swap: into the position after the neighbour (before it at the end of the path);
+    # 2-opt: reverse the part between the node and the neighbour, making them adjacent
+    second = np.where(kinds == INSERT, np.maximum(target, 1),
+                      np.where(target + 1 < n, target + 1, target - 1))
+    second = np.where(kinds == TWO_OPT, np.where(target > first, target, target + 1), second)
+    first = np.where((kinds == TWO_OPT) & (target > first), first + 1, first)
+    valid = (second != first) & (second >= 1) & (second < n) & (first < n)
+    return kinds, np.where(valid, first, 1), np.where(valid, second, 2 if n > 2 else 1), valid
+
+
+def _move_deltas(source, order, kinds, first, second):
+    """
+    Change in path length of every sampled move, computed from the matrix in
+    O(1) per move and vectorized over the batch.
+    
+    order is the path followed by the sentinel node n, so position + 1 is
+    always valid. For positions i < j:
+    
+    - swap: exchange the nodes at i and j
+    - insert: move the node at `first` to just after (later in the path) or
+      just before (earlier) the node at `second`
+    - 2-opt: reverse order[i..j]
+    """
+    low, high = np.minimum(first, second), np.maximum(first, second)
+    a, b, c, d = order[low - 1], order[low], order[high], order[high + 1]
+    two_opt = (_weights(source, a, c) + _weights(source, b, d)
+               - _weights(source, a, b) - _weights(source, c, d))
+    
+    # Adjacent swaps are 2-opt moves of length 2; the general formula would count edge b-c twice
+    e, f = order[low + 1], order[high - 1]
+    swap = (_weights(source, a, c) + _weights(source, c, e) + _weights(source, f, b) + _weights(source, b, d)
+            - _weights(source, a, b) - _weights(source, b, e) - _weights(source, f, c) - _weights(source, c, d))
+    swap = np.where(high == low + 1, two_opt, swap)
+    
+    later = second > first
+    x, before, after = order[first], order[first - 1], order[first + 1]
+    p = order[np.where(later, second, second - 1)]
+    q = order[np.where(later, second + 1, second)]
+    insert = (_weights(source, before, after) - _weights(source, before, x) - _weights(source, x, after)
+              + _weights(source, p, x) + _weights(source, x, q) - _weights(source, p, q))
+    
+    return np.choose(kinds, [swap, insert, two_opt])
+
+
+def _apply_move(order, position, kind, first, second):
+    """Apply one move from _move_deltas to order and position (of every node in order) in place."""
+    low, high = min(first, second), max(first, second)
+    if kind == SWAP:
+        order[low], order[high] = order[high], order[low]
+        position[order[low]], position[order[high]] = low, high
+        return
+    elif kind == TWO_OPT:
+        order[low:high + 1] = order[low:high + 1][::-1].copy()
+    elif second > first:
+        node = order[first]
+        order[first:second] = order[first + 1:second + 1].copy()
+        order[second] = node
+    else:
+        node = order[first]
+        order[second + 1:first + 1] = order[second:first].copy()
+        order[second] = node
+    position[order[low:high + 1]] = np.arange(low, high + 1)
+
+
+def _path_cost(source, path):
+    path = np.asarray(path)
+    return float(source[np.minimum(path[:-1], path[1:]), np.maximum(path[:-1], path[1:])].sum())
+
+
+def _anneal(source, neighbours, path, seed, time_limit, max_moves, initial_acceptance=0.1, final_acceptance=0.001,
+            epoch_moves=2000, sample_moves=1000):
+    """
+    One annealing run from path; stops after time_limit seconds or max_moves evaluated moves.
+    
+    Moves are drawn in batches and their deltas computed together; the batch
+    is then scanned in order and the first move passing the Metropolis test
+    is applied. Rejected moves leave the route unchanged, so this accepts
+    exactly the moves a one-at-a-time loop would, and the rest of the batch
+    (now stale) is dropped. The batch size follows the acceptance rate, so
+    few deltas are wasted while many moves are accepted and most of the
+    Python overhead disappears once few are.
+    
+    Returns:
+        (best path, best cost, stats dict, history dict with time and best)
+    """
+    start_time = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    n = len(path)
+    order = np.append(np.asarray(path, dtype=np.intp), n)
+    position = np.empty(n, dtype=np.intp)
+    position[order[:n]] = np.arange(n)
+    cost = best_cost = _path_cost(source, path)
+    stats = {'moves_evaluated': 0, 'moves_accepted': 0, 'epochs': 0}
+    history = {'time': [0.0], 'best': [best_cost]}
+    if n < 3:
+        stats['final_temperature'] = 0.0
+        return [int(node) for node in path], best_cost, stats, history
+    
+    # Start hot enough that a typical worsening move is accepted with initial_acceptance
+    kinds, first, second, valid = _sample_moves(rng, order, position, neighbours, sample_moves)
+    deltas = _move_deltas(source, order, kinds, first, second)
+    uphill = deltas[valid & (deltas > 0)]
+    temperature = -uphill.mean() / math.log(initial_acceptance) if len(uphill) else 1.0
+    
+    # The best route is copied only when the search leaves it, not at every improvement
+    best_order = order.copy()
+    at_best = True
+    acceptance = initial_acceptance
+    
+    while True:
+        elapsed = time.perf_counter() - start_time
+        done = 0.0
+        if time_limit is not None:
+            done = elapsed / time_limit
+        if max_moves is not None:
+            done = max(done, stats['moves_evaluated'] / max_moves)
+        if done >= 1.0:
+            break
+        
+        # Adaptive cooling: the target acceptance rate decays geometrically over
+        # the budget, and the temperature is corrected towards it after every epoch
+        target = initial_acceptance * (final_acceptance / initial_acceptance) ** done
+        evaluated = accepted = 0
+        while evaluated < epoch_moves:
+            batch = int(min(4096, max(8, 2 / max(acceptance, 1e-4))))
+            kinds, first, second, valid = _sample_moves(rng, order, position, neighbours, batch)
+            deltas = _move_deltas(source, order, kinds, first, second)
+            passed = valid & ((deltas <= 0) | (rng.random(batch) < np.exp(-np.maximum(deltas, 0) / temperature)))
+            if not passed.any():
+                evaluated += batch
+                continue
+            
+            index = int(np.argmax(passed))
+            evaluated += index + 1
+            accepted += 1
+            delta = float(deltas[index])
+            if delta > 0 and at_best:
+                best_order = order.copy()
+                at_best = False
+            _apply_move(order, position, kinds[index], int(first[index]), int(second[index]))
+            cost += delta
+            if cost < best_cost - 1e-9:
+                best_cost = cost
+                at_best = True
+            if time_limit is not None and time.perf_counter() - start_time >= time_limit:
+                break
+        
+        stats['moves_evaluated'] += evaluated
+        stats['moves_accepted'] += accepted
+        stats['epochs'] += 1
+        acceptance = max(accepted / max(evaluated, 1), 1e-4)
+        temperature *= min(2.0, max(0.5, math.sqrt(target / acceptance)))
+        history['time'].append(time.perf_counter() - start_time)
+        history['best'].append(best_cost)
+    
+    if at_best:
+        best_order = order
+    path = [int(node) for node in best_order[:n]]
+    stats['final_temperature'] = temperature
+    return path, _path_cost(source, path), stats, history
+
+
+class SimulatedAnnealing:
+    def __init__(self, graph_builder, time_limit=10.0, max_moves=None, restarts=4, max_workers=None, neighbours=10,
+                 initial_acceptance=0.1, final_acceptance=0.001, seed=None, instrumentation=None):
+        """
+        Simulated annealing over swap, insert and 2-opt moves.
+        
+        The route is an open path from a fixed start node. Every move puts a
+        random node next to one of its k nearest neighbours (by swapping,
+        inserting or reversing the part of the path between them), and its
+        change in length is computed in O(1) from the weight matrix (the upper
+        triangle, as in GraphBuilder.get_weight_matrix()), many moves at a
+        time with NumPy. The temperature is set from the deltas of sampled
+        moves and then steered so the acceptance rate follows a target that
+        decays from initial_acceptance to final_acceptance over the budget,
+        so the same schedule adapts to any instance and time limit.
+        
+        Independent restarts (different seeds, same start route) run in
+        parallel processes and the best route is kept. The whole run, including
+        the start route, stays within time_limit: with fewer workers than
+        restarts the restarts share it in rounds. Inside a daemonic process
+        (e.g. a ConcurrentRunner job) they run one after another.
+        
+        Args:
+            graph_builder: GraphBuilder with the distance and duration matrices
+            time_limit: Wall time budget in seconds for the whole optimization (None = max_moves only)
+            max_moves: Optional number of evaluated moves per restart, for reproducible runs
+            restarts: Number of independent annealing runs
+            max_workers: Processes running restarts (default: one per CPU, at most restarts)
+            neighbours: Candidate list length per node; every move puts a node
+                next to one of its candidates
+            initial_acceptance: Share of moves accepted at the start
+            final_acceptance: Share of moves accepted at the end
+            seed: Seed of the first restart; restart r uses seed + r. None
+                draws it from NumPy's global generator, so runs seeded with
+                np.random.seed() (e.g. replicates) differ from each other and
+                are reproducible like the other solvers
+            instrumentation: Optional Instrumentation to time the phases
+        """
+        if graph_builder is None:
+            raise ValueError("graph_builder must be provided!")
+        if time_limit is None and max_moves is None:
+            raise ValueError("time_limit or max_moves must be set")
+        if not 0 < final_acceptance < initial_acceptance < 1:
+            raise ValueError("Acceptance rates must satisfy 0 < final_acceptance < initial_acceptance < 1")
+        
+        self.graph_builder = graph_builder
+        self.time_limit = time_limit
+        self.max_moves = max_moves
+        self.restarts = max(1, restarts)
+        self.max_workers = max_workers
+        self.neighbours = neighbours
+        self.initial_acceptance = initial_acceptance
+        self.final_acceptance = final_acceptance
+        self.seed = int(np.random.randint(2**31 - 1)) if seed is None else seed
+        self.instrumentation = instrumentation or Instrumentation()
+        self.history = {'time': [], 'best': []}
+        
+        self._distances = np.asarray(graph_builder.distance_matrix, dtype=np.float64)
+        self._durations = np.asarray(graph_builder.duration_matrix, dtype=np.float64)
+        self._source = self._durations if graph_builder.weight_type == 'duration' else self._distances
+    
+    def _nearest_neighbour_path(self, start):
+        """Greedy start route: always go to the nearest unvisited node."""
+        source = self._source
+        n = len(source)
+        visited = np.zeros(n, dtype=bool)
+        visited[start] = True
+        path = [start]
+        current = start
+        for _ in range(n - 1):
+            row = np.concatenate([source[:current, current], source[current, current:]])
+            current = int(np.argmin(np.where(visited, np.inf, row)))
+            visited[current] = True
+            path.append(current)
+        return path
+    
+    @guarded
+    def optimize(self, start=0, initial_path=None):
+        """
+        Anneal from a nearest-neighbour route (or initial_path) in every restart and keep the best.
+        
+        Args:
+            start: The index of the starting node (ignored with initial_path)
+            initial_path: Optional route to start from; its first node stays first
+        
+        Returns:
+            Dictionary with the result: path, distance, duration, and computation time
+        """
+        start_time = time.perf_counter()
+        instrumentation = self.instrumentation
+        instrumentation.start()
+        
+        with instrumentation.phase('neighbour_lists'):
+            neighbour_lists = nearest_neighbours(self._source, self.neighbours)
+        
+        with instrumentation.phase('construction'):
+            if initial_path is not None:
+                path = [int(node) for node in initial_path]
+            else:
+                path = self._nearest_neighbour_path(start)
+        initial_distance = _path_cost(self._distances, path)
+        
+        with instrumentation.phase('annealing'):
+            runs = self._run_restarts(path, neighbour_lists, start_time)
+        
+        best_path, _, _, _ = min(runs, key=lambda run: run[1])
+        for name in ('moves_evaluated', 'moves_accepted', 'epochs'):
+            instrumentation.count(name, sum(run[2][name] for run in runs))
+        
+        # Best route found so far over the whole run, across restarts
+        points = sorted((t, best) for run in runs for t, best in zip(run[3]['time'], run[3]['best']))
+        self.history = {'time': [t for t, _ in points],
+                        'best': np.minimum.accumulate([best for _, best in points]).tolist()}
+        
+        distance = _path_cost(self._distances, best_path)
+        computation_time = time.perf_counter() - start_time
+        
+        return {
+            'algorithm': 'Simulated Annealing',
+            'path': best_path,
+            'distance': distance,
+            'duration': _path_cost(self._durations, best_path),
+            'computation_time': computation_time,
+            'initial_distance': initial_distance,
+            'improvement_pct': 100 * (initial_distance - distance) / initial_distance if initial_distance else 0.0,
+            'restarts': len(runs),
+            'restart_distances': [_path_cost(self._distances, run[0]) for run in runs],
+            'instrumentation': instrumentation.stop('Simulated Annealing')
+        }
+    
+    def _run_restarts(self, path, neighbour_lists, start_time):
+        """
+        Run every restart within what is left of the time budget.
+        
+        Returns:
+            List of (path, cost, stats, history) with history times measured from start_time
+        """
+        settings = {'initial_acceptance': self.initial_acceptance, 'final_acceptance': self.final_acceptance}
+        seeds = [self.seed + r for r in range(self.restarts)]
+        max_workers = min(self.max_workers or os.cpu_count() or 1, self.restarts)
+        # Processes started by ConcurrentRunner are daemonic and cannot have children
+        if mp.current_process().daemon:
+            max_workers = 1
+        
+        def remaining():
+            return None if self.time_limit is None else max(0.0, self.time_limit - (time.perf_counter() - start_time))
+        
+        def shifted(run, offset):
+            route, cost, stats, history = run
+            return route, cost, stats, {'time': [t + offset for t in history['time']], 'best': history['best']}
+        
+        runs = []
+        if max_workers <= 1:
+            for index, seed in enumerate(seeds):
+                left = remaining()
+                limit = None if left is None else left / (len(seeds) - index)
+                offset = time.perf_counter() - start_time
+                run = _anneal(self._source, neighbour_lists, path, seed, limit, self.max_moves, **settings)
+                runs.append(shifted(run, offset))
+            return runs
+        
+        rounds = math.ceil(len(seeds) / max_workers)
+        # Starting the workers and sending them the matrix takes a share of the budget
+        left = remaining()
+        limit = None if left is None else 0.9 * left / rounds
+        offset = time.perf_counter() - start_time
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(self._source, neighbour_lists)) as executor:
+            futures = [executor.submit(_run_restart, path, seed, limit, self.max_moves, settings) for seed in seeds]
+            for future in as_completed(futures):
+                runs.append(shifted(future.result(), offset))
+        return runs
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Run the route solvers on synthetic or TSPLIB instances and record the results.
+
+Each (instance, solver) row holds the route distance, wall time, peak traced
+memory, evaluations and gap to the best known distance. Solvers are skipped
+on instances larger than their default limit unless --no-limits is given.
+Results can be written to JSON/CSV and compared against an earlier JSON run.
+
+Usage (from the path_finder directory):
+    python -m benchmarks --sizes 10 50 200 1000 --kinds uniform clustered --output run.json
+    python -m benchmarks --tsplib berlin52.tsp --solvers greedy-astar ga --csv berlin.csv
+    python -m benchmarks --sizes 10 50 200 --baseline run.json --fail-on-regression
+"""
+
+import argparse
+import json
+import sys
+
+try:
+    from path_finder.benchmarks.instances import REGIONS
+    from path_finder.benchmarks.suite import (SOLVERS, make_instances, run_suite, save_results,
+                                              load_results, compare_to_baseline)
+except ImportError:
+    from benchmarks.instances import REGIONS
+    from benchmarks.suite import (SOLVERS, make_instances, run_suite, save_results,
+                                  load_results, compare_to_baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[5, 10, 20, 50, 100, 200])
+    parser.add_argument('--kinds', nargs='+', choices=['uniform', 'clustered'], default=['uniform'])
+    parser.add_argument('--region', choices=sorted(REGIONS), default='dhaka')
+    parser.add_argument('--seeds', type=int, default=1, help="generated instances per kind and size")
+    parser.add_argument('--tsplib', nargs='+', default=[], metavar='FILE', help="TSPLIB .tsp files to add")
+    parser.add_argument('--solvers', nargs='+', choices=sorted(SOLVERS), default=sorted(SOLVERS))
+    parser.add_argument('--no-limits', action='store_true', help="run every solver on every size")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc run")
+    parser.add_argument('--best-known', metavar='FILE',
+                        help="JSON object mapping instance names to best known open-path distances")
+    parser.add_argument('--output', metavar='FILE', help="write results (and run metadata) as JSON")
+    parser.add_argument('--csv', metavar='FILE', help="write results as CSV")
+    parser.add_argument('--baseline', metavar='FILE', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--time-tolerance', type=float, default=0.10, help="allowed slowdown vs baseline (fraction)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit with status 1 on a regression")
+    args = parser.parse_args()
+    
+    best_known = {}
+    if args.best_known:
+        with open(args.best_known) as f:
+            best_known = json.load(f)
+    
+    baseline_rows = load_results(args.baseline) if args.baseline else []
+    for row in baseline_rows:
+        best_known[row['instance']] = min(row['distance'], best_known.get(row['instance'], float('inf')))
+    
+    print(f"{'instance':<28} {'solver':<18} {'distance':>12} {'gap %':>7} {'time (s)':>9} "
+          f"{'peak MiB':>9} {'evaluations':>12}")
+    
+    def show(row):
+        memory = '-' if row['peak_memory_mib'] is None else f"{row['peak_memory_mib']:.1f}"
+        print(f"{row['instance']:<28} {row['solver']:<18} {row['distance']:>12.0f} {row['gap_percent']:>7.2f} "
+              f"{row['wall_time']:>9.3f} {memory:>9} {row['evaluations']:>12}", flush=True)
+    
+    instances = make_instances(args.kinds, args.sizes, args.seeds, args.region, args.tsplib)
+    rows = run_suite(instances, args.solvers, measure_memory=not args.no_memory,
+                     respect_limits=not args.no_limits, best_known=best_known, progress=show)
+    save_results(rows, args.output, args.csv)
+    
+    if baseline_rows:
+        comparisons = compare_to_baseline(rows, baseline_rows, time_tolerance=args.time_tolerance)
+        print()
+        print(f"{'instance':<28} {'solver':<18} {'time x':>8} {'distance %':>11} {'':>10}")
+        for comparison in comparisons:
+            flag = 'REGRESSED' if comparison['regressed'] else ''
+            print(f"{comparison['instance']:<28} {comparison['solver']:<18} {comparison['time_ratio']:>8.2f} "
+                  f"{100 * comparison['distance_change']:>11.2f} {flag:>10}")
+        
+        if args.fail_on_regression and any(comparison['regressed'] for comparison in comparisons):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
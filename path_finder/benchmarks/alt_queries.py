@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Benchmark ALT landmarks against the haversine heuristic in AStar.a_star_search.
+
+Builds a sparse road-like grid (each street segment is 0-50% longer than the
+straight line, some segments are missing), runs the same random queries with
+both heuristics and reports expanded nodes, query time and the speedup.
+
+Usage (from the path_finder directory):
+    python -m benchmarks.alt_queries --side 150 --queries 100 --landmarks 8
+"""
+
+import argparse
+import time
+import numpy as np
+import networkx as nx
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.algorithms.a_star import AStar
+    from path_finder.benchmarks.instances import DHAKA_BBOX, haversine_matrix
+except ImportError:
+    from utils.graph import GraphBuilder
+    from algorithms.a_star import AStar
+    from benchmarks.instances import DHAKA_BBOX, haversine_matrix
+
+
+def road_grid(side, seed=0, drop=0.15, bbox=DHAKA_BBOX):
+    """Sparse grid graph with jittered coordinates and detoured edge lengths."""
+    rng = np.random.default_rng(seed)
+    lat = np.linspace(bbox[0], bbox[1], side)[:, None] + rng.normal(0, 2e-4, (side, side))
+    lng = np.linspace(bbox[2], bbox[3], side)[None, :] + rng.normal(0, 2e-4, (side, side))
+    
+    graph = nx.Graph()
+    for i in range(side):
+        for j in range(side):
+            graph.add_node((i, j), lat=lat[i, j], lng=lng[i, j])
+    
+    for i in range(side):
+        for j in range(side):
+            for di, dj in ((1, 0), (0, 1)):
+                if i + di < side and j + dj < side and rng.random() > drop:
+                    pair_lat = np.array([lat[i, j], lat[i + di, j + dj]])
+                    pair_lng = np.array([lng[i, j], lng[i + di, j + dj]])
+                    straight = haversine_matrix(pair_lat, pair_lng)[0, 1]
+                    graph.add_edge((i, j), (i + di, j + dj), weight=straight * rng.uniform(1.0, 1.5))
+    
+    largest = max(nx.connected_components(graph), key=len)
+    return graph.subgraph(largest).copy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--side', type=int, default=150, help="grid side length (nodes = side^2)")
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--landmarks', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    graph = road_grid(args.side, seed=args.seed)
+    graph_builder = GraphBuilder()
+    graph_builder.graph = graph
+    astar = AStar(graph_builder)
+    
+    t0 = time.perf_counter()
+    astar.prepare_landmarks(args.landmarks)
+    preprocessing = time.perf_counter() - t0
+    print(f"Graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges; "
+          f"{args.landmarks} landmarks in {preprocessing:.2f} s")
+    
+    rng = np.random.default_rng(args.seed + 1)
+    nodes = list(graph.nodes())
+    queries = [(nodes[a], nodes[b]) for a, b in rng.integers(len(nodes), size=(args.queries, 2))]
+    
+    totals = {}
+    lengths = {}
+    for heuristic in ('haversine', 'alt'):
+        expanded = 0
+        t0 = time.perf_counter()
+        lengths[heuristic] = []
+        for start, goal in queries:
+            path = astar.a_star_search(start, goal, heuristic=heuristic)
+            expanded += astar.last_search_stats['expanded']
+            lengths[heuristic].append(sum(graph[a][b]['weight'] for a, b in zip(path, path[1:])))
+        totals[heuristic] = (expanded / len(queries), (time.perf_counter() - t0) / len(queries))
+    
+    same = np.allclose(lengths['haversine'], lengths['alt'])
+    print(f"{'heuristic':>10} {'expanded/query':>15} {'ms/query':>9}")
+    for heuristic, (expanded, seconds) in totals.items():
+        print(f"{heuristic:>10} {expanded:>15.0f} {seconds * 1000:>9.2f}")
+    print(f"ALT expands {totals['haversine'][0] / totals['alt'][0]:.1f}x fewer nodes, "
+          f"{totals['haversine'][1] / totals['alt'][1]:.1f}x faster; identical lengths: {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Benchmark the lookahead heuristics of AStar.find_optimal_path.
+
+Compares the original per-candidate recomputation with the incremental
+'nearest' estimate (and optionally the 'mst' estimate) for n = 10...500,
+and checks that the 'nearest' tours match the original ones.
+
+With --window-minutes, both heuristics also build routes under random time
+windows of that width (see instances.random_time_windows), and the time
+warp they report is checked against a simulation of the route.
+
+Usage (from the path_finder directory):
+    python -m benchmarks.astar_heuristic --sizes 10 20 50 100 200 500
+    python -m benchmarks.astar_heuristic --sizes 50 200 --window-minutes 30
+"""
+
+import argparse
+import time
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.algorithms.a_star import AStar
+    from path_finder.benchmarks.instances import random_time_windows, uniform_instance
+except ImportError:
+    from utils.graph import GraphBuilder
+    from algorithms.a_star import AStar
+    from benchmarks.instances import random_time_windows, uniform_instance
+
+
+def reference_find_optimal_path(graph, start=0):
+    """The original lookahead: recompute every remaining minimum edge per candidate."""
+    unvisited = set(graph.nodes())
+    unvisited.remove(start)
+    current_path = [start]
+    
+    while unvisited:
+        current = current_path[-1]
+        best_next_node = None
+        best_cost = float('inf')
+        
+        for next_node in unvisited:
+            g_cost = graph[current][next_node]['weight']
+            h_cost = 0
+            if len(unvisited) > 1:
+                remaining = unvisited.copy()
+                remaining.remove(next_node)
+                min_edges = []
+                for node in remaining:
+                    min_edge = float('inf')
+                    for other in remaining:
+                        if node != other:
+                            min_edge = min(min_edge, graph[node][other]['weight'])
+                    if min_edge != float('inf'):
+                        min_edges.append(min_edge)
+                if min_edges:
+                    h_cost = sum(min_edges)
+            
+            f_cost = g_cost + h_cost
+            if f_cost < best_cost:
+                best_cost = f_cost
+                best_next_node = next_node
+        
+        current_path.append(best_next_node)
+        unvisited.remove(best_next_node)
+    
+    return current_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 20, 50, 100, 200, 500])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reference-max', type=int, default=50,
+                        help="largest n to run the original O(n^4) lookahead on")
+    parser.add_argument('--mst-max', type=int, default=200,
+                        help="largest n to run the 'mst' heuristic on")
+    parser.add_argument('--window-minutes', type=float, default=None,
+                        help="also build routes under random time windows of this width")
+    args = parser.parse_args()
+    
+    print(f"{'n':>5} {'reference (s)':>14} {'nearest (s)':>12} {'mst (s)':>9} "
+          f"{'identical':>10} {'nearest dist':>13} {'mst dist':>10}")
+    
+    for n in args.sizes:
+        locations_df, distances, durations = uniform_instance(n, seed=args.seed)
+        graph_builder = GraphBuilder(locations_df, distances, durations)
+        astar = AStar(graph_builder)
+        
+        result = astar.find_optimal_path(heuristic='nearest')
+        
+        reference_time = identical = '-'
+        if n <= args.reference_max:
+            graph_builder.build_complete_graph()
+            t0 = time.perf_counter()
+            reference_path = reference_find_optimal_path(graph_builder.graph)
+            reference_time = f"{time.perf_counter() - t0:.3f}"
+            identical = str(reference_path == result['path'])
+        
+        mst_time = mst_distance = '-'
+        if n <= args.mst_max:
+            mst_result = astar.find_optimal_path(heuristic='mst')
+            mst_time = f"{mst_result['computation_time']:.3f}"
+            mst_distance = f"{mst_result['distance']:.0f}"
+        
+        print(f"{n:>5} {reference_time:>14} {result['computation_time']:>12.3f} {mst_time:>9} "
+              f"{identical:>10} {result['distance']:>13.0f} {mst_distance:>10}")
+    
+    if args.window_minutes is not None:
+        check_time_windows(args)
+
+
+def check_time_windows(args):
+    """Build routes under time windows with both heuristics and check the reported time warp."""
+    print(f"\nTime windows of {args.window_minutes:g} minutes")
+    print(f"{'n':>5} {'heuristic':>9} {'time (s)':>9} {'time warp (min)':>16} {'feasible':>9} {'checked':>8}")
+    
+    for n in args.sizes:
+        locations_df, distances, durations = uniform_instance(n, seed=args.seed)
+        graph_builder = GraphBuilder(locations_df, distances, durations)
+        windows = random_time_windows(graph_builder.get_weight_matrix('duration'), args.window_minutes,
+                                      seed=args.seed)
+        
+        for heuristic in ('nearest', 'mst'):
+            if heuristic == 'mst' and n > args.mst_max:
+                continue
+            result = AStar(graph_builder).find_optimal_path(heuristic=heuristic, time_windows=windows)
+            simulated = windows.time_warp(result['path'], graph_builder.get_weight_matrix('duration'))
+            checked = (sorted(result['path']) == list(range(n))
+                       and abs(simulated - result['time_warp']) <= 1e-6 * max(1.0, simulated))
+            print(f"{n:>5} {heuristic:>9} {result['computation_time']:>9.3f} {result['time_warp'] / 60:>16.1f} "
+                  f"{str(result['feasible']):>9} {str(checked):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Benchmark AStar.find_beam_path over beam widths.
+
+Reports time and route length per width so the latency/quality trade-off
+between the greedy lookahead (width 1) and wider beams can be read directly.
+
+Usage (from the path_finder directory):
+    python -m benchmarks.beam_width --sizes 50 100 200 500 --widths 1 4 16 64
+"""
+
+import argparse
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.algorithms.a_star import AStar
+    from path_finder.benchmarks.instances import uniform_instance
+except ImportError:
+    from utils.graph import GraphBuilder
+    from algorithms.a_star import AStar
+    from benchmarks.instances import uniform_instance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 200, 500])
+    parser.add_argument('--widths', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    print(f"{'n':>5} {'width':>6} {'time (s)':>9} {'distance':>10} {'vs width 1 %':>13}")
+    
+    for n in args.sizes:
+        locations_df, distances, durations = uniform_instance(n, seed=args.seed)
+        astar = AStar(GraphBuilder(locations_df, distances, durations))
+        
+        baseline = None
+        for width in args.widths:
+            result = astar.find_beam_path(beam_width=width)
+            baseline = baseline or result['distance']
+            change = 100 * (result['distance'] - baseline) / baseline
+            print(f"{n:>5} {width:>6} {result['computation_time']:>9.3f} {result['distance']:>10.0f} {change:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
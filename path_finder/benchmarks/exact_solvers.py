@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Benchmark the exact solvers and measure how far the heuristics are from optimal.
+
+Held-Karp provides the optimal open-path cost; the exact A* must match it,
+and the greedy A* lookahead is reported as a gap to that optimum.
+
+Usage (from the path_finder directory):
+    python -m benchmarks.exact_solvers --sizes 8 12 16 20
+"""
+
+import argparse
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.algorithms.a_star import AStar
+    from path_finder.algorithms.held_karp import HeldKarp
+    from path_finder.benchmarks.instances import uniform_instance
+except ImportError:
+    from utils.graph import GraphBuilder
+    from algorithms.a_star import AStar
+    from algorithms.held_karp import HeldKarp
+    from benchmarks.instances import uniform_instance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 12, 16, 20])
+    parser.add_argument('--seeds', type=int, default=3, help="instances per size")
+    args = parser.parse_args()
+    
+    print(f"{'n':>4} {'seed':>5} {'held-karp (s)':>14} {'exact A* (s)':>13} {'match':>6} {'greedy gap %':>13}")
+    
+    for n in args.sizes:
+        for seed in range(args.seeds):
+            locations_df, distances, durations = uniform_instance(n, seed=seed)
+            graph_builder = GraphBuilder(locations_df, distances, durations)
+            
+            optimum = HeldKarp(graph_builder).optimize()
+            exact = AStar(graph_builder).find_exact_path()
+            greedy = AStar(graph_builder).find_optimal_path()
+            
+            match = abs(exact['distance'] - optimum['distance']) <= 1e-6 * optimum['distance']
+            gap = 100 * (greedy['distance'] - optimum['distance']) / optimum['distance']
+            
+            print(f"{n:>4} {seed:>5} {optimum['computation_time']:>14.3f} {exact['computation_time']:>13.3f} "
+                  f"{str(match):>6} {gap:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+import os
+import math
+import numpy as np
+import pandas as pd
+
+try:
+    from path_finder.utils.time_windows import TimeWindows
+except ImportError:
+    from utils.time_windows import TimeWindows
+
+# Rough bounding boxes (lat_min, lat_max, lng_min, lng_max)
+DHAKA_BBOX = (23.70, 23.90, 90.35, 90.45)  # central Dhaka
+NYC_BBOX = (40.70, 40.80, -74.02, -73.93)  # Manhattan
+
+REGIONS = {'dhaka': DHAKA_BBOX, 'nyc': NYC_BBOX}
+
+
+def haversine_matrix(lat, lng):
+    """Great circle distances (meters) between every pair of coordinates."""
+    lat, lng = np.radians(lat), np.radians(lng)
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2.0)**2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2.0)**2
+    return 2 * np.arcsin(np.sqrt(a)) * 6371 * 1000
+
+
+def uniform_instance(n, seed=0, bbox=DHAKA_BBOX, speed_kmh=30):
+    """
+    Generate n stops spread uniformly over a bounding box.
+    
+    Distances are rounded to whole meters and durations to whole seconds,
+    like the values returned by the Distance Matrix API.
+    
+    Returns:
+        (locations_df, distance_matrix, duration_matrix)
+    """
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(bbox[0], bbox[1], n)
+    lng = rng.uniform(bbox[2], bbox[3], n)
+    return _geo_instance(lat, lng, speed_kmh)
+
+
+def clustered_instance(n, seed=0, bbox=DHAKA_BBOX, clusters=None, spread=0.05, speed_kmh=30):
+    """
+    Generate n stops grouped around a few centres, like deliveries in separate neighbourhoods.
+    
+    Args:
+        clusters: Number of centres (default: about sqrt(n) / 2, at least 2)
+        spread: Standard deviation of a cluster as a fraction of the bounding box
+    
+    Returns:
+        (locations_df, distance_matrix, duration_matrix)
+    """
+    rng = np.random.default_rng(seed)
+    clusters = clusters or max(2, int(round(math.sqrt(n) / 2)))
+    centre_lat = rng.uniform(bbox[0], bbox[1], clusters)
+    centre_lng = rng.uniform(bbox[2], bbox[3], clusters)
+    
+    member = rng.integers(clusters, size=n)
+    lat = np.clip(rng.normal(centre_lat[member], spread * (bbox[1] - bbox[0])), bbox[0], bbox[1])
+    lng = np.clip(rng.normal(centre_lng[member], spread * (bbox[3] - bbox[2])), bbox[2], bbox[3])
+    return _geo_instance(lat, lng, speed_kmh)
+
+
+def random_time_windows(durations, width_minutes, seed=0, service_time=0.0, start=0, tour=None):
+    """
+    Time windows of a fixed width around the arrival times of a tour.
+    
+    Every stop except the tour's first gets a window of width_minutes that
+    contains its arrival on the tour, so at least that route meets every
+    window. The default tour is a random ordering of the stops from start,
+    which most orderings (and greedy constructions) are far from; windows
+    around a good tour (e.g. a LocalSearch path) can mostly be met by a short route.
+    
+    Returns:
+        utils.time_windows.TimeWindows
+    """
+    rng = np.random.default_rng(seed)
+    n = len(durations)
+    width = width_minutes * 60.0
+    if tour is None:
+        tour = np.concatenate([[start], rng.permutation(np.delete(np.arange(n), start))])
+    tour = np.asarray(tour, dtype=np.intp)
+    start = tour[0]
+    
+    arrival = np.zeros(n)
+    arrival[tour[1:]] = np.cumsum(np.asarray(durations, dtype=np.float64)[tour[:-1], tour[1:]] + service_time)
+    earliest = np.maximum(arrival - rng.uniform(0.0, width, n), 0.0)
+    latest = earliest + width
+    earliest[start], latest[start] = -np.inf, np.inf
+    return TimeWindows(earliest, latest, np.full(n, float(service_time)))
+
+
+def _geo_instance(lat, lng, speed_kmh):
+    """Locations and rounded distance/duration matrices for coordinates in degrees."""
+    n = len(lat)
+    locations_df = pd.DataFrame({
+        'address': [f"Stop {i}" for i in range(n)],
+        'lat': lat,
+        'lng': lng
+    })
+    
+    distances = np.round(haversine_matrix(lat, lng))
+    durations = np.round(distances / (speed_kmh * 1000 / 3600))
+    
+    return locations_df, distances, durations
+
+
+def load_tsplib(filepath):
+    """
+    Load a symmetric TSPLIB instance (.tsp file).
+    
+    Supports NODE_COORD_SECTION with EUC_2D, CEIL_2D, ATT and GEO distances,
+    and EXPLICIT weights in the FULL_MATRIX, UPPER_ROW, LOWER_ROW,
+    UPPER_DIAG_ROW and LOWER_DIAG_ROW formats. Distances follow the TSPLIB
+    rounding rules, so known optimal tour lengths stay comparable. TSPLIB
+    has no travel times; the duration matrix is a copy of the distances.
+    
+    For coordinate instances the lat/lng columns hold the raw coordinates
+    (converted to degrees for GEO); they are only used for drawing.
+    
+    Returns:
+        (locations_df, distance_matrix, duration_matrix)
+    """
+    header = {}
+    coords = []
+    explicit = []
+    section = None
+    
+    with open(filepath) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line == 'EOF':
+                continue
+            if line.endswith('SECTION'):
+                section = line
+            elif section is None and ':' in line:
+                key, value = line.split(':', 1)
+                header[key.strip().upper()] = value.strip()
+            elif section in ('NODE_COORD_SECTION', 'DISPLAY_DATA_SECTION'):
+                _, x, y = line.split()[:3]
+                coords.append((float(x), float(y)))
+            elif section == 'EDGE_WEIGHT_SECTION':
+                explicit.extend(float(value) for value in line.split())
+    
+    n = int(header['DIMENSION'])
+    weight_type = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+    
+    if weight_type == 'EXPLICIT':
+        distances = _explicit_matrix(explicit, n, header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'))
+        if len(coords) == n:
+            x, y = np.array(coords, dtype=float).T
+        else:
+            # No display coordinates: draw the stops on a line
+            x, y = np.zeros(n), np.arange(n, dtype=float)
+    else:
+        x, y = np.array(coords, dtype=float).T
+        distances = _coordinate_matrix(x, y, weight_type)
+    
+    if weight_type == 'GEO':
+        lat, lng = _tsplib_degrees(x), _tsplib_degrees(y)
+    else:
+        lat, lng = y, x
+    
+    name = header.get('NAME', os.path.splitext(os.path.basename(filepath))[0])
+    locations_df = pd.DataFrame({
+        'address': [f"{name} {i + 1}" for i in range(n)],
+        'lat': lat,
+        'lng': lng
+    })
+    return locations_df, distances, distances.copy()
+
+
+def _coordinate_matrix(x, y, weight_type):
+    """TSPLIB distance matrix for coordinate-based edge weight types."""
+    if weight_type == 'GEO':
+        lat, lng = np.radians(_tsplib_degrees(x)), np.radians(_tsplib_degrees(y))
+        # TSPLIB uses PI = 3.141592 rather than the exact value
+        lat, lng = lat * 3.141592 / math.pi, lng * 3.141592 / math.pi
+        q1 = np.cos(lng[:, None] - lng[None, :])
+        q2 = np.cos(lat[:, None] - lat[None, :])
+        q3 = np.cos(lat[:, None] + lat[None, :])
+        cosine = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+        distances = np.floor(6378.388 * np.arccos(cosine) + 1.0)
+        np.fill_diagonal(distances, 0.0)
+        return distances
+    
+    dx = x[:, None] - x[None, :]
+    dy = y[:, None] - y[None, :]
+    if weight_type == 'EUC_2D':
+        return np.floor(np.sqrt(dx * dx + dy * dy) + 0.5)
+    if weight_type == 'CEIL_2D':
+        return np.ceil(np.sqrt(dx * dx + dy * dy))
+    if weight_type == 'ATT':
+        r = np.sqrt((dx * dx + dy * dy) / 10.0)
+        t = np.floor(r + 0.5)
+        return np.where(t < r, t + 1.0, t)
+    raise ValueError(f"Unsupported TSPLIB EDGE_WEIGHT_TYPE: {weight_type}")
+
+
+def _tsplib_degrees(values):
+    """Convert TSPLIB GEO coordinates (DDD.MM) to decimal degrees."""
+    whole = np.trunc(values)
+    return whole + 5.0 * (values - whole) / 3.0
+
+
+def _explicit_matrix(values, n, weight_format):
+    """Full symmetric matrix from an EDGE_WEIGHT_SECTION."""
+    values = np.array(values)
+    if weight_format == 'FULL_MATRIX':
+        return values[:n * n].reshape(n, n)
+    
+    rows, cols = {
+        'UPPER_ROW': np.triu_indices(n, 1),
+        'LOWER_ROW': np.tril_indices(n, -1),
+        'UPPER_DIAG_ROW': np.triu_indices(n),
+        'LOWER_DIAG_ROW': np.tril_indices(n),
+    }.get(weight_format, (None, None))
+    if rows is None:
+        raise ValueError(f"Unsupported TSPLIB EDGE_WEIGHT_FORMAT: {weight_format}")
+    
+    matrix = np.zeros((n, n))
+    matrix[rows, cols] = values[:len(rows)]
+    matrix[cols, rows] = values[:len(rows)]
+    return matrix
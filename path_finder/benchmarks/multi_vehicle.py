@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Benchmark ClusterFirstPlanner on large multi-vehicle days.
+
+Reports the time of each phase (clustering, routing, repair), the total
+distance, the longest route and how much the inter-route repair saved over
+the plain cluster-first routes.
+
+Usage (from the path_finder directory):
+    python -m benchmarks.multi_vehicle --sizes 1000 5000 10000 --vehicles 10 25 50 --workers 4
+    python -m benchmarks.multi_vehicle --sizes 2000 --vehicles 10 --clustering kmedoids --route-solver genetic
+"""
+
+import argparse
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.utils.runner import solve_astar, solve_genetic
+    from path_finder.algorithms.cluster_first import ClusterFirstPlanner
+    from path_finder.benchmarks.instances import uniform_instance, clustered_instance
+except ImportError:
+    from utils.graph import GraphBuilder
+    from utils.runner import solve_astar, solve_genetic
+    from algorithms.cluster_first import ClusterFirstPlanner
+    from benchmarks.instances import uniform_instance, clustered_instance
+
+
+ROUTE_SOLVERS = {'astar': (solve_astar, {}), 'genetic': (solve_genetic, {'generations': 50})}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument('--vehicles', type=int, nargs='+', default=[10, 25, 50],
+                        help="vehicles for each size (the last value is reused)")
+    parser.add_argument('--kind', choices=['uniform', 'clustered'], default='clustered')
+    parser.add_argument('--clustering', choices=['kmeans', 'kmedoids'], default='kmeans')
+    parser.add_argument('--route-solver', choices=sorted(ROUTE_SOLVERS), default='astar')
+    parser.add_argument('--workers', type=int, default=None, help="processes routing clusters")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    make_instance = uniform_instance if args.kind == 'uniform' else clustered_instance
+    
+    print(f"{'n':>6} {'vehicles':>8} {'cluster s':>10} {'route s':>8} {'repair s':>9} {'total s':>8} "
+          f"{'distance':>11} {'repair %':>9} {'makespan h':>11}")
+    
+    for index, n in enumerate(args.sizes):
+        vehicles = args.vehicles[min(index, len(args.vehicles) - 1)]
+        locations_df, distances, durations = make_instance(n, seed=args.seed)
+        graph_builder = GraphBuilder(locations_df, distances, durations)
+        
+        plans = {}
+        for rounds in (0, 10):
+            planner = ClusterFirstPlanner(graph_builder, vehicles, route_solver=ROUTE_SOLVERS[args.route_solver],
+                                          clustering=args.clustering, max_workers=args.workers,
+                                          repair_rounds=rounds, seed=args.seed)
+            plans[rounds] = planner.optimize()
+        
+        result = plans[10]
+        phases = result['instrumentation']['phases']
+        saved = 100 * (plans[0]['distance'] - result['distance']) / plans[0]['distance']
+        print(f"{n:>6} {vehicles:>8} {phases['clustering']:>10.2f} {phases['routing']:>8.2f} "
+              f"{phases['repair']:>9.2f} {result['computation_time']:>8.2f} {result['distance']:>11.0f} "
+              f"{saved:>9.2f} {result['makespan'] / 3600:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+Solver registry and runner behind `python -m benchmarks`.
+
+Every solver is run on fresh objects with fixed seeds. Each run records wall
+time, peak traced memory (tracemalloc, in a second run so it does not slow
+the timed one), the solver's evaluation count and the gap to the best known
+distance of the instance.
+
+Evaluations count the work unit of each solver: fitness evaluations for the
+GA, training episodes for Q-learning, expanded states for exact A*, DP
+cells for Held-Karp, candidate scores for the construction heuristics and
+move evaluations for local search and simulated annealing (which runs a
+fixed number of moves instead of a time limit, so results are reproducible).
+"""
+
+import csv
+import json
+import math
+import os
+import platform
+import random
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.algorithms.a_star import AStar
+    from path_finder.algorithms.genetic_algorithm import GeneticAlgorithm
+    from path_finder.algorithms.q_learning import QLearning
+    from path_finder.algorithms.linear_q_learning import LinearQLearning
+    from path_finder.algorithms.held_karp import HeldKarp
+    from path_finder.algorithms.local_search import LocalSearch
+    from path_finder.algorithms.simulated_annealing import SimulatedAnnealing
+    from path_finder.benchmarks.instances import REGIONS, uniform_instance, clustered_instance, load_tsplib
+except ImportError:
+    from utils.graph import GraphBuilder
+    from algorithms.a_star import AStar
+    from algorithms.genetic_algorithm import GeneticAlgorithm
+    from algorithms.q_learning import QLearning
+    from algorithms.linear_q_learning import LinearQLearning
+    from algorithms.held_karp import HeldKarp
+    from algorithms.local_search import LocalSearch
+    from algorithms.simulated_annealing import SimulatedAnnealing
+    from benchmarks.instances import REGIONS, uniform_instance, clustered_instance, load_tsplib
+
+
+def _run_ga(graph_builder):
+    if graph_builder.graph is None:
+        graph_builder.build_complete_graph()
+    with warnings.catch_warnings():
+        # DEAP warns every time the creator classes are registered again
+        warnings.simplefilter('ignore', RuntimeWarning)
+        ga = GeneticAlgorithm(graph_builder)
+    
+    result = ga.optimize()
+    return result, result['instrumentation']['counters']['fitness_evaluations']
+
+
+def _run_nearest_neighbour(graph_builder):
+    """Plain nearest-neighbour tour from node 0: the baseline the learned policies should beat."""
+    start_time = time.perf_counter()
+    weights = graph_builder.get_weight_matrix()
+    durations = graph_builder.get_weight_matrix('duration')
+    n = len(weights)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    path = [0]
+    for _ in range(n - 1):
+        following = int(np.argmin(np.where(visited, np.inf, weights[path[-1]])))
+        visited[following] = True
+        path.append(following)
+    result = {
+        'algorithm': 'Nearest Neighbour',
+        'path': path,
+        'distance': float(weights[path[:-1], path[1:]].sum()),
+        'duration': float(durations[path[:-1], path[1:]].sum()),
+        'computation_time': time.perf_counter() - start_time
+    }
+    return result, n * (n - 1) // 2
+
+
+def _run_greedy_astar(graph_builder):
+    n = len(graph_builder.locations_df)
+    return AStar(graph_builder).find_optimal_path(), n * (n - 1) // 2
+
+
+def _run_beam_astar(graph_builder, beam_width=8):
+    n = len(graph_builder.locations_df)
+    return AStar(graph_builder).find_beam_path(beam_width=beam_width), beam_width * n * (n - 1) // 2
+
+
+def _run_exact_astar(graph_builder):
+    result = AStar(graph_builder).find_exact_path()
+    return result, result['states_expanded']
+
+
+def _run_held_karp(graph_builder):
+    n = len(graph_builder.locations_df)
+    return HeldKarp(graph_builder).optimize(), (n - 1) * 2 ** (n - 1)
+
+
+def _run_q_learning(graph_builder):
+    ql = QLearning(graph_builder, episodes=1000, mask_visited=True)
+    return ql.optimize(), ql.episodes
+
+
+def _run_linear_q_learning(graph_builder):
+    ql = LinearQLearning(graph_builder, episodes=100)
+    return ql.optimize(), ql.episodes
+
+
+def _run_local_search(graph_builder):
+    result = LocalSearch(graph_builder).optimize()
+    return result, result['instrumentation']['counters']['move_evaluations']
+
+
+def _run_simulated_annealing(graph_builder):
+    n = len(graph_builder.locations_df)
+    result = SimulatedAnnealing(graph_builder, time_limit=None, max_moves=500 * n, restarts=1).optimize()
+    return result, result['instrumentation']['counters']['moves_evaluated']
+
+
+# name -> (runner, largest n it is run on by default)
+# A runner takes a GraphBuilder and returns (result dict, evaluations).
+SOLVERS = {
+    'nearest-neighbour': (_run_nearest_neighbour, 10000),
+    'greedy-astar': (_run_greedy_astar, 5000),
+    'beam-astar': (_run_beam_astar, 1000),
+    'exact-astar': (_run_exact_astar, 14),
+    'held-karp': (_run_held_karp, 18),
+    'ga': (_run_ga, 200),
+    'q-learning': (_run_q_learning, 100),
+    'linear-q-learning': (_run_linear_q_learning, 500),
+    'local-search': (_run_local_search, 10000),
+    'simulated-annealing': (_run_simulated_annealing, 1000),
+}
+
+
+def make_instances(kinds, sizes, seeds, region='dhaka', tsplib_files=()):
+    """
+    Yield (name, locations_df, distance_matrix, duration_matrix) for every requested instance.
+    
+    Generated instances are named '<kind>-<region>-n<size>-s<seed>';
+    TSPLIB instances use their file name.
+    """
+    generators = {'uniform': uniform_instance, 'clustered': clustered_instance}
+    for kind in kinds:
+        for n in sizes:
+            for seed in range(seeds):
+                locations_df, distances, durations = generators[kind](n, seed=seed, bbox=REGIONS[region])
+                yield f"{kind}-{region}-n{n}-s{seed}", locations_df, distances, durations
+    
+    for filepath in tsplib_files:
+        locations_df, distances, durations = load_tsplib(filepath)
+        yield os.path.splitext(os.path.basename(filepath))[0], locations_df, distances, durations
+
+
+def run_solver(name, locations_df, distances, durations, seed=0, measure_memory=True):
+    """
+    Run one solver on one instance.
+    
+    Returns:
+        Dictionary with the solver, distance, duration, wall time (s),
+        peak traced memory (MiB, None if not measured) and evaluations
+    """
+    runner = SOLVERS[name][0]
+    
+    def run():
+        random.seed(seed)
+        np.random.seed(seed)
+        graph_builder = GraphBuilder(locations_df, distances, durations)
+        return runner(graph_builder)
+    
+    start = time.perf_counter()
+    result, evaluations = run()
+    wall_time = time.perf_counter() - start
+    
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            run()
+            peak_memory = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    
+    return {
+        'solver': name,
+        'algorithm': result['algorithm'],
+        'distance': float(result['distance']),
+        'duration': float(result['duration']),
+        'wall_time': wall_time,
+        'peak_memory_mib': peak_memory,
+        'evaluations': int(evaluations)
+    }
+
+
+def run_suite(instances, solvers, seed=0, measure_memory=True, respect_limits=True, best_known=None, progress=None):
+    """
+    Run every solver on every instance and fill in the gap to the best known distance.
+    
+    Args:
+        instances: Iterable from make_instances()
+        solvers: Solver names (keys of SOLVERS)
+        respect_limits: Skip solvers on instances larger than their default limit
+        best_known: Optional {instance name: distance}; otherwise the best
+            distance found in this run is used
+        progress: Optional callable receiving each row as it completes
+    
+    Returns:
+        List of result rows (dictionaries)
+    """
+    best_known = dict(best_known or {})
+    rows = []
+    
+    for instance, locations_df, distances, durations in instances:
+        n = len(locations_df)
+        instance_rows = []
+        for name in solvers:
+            if respect_limits and n > SOLVERS[name][1]:
+                continue
+            row = {'instance': instance, 'n': n, 'seed': seed}
+            row.update(run_solver(name, locations_df, distances, durations, seed, measure_memory))
+            instance_rows.append(row)
+        
+        if not instance_rows:
+            continue
+        
+        best = min([row['distance'] for row in instance_rows] + ([best_known[instance]] if instance in best_known else []))
+        for row in instance_rows:
+            row['best_known'] = best
+            row['gap_percent'] = 100.0 * (row['distance'] - best) / best if best > 0 else 0.0
+            if progress is not None:
+                progress(row)
+        rows.extend(instance_rows)
+    
+    return rows
+
+
+def save_results(rows, json_path=None, csv_path=None):
+    """Write result rows to JSON (with run metadata) and/or CSV."""
+    if json_path:
+        payload = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'rows': rows
+        }
+        with open(json_path, 'w') as f:
+            json.dump(payload, f, indent=2)
+    
+    if csv_path and rows:
+        fields = list(rows[0])
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def load_results(json_path):
+    """Read the rows of a JSON file written by save_results()."""
+    with open(json_path) as f:
+        return json.load(f)['rows']
+
+
+def compare_to_baseline(rows, baseline_rows, time_tolerance=0.10, distance_tolerance=0.001):
+    """
+    Match rows to a baseline run by (instance, solver).
+    
+    Returns:
+        List of dictionaries with the time ratio (current / baseline), the
+        relative distance change and whether the row regressed beyond the
+        tolerances (both given as fractions)
+    """
+    baseline = {(row['instance'], row['solver']): row for row in baseline_rows}
+    comparisons = []
+    
+    for row in rows:
+        old = baseline.get((row['instance'], row['solver']))
+        if old is None:
+            continue
+        time_ratio = row['wall_time'] / old['wall_time'] if old['wall_time'] > 0 else math.inf
+        distance_change = (row['distance'] - old['distance']) / old['distance'] if old['distance'] > 0 else 0.0
+        comparisons.append({
+            'instance': row['instance'],
+            'solver': row['solver'],
+            'time_ratio': time_ratio,
+            'distance_change': distance_change,
+            'regressed': time_ratio > 1 + time_tolerance or distance_change > distance_tolerance
+        })
+    
+    return comparisons
@@ -3,6 +3,7 @@ import pandas as pd
 import time
 import os
 import sys
+from types import SimpleNamespace
 
 # Try importing with the package structure first, fall back to local imports
 try:
@@ -11,11 +12,18 @@ try:
     from path_finder.api.geocoding import GeocodingAPI
     from path_finder.api.distance_matrix import DistanceMatrixAPI
     from path_finder.utils.graph import GraphBuilder
-    from path_finder.utils.comparison import AlgorithmComparison
+    from path_finder.utils.comparison import AlgorithmComparison, format_comparison_dataframe
     from path_finder.utils.export import ExportManager
-    from path_finder.algorithms.genetic_algorithm import GeneticAlgorithm
-    from path_finder.algorithms.a_star import AStar
+    from path_finder.utils.snapshot import save_snapshot
+    from path_finder.utils.time_windows import TimeWindows, has_time_windows
+    from path_finder.utils.runner import (ConcurrentRunner, solve_genetic, solve_astar, solve_qlearning,
+                                          solve_heldkarp, solve_local_search, solve_simulated_annealing,
+                                          solve_multi_vehicle)
+    from path_finder.utils.replicates import (run_replicates, representative_runs, default_target,
+                                              time_to_target, plot_time_to_target)
     from path_finder.algorithms.q_learning import QLearning
+    from path_finder.algorithms.linear_q_learning import LinearQLearning
+    from path_finder.algorithms.held_karp import HeldKarp
 except ImportError:
     # Local imports for standalone version
     from gui.input_form import InputForm
@@ -23,11 +31,17 @@ except ImportError:
     from api.geocoding import GeocodingAPI
     from api.distance_matrix import DistanceMatrixAPI
     from utils.graph import GraphBuilder
-    from utils.comparison import AlgorithmComparison
+    from utils.comparison import AlgorithmComparison, format_comparison_dataframe
     from utils.export import ExportManager
-    from algorithms.genetic_algorithm import GeneticAlgorithm
-    from algorithms.a_star import AStar
+    from utils.snapshot import save_snapshot
+    from utils.time_windows import TimeWindows, has_time_windows
+    from utils.runner import (ConcurrentRunner, solve_genetic, solve_astar, solve_qlearning,
+                              solve_heldkarp, solve_local_search, solve_simulated_annealing, solve_multi_vehicle)
+    from utils.replicates import (run_replicates, representative_runs, default_target,
+                                  time_to_target, plot_time_to_target)
     from algorithms.q_learning import QLearning
+    from algorithms.linear_q_learning import LinearQLearning
+    from algorithms.held_karp import HeldKarp
 
 class Dashboard:
     def __init__(self):
@@ -58,6 +72,14 @@ class Dashboard:
             st.session_state.algorithm_results = []
         if 'comparison_df' not in st.session_state:
             st.session_state.comparison_df = pd.DataFrame()
+        if 'replicate_stats' not in st.session_state:
+            st.session_state.replicate_stats = None
+        if 'histories' not in st.session_state:
+            st.session_state.histories = {}
+        if 'pending_snapshot' not in st.session_state:
+            st.session_state.pending_snapshot = None
+        if 'uploaded_time_windows' not in st.session_state:
+            st.session_state.uploaded_time_windows = None
     
     def run(self):
         """Run the main dashboard application."""
@@ -74,6 +96,13 @@ class Dashboard:
             st.session_state.durations = None
             st.session_state.algorithm_results = []
             st.session_state.comparison_df = pd.DataFrame()
+            st.session_state.replicate_stats = None
+            st.session_state.histories = {}
+        
+        # A newly opened snapshot replaces geocoding, the matrix requests and the runs
+        if st.session_state.pending_snapshot is not None:
+            self._apply_snapshot(st.session_state.pending_snapshot)
+            st.session_state.pending_snapshot = None
         
         # Get algorithm parameters
         algorithm_params = self.input_form.get_algorithm_params()
@@ -82,6 +111,9 @@ class Dashboard:
         if st.session_state.addresses:
             self._process_data()
             
+            if st.session_state.distances is not None:
+                self._snapshot_controls()
+            
             # Run algorithms if locations are available
             if not st.session_state.locations_df.empty:
                 # Button to run selected algorithms
@@ -105,7 +137,12 @@ class Dashboard:
                     if raw_locations.empty:
                         st.error("Geocoding failed: No coordinates found. Check addresses.")
                         return
-                        
+                    
+                    # Time window columns of an uploaded CSV follow their addresses
+                    if st.session_state.uploaded_time_windows is not None:
+                        raw_locations = raw_locations.merge(st.session_state.uploaded_time_windows,
+                                                            on='address', how='left')
+                    
                     st.session_state.locations_df = raw_locations
                     st.success(f"Successfully geocoded {len(st.session_state.locations_df)} addresses.")
             
@@ -149,7 +186,7 @@ class Dashboard:
                             st.pyplot(self.graph_builder.visualize_graph())
                         
                         return True
-                        
+                    
                     except Exception as e:
                         st.error(f"Error calculating distance matrix: {str(e)}")
                         import traceback
@@ -159,14 +196,14 @@ class Dashboard:
                 # If we already have distance data but graph_builder is None
                 if self.graph_builder is None:
                     try:
-                        st.write("Debug - Creating GraphBuilder from existing data")
+                        # The networkx graph is only built when something needs
+                        # it (the GA, the network plot), which keeps reruns and
+                        # opening large snapshots fast
                         self.graph_builder = GraphBuilder(
                             st.session_state.locations_df,
                             st.session_state.distances,
                             st.session_state.durations
                         )
-                        self.graph_builder.build_complete_graph()
-                        st.success("GraphBuilder initialized from existing data!")
                         return True
                     except Exception as e:
                         st.error(f"Failed to initialize GraphBuilder from existing data: {str(e)}")
@@ -174,7 +211,7 @@ class Dashboard:
                         st.code(traceback.format_exc())
                         return False
                 return True
-                
+        
         except Exception as e:
             st.error(f"Initialization failed: {str(e)}")
             import traceback
@@ -207,106 +244,267 @@ class Dashboard:
         
         # Reset results
         st.session_state.algorithm_results = []
+        st.session_state.replicate_stats = None
+        st.session_state.histories = {}
         self.comparison = AlgorithmComparison()
+        self.ga_instance = None
+        self.ql_instance = None
+        
+        params = algorithm_params['params']
+        jobs = {}
         
         # Genetic Algorithm
         if algorithm_params['use_genetic']:
-            with st.spinner("Running Genetic Algorithm..."):
-                # Get GA parameters
-                ga_params = algorithm_params['params'].get('genetic', {})
-                
-                try:
-                    # Initialize the GA
-                    self.ga_instance = GeneticAlgorithm(
-                        self.graph_builder,
-                        population_size=ga_params.get('population_size', 100),
-                        generations=ga_params.get('generations', 100),
-                        crossover_prob=ga_params.get('crossover_prob', 0.8),
-                        mutation_prob=ga_params.get('mutation_prob', 0.2)
-                    )
-                    
-                    # Run the GA
-                    ga_result = self.ga_instance.optimize()
-                    
-                    # Add to results
-                    st.session_state.algorithm_results.append(ga_result)
-                    self.comparison.add_result(
-                        ga_result['algorithm'],
-                        ga_result['path'],
-                        ga_result['distance'],
-                        ga_result['duration'],
-                        ga_result['computation_time']
-                    )
-                except Exception as e:
-                    st.error(f"Error running Genetic Algorithm: {str(e)}")
-                    import traceback
-                    st.code(traceback.format_exc())
+            ga_params = params.get('genetic', {})
+            jobs['Genetic Algorithm'] = (solve_genetic, {
+                'population_size': ga_params.get('population_size', 100),
+                'generations': ga_params.get('generations', 100),
+                'crossover_prob': ga_params.get('crossover_prob', 0.8),
+                'mutation_prob': ga_params.get('mutation_prob', 0.2)
+            })
         
         # A* Search
         if algorithm_params['use_astar']:
-            with st.spinner("Running A* Search..."):
-                try:
-                    # Initialize A*
-                    self.astar_instance = AStar(self.graph_builder)
-                    
-                    # Run A*
-                    astar_result = self.astar_instance.find_optimal_path()
-                    
-                    # Add to results
-                    st.session_state.algorithm_results.append(astar_result)
-                    self.comparison.add_result(
-                        astar_result['algorithm'],
-                        astar_result['path'],
-                        astar_result['distance'],
-                        astar_result['duration'],
-                        astar_result['computation_time']
-                    )
-                except Exception as e:
-                    st.error(f"Error running A* Search: {str(e)}")
-                    import traceback
-                    st.code(traceback.format_exc())
+            jobs['A* Search'] = (solve_astar, {})
         
         # Q-Learning
         if algorithm_params['use_qlearning']:
-            with st.spinner("Running Q-Learning (this may take a while)..."):
-                # Get Q-Learning parameters
-                ql_params = algorithm_params['params'].get('qlearning', {})
-                
-                try:
-                    # Initialize Q-Learning
-                    self.ql_instance = QLearning(
-                        self.graph_builder,
-                        learning_rate=ql_params.get('learning_rate', 0.1),
-                        discount_factor=ql_params.get('discount_factor', 0.9),
-                        episodes=ql_params.get('episodes', 1000)
-                    )
-                    
-                    # Run Q-Learning
-                    ql_result = self.ql_instance.optimize()
-                    
-                    # Add to results
-                    st.session_state.algorithm_results.append(ql_result)
-                    self.comparison.add_result(
-                        ql_result['algorithm'],
-                        ql_result['path'],
-                        ql_result['distance'],
-                        ql_result['duration'],
-                        ql_result['computation_time']
-                    )
-                except Exception as e:
-                    st.error(f"Error running Q-Learning: {str(e)}")
-                    import traceback
-                    st.code(traceback.format_exc())
-        
-        # Get comparison DataFrame
-        st.session_state.comparison_df = self.comparison.get_comparison_dataframe()
+            ql_params = params.get('qlearning', {})
+            jobs['Q-Learning'] = (solve_qlearning, {
+                'learning_rate': ql_params.get('learning_rate', 0.1),
+                'discount_factor': ql_params.get('discount_factor', 0.9),
+                'episodes': ql_params.get('episodes', 1000),
+                'linear': ql_params.get('linear', False),
+                'warm_start': ql_params.get('warm_start', False)
+            })
+        
+        # Held-Karp (exact reference)
+        if algorithm_params.get('use_heldkarp'):
+            hk_params = params.get('heldkarp', {})
+            hk_solver = HeldKarp(self.graph_builder, closed_tour=hk_params.get('closed_tour', False))
+            
+            if len(self.graph_builder.locations) > hk_solver.max_nodes:
+                st.warning(f"Held-Karp skipped: it supports at most {hk_solver.max_nodes} stops.")
+            else:
+                jobs['Held-Karp'] = (solve_heldkarp, {'closed_tour': hk_params.get('closed_tour', False)})
+        
+        # Local search (nearest neighbour start, 2-opt / Or-opt improvement)
+        if algorithm_params.get('use_local_search'):
+            ls_params = params.get('local_search', {})
+            jobs['Local Search'] = (solve_local_search, {'neighbours': ls_params.get('neighbours', 10)})
+        
+        # Simulated annealing, by default within the same time limit as the other solvers
+        if algorithm_params.get('use_annealing'):
+            sa_params = params.get('annealing', {})
+            limits = [limit for limit in (sa_params.get('time_limit'), params.get('runner', {}).get('time_limit'))
+                      if limit]
+            jobs['Simulated Annealing'] = (solve_simulated_annealing, {
+                # Leave the worker time to start and send its result back before the runner stops it
+                'time_limit': 0.95 * min(limits) if limits else 30.0,
+                'restarts': sa_params.get('restarts', 4)
+            })
+        
+        # Multi-vehicle plan (cluster first, route second)
+        if algorithm_params.get('use_multi_vehicle'):
+            mv_params = params.get('multi_vehicle', {})
+            num_stops = len(self.graph_builder.locations) - 1
+            if num_stops < mv_params.get('num_vehicles', 2):
+                st.warning(f"Multi-Vehicle skipped: {mv_params.get('num_vehicles', 2)} vehicles need at least "
+                           f"as many stops besides the depot, got {num_stops}.")
+            else:
+                jobs['Multi-Vehicle'] = (solve_multi_vehicle, {
+                    'num_vehicles': mv_params.get('num_vehicles', 2),
+                    'capacity': mv_params.get('capacity'),
+                    'clustering': mv_params.get('clustering', 'kmeans'),
+                    'route_solver': mv_params.get('route_solver', 'astar')
+                })
+        
+        # Time windows (from the uploaded CSV) constrain the GA and A* routes
+        if has_time_windows(st.session_state.locations_df):
+            try:
+                time_windows = TimeWindows.from_dataframe(st.session_state.locations_df)
+            except ValueError as e:
+                st.error(f"Invalid time windows: {e}")
+                return
+            for name in ('Genetic Algorithm', 'A* Search', 'Local Search'):
+                if name in jobs:
+                    jobs[name][1]['time_windows'] = time_windows
+            st.info("Time windows apply to the Genetic Algorithm, A* Search and Local Search; "
+                    "other solvers ignore them.")
+        
+        # Memory tracing / profiling options apply to every solver
+        instrument = params.get('instrument')
+        if instrument and any(instrument.values()):
+            for solver, solver_params in jobs.values():
+                solver_params['instrument'] = instrument
+        
+        if not jobs:
+            st.session_state.comparison_df = self.comparison.to_frame()
+            return
+        
+        runner_params = params.get('runner', {})
+        if runner_params.get('replicates', 1) > 1:
+            self._run_replicates(jobs, runner_params['replicates'], runner_params.get('parallel', True))
+            return
+        
+        runner = ConcurrentRunner(
+            st.session_state.locations_df,
+            st.session_state.distances,
+            st.session_state.durations
+        )
+        if runner_params.get('parallel', True):
+            events = runner.run(jobs, default_time_limit=runner_params.get('time_limit'))
+        else:
+            events = runner.run_serial(jobs)
+        
+        # Show every result as soon as its solver finishes
+        status = st.empty()
+        table = st.empty()
+        remaining = list(jobs)
+        status.info(f"Running: {', '.join(remaining)}")
+        
+        for event in events:
+            name = event['name']
+            remaining.remove(name)
+            
+            if event['status'] == 'done':
+                result = event['result']
+                st.session_state.algorithm_results.append(result)
+                # Also stores the solver's instrumentation (phase times, counters)
+                self.comparison.add_results([result])
+                self._keep_progress(name, event['progress'])
+                table.dataframe(format_comparison_dataframe(self.comparison.to_frame()))
+            elif event['status'] == 'timeout':
+                st.warning(f"{name} stopped after {event['elapsed']:.1f} s (time limit reached).")
+            else:
+                st.error(f"Error running {name}:")
+                st.code(event['error'])
+            
+            if remaining:
+                status.info(f"Running: {', '.join(remaining)}")
+            else:
+                status.empty()
+                table.empty()  # the full results section below shows the table
+        
+        # Get comparison DataFrame (raw numbers; formatted when displayed or exported)
+        st.session_state.comparison_df = self.comparison.to_frame()
+    
+    def _run_replicates(self, jobs, replicates, parallel=True):
+        """Run every solver with several seeds and keep per-solver statistics instead of one sample."""
+        progress_bar = st.progress(0.0)
+        status = st.empty()
+        
+        def show_progress(finished, total):
+            progress_bar.progress(finished / total)
+            status.info(f"Finished {finished} of {total} runs")
+        
+        try:
+            comparison, traces = run_replicates(
+                st.session_state.locations_df,
+                st.session_state.distances,
+                st.session_state.durations,
+                jobs,
+                replicates=replicates,
+                max_workers=None if parallel else 1,
+                progress=show_progress
+            )
+        except Exception as e:
+            st.error(f"Error running replicates: {e}")
+            import traceback
+            st.code(traceback.format_exc())
+            return
+        finally:
+            progress_bar.empty()
+            status.empty()
+        
+        # Show the median run of each solver on the map and in the table
+        frame = comparison.to_frame()
+        representative = frame.loc[representative_runs(comparison)].reset_index(drop=True)
+        st.session_state.algorithm_results = [
+            {key: row[key] for key in ('algorithm', 'path', 'distance', 'duration', 'computation_time')}
+            for row in representative.to_dict('records')
+        ]
+        for result in st.session_state.algorithm_results:
+            result['algorithm'] = str(result['algorithm'])
+        st.session_state.comparison_df = representative
+        
+        target = default_target(traces)
+        st.session_state.replicate_stats = comparison.statistics()
+        st.session_state.time_to_target = (time_to_target(traces, target), target)
+    
+    def _keep_progress(self, name, progress):
+        """Keep what the GA and Q-learning plots need from a solver that ran in another process."""
+        if 'history' in progress:
+            self.ga_instance = SimpleNamespace(history=progress['history'])
+            st.session_state.histories['genetic'] = progress['history']
+        if 'reward_history' in progress:
+            self.ql_instance = LinearQLearning(None) if progress.get('linear') else QLearning(None)
+            self.ql_instance.reward_history = progress['reward_history']
+            key = 'linear_qlearning' if progress.get('linear') else 'qlearning'
+            st.session_state.histories[key] = {'reward_history': progress['reward_history']}
+            if progress.get('warm_start_states'):
+                st.info(f"Q-Learning warm-started from {progress['warm_start_states']} saved states")
+    
+    def _snapshot_controls(self):
+        """Sidebar controls to save the current plan as a project snapshot."""
+        st.sidebar.subheader("Project Snapshot")
+        name = st.sidebar.text_input("Snapshot name:", "path_finder_project")
+        
+        if st.sidebar.button("Save Snapshot"):
+            filepath = os.path.join(self.export_manager.output_dir, f"{name}.npz")
+            with st.spinner("Saving snapshot..."):
+                save_snapshot(
+                    filepath,
+                    st.session_state.locations_df,
+                    st.session_state.distances,
+                    st.session_state.durations,
+                    st.session_state.algorithm_results,
+                    st.session_state.histories,
+                    metadata={'addresses': st.session_state.addresses}
+                )
+            st.sidebar.success(f"Snapshot saved to: {filepath}")
+    
+    def _apply_snapshot(self, snapshot):
+        """Load a project snapshot into the session; no API calls are made."""
+        with snapshot:
+            st.session_state.addresses = snapshot.metadata.get('addresses') or snapshot.addresses
+            st.session_state.locations_df = snapshot.locations_df
+            st.session_state.distances = snapshot.distances
+            st.session_state.durations = snapshot.durations
+            st.session_state.algorithm_results = snapshot.results
+            histories = snapshot.histories
+        
+        self.comparison = AlgorithmComparison()
+        self.comparison.add_results(st.session_state.algorithm_results)
+        st.session_state.comparison_df = self.comparison.to_frame()
+        st.session_state.replicate_stats = None
+        st.session_state.histories = {}
+        
+        if 'genetic' in histories:
+            self._keep_progress('genetic', {'history': histories['genetic']})
+        for key in ('qlearning', 'linear_qlearning'):
+            if key in histories:
+                self._keep_progress(key, {'reward_history': histories[key]['reward_history'],
+                                          'linear': key == 'linear_qlearning'})
+        
+        st.success(f"Opened snapshot of {snapshot.num_locations} stops from {snapshot.created} "
+                   f"with {len(st.session_state.algorithm_results)} results.")
     
     def _display_results(self):
         """Display the results of the route optimization algorithms."""
         if st.session_state.algorithm_results:
             # Display comparison table
             st.subheader("Algorithm Comparison")
-            st.dataframe(st.session_state.comparison_df)
+            display_df = format_comparison_dataframe(st.session_state.comparison_df)
+            st.dataframe(display_df)
+            
+            if st.session_state.replicate_stats is not None:
+                st.subheader("Replicate Statistics")
+                st.caption("Mean, standard deviation and 95% bootstrap confidence interval over all seeds. "
+                           "The table above and the map show the median run of each solver.")
+                st.dataframe(st.session_state.replicate_stats)
+                ttt, target = st.session_state.time_to_target
+                st.pyplot(plot_time_to_target(ttt, target))
             
             # Visualize routes on map
             self.map_vis.visualize_routes(
@@ -331,15 +529,20 @@ class Dashboard:
             
             # Export options
             with st.expander("Export Results"):
-                export_format = st.radio("Export Format:", ["CSV", "PDF", "Both"])
+                export_format = st.radio("Export Format:", ["CSV", "PDF", "Both", "Dataset"])
                 
                 filename = st.text_input("Filename (without extension):", "path_finder_results")
                 
+                if export_format == "Dataset":
+                    dataset_format = st.selectbox("Dataset format:", ["parquet", "arrow", "ndjson"],
+                                                  help="Parquet and Arrow need pyarrow")
+                    include_matrices = st.checkbox("Include distance and duration matrices", value=False)
+                
                 if st.button("Export"):
                     with st.spinner("Exporting results..."):
                         if export_format in ["CSV", "Both"]:
                             csv_path, _ = self.export_manager.export_to_csv(
-                                st.session_state.comparison_df,
+                                display_df,
                                 st.session_state.locations_df,
                                 filename
                             )
@@ -347,16 +550,33 @@ class Dashboard:
                         
                         if export_format in ["PDF", "Both"]:
                             # Get the network visualization
+                            if self.graph_builder.graph is None:
+                                self.graph_builder.build_complete_graph()
                             route_map = self.graph_builder.visualize_graph()
                             
                             pdf_path = self.export_manager.export_to_pdf(
-                                st.session_state.comparison_df,
+                                display_df,
                                 st.session_state.locations_df,
                                 route_map,
                                 comparison_plot,
                                 filename
                             )
                             st.success(f"PDF exported to: {pdf_path}")
+                        
+                        if export_format == "Dataset":
+                            try:
+                                dataset_path = self.export_manager.export_dataset(
+                                    st.session_state.locations_df,
+                                    st.session_state.algorithm_results,
+                                    st.session_state.distances,
+                                    st.session_state.durations,
+                                    filename,
+                                    format=dataset_format,
+                                    include_matrices=include_matrices
+                                )
+                                st.success(f"Dataset exported to: {dataset_path}")
+                            except ImportError as e:
+                                st.error(str(e))
         
         elif not st.session_state.locations_df.empty:
             st.info("Run selected algorithms to see results.")
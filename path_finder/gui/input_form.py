@@ -4,6 +4,13 @@ import os
 import tempfile
 from io import StringIO
 
+try:
+    from path_finder.utils.snapshot import load_snapshot
+    from path_finder.utils.time_windows import WINDOW_COLUMNS, has_time_windows
+except ImportError:
+    from utils.snapshot import load_snapshot
+    from utils.time_windows import WINDOW_COLUMNS, has_time_windows
+
 class InputForm:
     def __init__(self):
         """Initialize the input form component for the Streamlit GUI."""
@@ -22,15 +29,19 @@ class InputForm:
         
         input_method = st.sidebar.radio(
             "Choose input method:",
-            ["Manual Entry", "CSV Upload", "Sample Addresses"]
+            ["Manual Entry", "CSV Upload", "Sample Addresses", "Project Snapshot"]
         )
         
         addresses = []
+        # Only a CSV upload can carry time windows
+        st.session_state.uploaded_time_windows = None
         
         if input_method == "Manual Entry":
             addresses = self._manual_entry_form()
         elif input_method == "CSV Upload":
             addresses = self._csv_upload_form()
+        elif input_method == "Project Snapshot":
+            addresses = self._snapshot_upload_form()
         else:  # Sample Addresses
             addresses = self._use_sample_addresses()
         
@@ -73,12 +84,49 @@ class InputForm:
         
         return []
     
+    def _snapshot_upload_form(self):
+        """
+        Render the upload form for a saved project snapshot.
+        
+        A newly uploaded snapshot is left in st.session_state.pending_snapshot
+        for the dashboard to apply; its addresses are returned like any other
+        input method's.
+        """
+        st.sidebar.subheader("Open Project Snapshot")
+        st.sidebar.markdown("""
+        A snapshot (.npz, saved from the dashboard) holds the geocoded stops,
+        the distance and duration matrices and earlier results, so nothing
+        is fetched from the Google APIs again.
+        """)
+        
+        uploaded_file = st.sidebar.file_uploader("Choose a snapshot file", type="npz")
+        
+        if uploaded_file is None:
+            return []
+        
+        # Streamlit reruns the script on every interaction; open each upload once
+        key = (uploaded_file.name, uploaded_file.size)
+        if st.session_state.get('snapshot_key') != key:
+            try:
+                snapshot = load_snapshot(uploaded_file)
+            except Exception as e:
+                st.sidebar.error(f"Error reading snapshot: {str(e)}")
+                return []
+            
+            st.session_state.snapshot_key = key
+            st.session_state.snapshot_addresses = snapshot.metadata.get('addresses') or snapshot.addresses
+            st.session_state.pending_snapshot = snapshot
+        
+        return st.session_state.snapshot_addresses
+    
     def _csv_upload_form(self):
         """Render the CSV upload form for addresses."""
         st.sidebar.subheader("Upload CSV File")
         st.sidebar.markdown("""
         CSV file should have a column named 'address' with the addresses.
         The first address will be considered as the starting point.
+        Optional 'window_start' and 'window_end' columns (e.g. 09:30) and a
+        'service_time' column (seconds) add delivery time windows.
         """)
         
         uploaded_file = st.sidebar.file_uploader("Choose a CSV file", type="csv")
@@ -100,6 +148,11 @@ class InputForm:
                     st.sidebar.error("Please provide at least 2 addresses in the CSV file.")
                     return []
                 
+                if has_time_windows(df):
+                    columns = ['address'] + [column for column in WINDOW_COLUMNS if column in df]
+                    windows = df[columns].dropna(subset=['address']).drop_duplicates('address')
+                    st.session_state.uploaded_time_windows = windows
+                
                 return addresses
             
             except Exception as e:
@@ -136,6 +189,10 @@ class InputForm:
         use_genetic = st.sidebar.checkbox("Genetic Algorithm", value=True)
         use_astar = st.sidebar.checkbox("A* Search", value=True)
         use_qlearning = st.sidebar.checkbox("Q-Learning", value=True)
+        use_heldkarp = st.sidebar.checkbox("Held-Karp (exact, up to 20 stops)", value=False)
+        use_local_search = st.sidebar.checkbox("Local Search (2-opt / Or-opt)", value=True)
+        use_annealing = st.sidebar.checkbox("Simulated Annealing (runs for the whole time limit)", value=False)
+        use_multi_vehicle = st.sidebar.checkbox("Multi-Vehicle (first address is the depot)", value=False)
         
         # Algorithm-specific parameters
         params = {}
@@ -154,14 +211,75 @@ class InputForm:
             params['qlearning'] = {
                 'episodes': st.sidebar.slider("Episodes", 100, 2000, 1000, 100),
                 'learning_rate': st.sidebar.slider("Learning Rate", 0.01, 0.5, 0.1, 0.01),
-                'discount_factor': st.sidebar.slider("Discount Factor", 0.5, 0.99, 0.9, 0.01)
+                'discount_factor': st.sidebar.slider("Discount Factor", 0.5, 0.99, 0.9, 0.01),
+                'linear': st.sidebar.checkbox("Linear function approximation (for more than ~15 stops)", value=False),
+                'warm_start': st.sidebar.checkbox("Reuse Q-table from earlier runs on the same stops", value=False)
+            }
+        
+        if use_heldkarp:
+            st.sidebar.subheader("Held-Karp Parameters")
+            params['heldkarp'] = {
+                'closed_tour': st.sidebar.checkbox("Return to starting point", value=False)
+            }
+        
+        if use_local_search:
+            st.sidebar.subheader("Local Search Parameters")
+            params['local_search'] = {
+                'neighbours': st.sidebar.slider("Candidate neighbours per stop", 3, 30, 10, 1)
+            }
+        
+        if use_annealing:
+            st.sidebar.subheader("Simulated Annealing Parameters")
+            time_limit = st.sidebar.number_input("Annealing time (seconds, 0 = solver time limit)", 0, 3600, 0, 5)
+            params['annealing'] = {
+                'time_limit': time_limit or None,
+                'restarts': st.sidebar.slider("Restarts (in parallel where possible)", 1, 16, 4, 1)
+            }
+        
+        if use_multi_vehicle:
+            st.sidebar.subheader("Multi-Vehicle Parameters")
+            capacity = st.sidebar.number_input("Stops per vehicle (0 = balanced)", 0, 10000, 0)
+            params['multi_vehicle'] = {
+                'num_vehicles': st.sidebar.slider("Vehicles", 2, 100, 5, 1),
+                'capacity': capacity or None,
+                'clustering': st.sidebar.selectbox("Clustering", ['kmeans', 'kmedoids'],
+                                                   format_func=lambda m: {'kmeans': "k-means (coordinates)",
+                                                                          'kmedoids': "k-medoids (road distances)"}[m]),
+                'route_solver': st.sidebar.selectbox("Route solver per vehicle", ['astar', 'localsearch', 'genetic'],
+                                                     format_func=lambda s: {'astar': "A* Search",
+                                                                            'localsearch': "Local Search",
+                                                                            'genetic': "Genetic Algorithm"}[s])
             }
         
+        st.sidebar.subheader("Execution")
+        parallel = st.sidebar.checkbox("Run solvers in parallel", value=True)
+        time_limit = st.sidebar.number_input("Time limit per solver (seconds, 0 = none)", 0, 3600, 120, 10)
+        replicates = st.sidebar.number_input(
+            "Runs per solver (different seeds; more than 1 reports mean, confidence interval "
+            "and time-to-target, without time limits)", 1, 100, 1
+        )
+        params['runner'] = {
+            'parallel': parallel,
+            'time_limit': time_limit or None,
+            'replicates': int(replicates)
+        }
+        
+        trace_memory = st.sidebar.checkbox("Trace peak memory (slower)", value=False)
+        profile = st.sidebar.checkbox("Profile solvers (cProfile dumps in 'profiles/')", value=False)
+        params['instrument'] = {
+            'trace_memory': trace_memory,
+            'profile_dir': 'profiles' if profile else None
+        }
+        
         # A* doesn't have many adjustable parameters, but we can add them if needed
         
         return {
             'use_genetic': use_genetic,
             'use_astar': use_astar,
             'use_qlearning': use_qlearning,
+            'use_heldkarp': use_heldkarp,
+            'use_local_search': use_local_search,
+            'use_annealing': use_annealing,
+            'use_multi_vehicle': use_multi_vehicle,
             'params': params
         } 
\ No newline at end of file
@@ -1,6 +1,8 @@
+import html
+import time
 import streamlit as st
 import folium
-from folium.plugins import MarkerCluster
+from folium.plugins import MarkerCluster, FastMarkerCluster
 from streamlit_folium import folium_static
 import pandas as pd
 import numpy as np
@@ -13,18 +15,39 @@ import polyline
 # Import the DirectionsAPI
 try:
     from path_finder.api.directions import DirectionsAPI
+    from path_finder.utils.geometry import fit_zoom, pixel_tolerance, simplify_latlng
+    from path_finder.utils.comparison import ALGORITHM_COLORS
 except ImportError:
     from api.directions import DirectionsAPI
+    from utils.geometry import fit_zoom, pixel_tolerance, simplify_latlng
+    from utils.comparison import ALGORITHM_COLORS
+
+# Above this many stops routes are drawn as straight lines between stops
+# instead of requesting road geometry for every leg
+ROAD_ALIGNED_MAX_STOPS = 50
+
+# Markers of the lightweight map are created in the browser from one data array
+FAST_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(row[2]);
+    return marker;
+}
+"""
 
 class MapVisualization:
     def __init__(self):
         """Initialize the map visualization component."""
-        self.color_map = {
-            'Genetic Algorithm': 'blue',
-            'A* Search': 'red',
-            'Q-Learning': 'green'
-        }
-        self.directions_api = DirectionsAPI()  # Add the DirectionsAPI
+        self.color_map = dict(ALGORITHM_COLORS)
+        self._directions_api = None
+        self._leg_cache = {}
+    
+    @property
+    def directions_api(self):
+        """DirectionsAPI client, created on first use (straight-line maps need no API key)."""
+        if self._directions_api is None:
+            self._directions_api = DirectionsAPI()
+        return self._directions_api
     
     def _add_road_route(self, map_obj, path, locations_df, color):
         """Add road-aligned path between locations.
@@ -68,43 +91,122 @@ class MapVisualization:
                     dash_array='5, 5'  # Dashed line to indicate it's a fallback
                 ).add_to(map_obj)
     
-    def visualize_routes(self, locations_df, algorithm_results):
+    def _leg_coords(self, origin, dest):
+        """Road geometry of one leg as [lat, lng] rows, or None if the Directions API has none."""
+        key = (tuple(origin), tuple(dest))
+        if key not in self._leg_cache:
+            encoded_polyline = self.directions_api.get_route_polyline(origin, dest)
+            self._leg_cache[key] = polyline.decode(encoded_polyline) if encoded_polyline else None
+        return self._leg_cache[key]
+    
+    def _add_merged_route(self, map_obj, path, coords, color, road_aligned, tolerance, max_points):
         """
-        Visualize multiple algorithm routes on a single map.
+        Add a route as one simplified polyline.
+        
+        The legs are joined into a single line (road geometry when
+        road_aligned, straight otherwise), which is simplified with
+        Douglas-Peucker at the given tolerance. If it still has more than
+        max_points points the tolerance is doubled until it fits.
+        
+        Returns:
+            (points before simplification, points drawn, legs drawn straight)
+        """
+        straight_legs = 0
+        if road_aligned:
+            pieces = [coords[path[:1]]]
+            for origin, dest in zip(path, path[1:]):
+                leg = self._leg_coords(coords[origin], coords[dest])
+                if leg is None:
+                    straight_legs += 1
+                    leg = coords[[origin, dest]]
+                # Each leg starts where the previous one ended
+                pieces.append(np.asarray(leg, dtype=np.float64)[1:])
+            line = np.concatenate(pieces)
+        else:
+            line = coords[path]
+        
+        simplified = simplify_latlng(line, tolerance)
+        while len(simplified) > max_points:
+            tolerance *= 2
+            simplified = simplify_latlng(simplified, tolerance)
+        
+        folium.PolyLine(
+            locations=simplified.tolist(),
+            color=color,
+            weight=4,
+            opacity=0.8
+        ).add_to(map_obj)
+        return len(line), len(simplified), straight_legs
+    
+    def build_route_map(self, locations_df, algorithm_results, lightweight=True, road_aligned=None,
+                        simplify_pixels=1.0, max_route_points=2000):
+        """
+        Build the route map without displaying it.
+        
+        The lightweight mode draws each algorithm's route as one polyline,
+        simplified to about simplify_pixels at the zoom level that fits all
+        stops and capped at max_route_points points, and puts the stops in a
+        FastMarkerCluster, whose markers are created in the browser from a
+        single array. The map HTML then grows with the number of stops by a
+        few dozen bytes per stop instead of a full marker and polyline object
+        per stop and leg. lightweight=False keeps one polyline per leg and
+        one marker object per stop.
         
         Args:
-            locations_df: DataFrame with location data (lat, lng, address)
-            algorithm_results: List of dictionaries with algorithm results
+            road_aligned: Request road geometry for every leg (default: only
+                up to ROAD_ALIGNED_MAX_STOPS stops)
+        
+        Returns:
+            (folium.Map, stats) where stats holds the HTML size in bytes, the
+            build time in seconds and the route points before and after
+            simplification
         """
-        if locations_df.empty or not algorithm_results:
-            st.warning("No data to visualize.")
-            return
+        start = time.perf_counter()
+        if road_aligned is None:
+            road_aligned = len(locations_df) <= ROAD_ALIGNED_MAX_STOPS
         
-        # Create the base map centered on the mean lat/lng
-        center_lat = locations_df['lat'].mean()
-        center_lng = locations_df['lng'].mean()
+        coords = locations_df[['lat', 'lng']].to_numpy(dtype=np.float64)
+        bounds = [coords.min(axis=0).tolist(), coords.max(axis=0).tolist()]
+        zoom = fit_zoom(bounds)
         
-        m = folium.Map(location=[center_lat, center_lng], zoom_start=12)
+        m = folium.Map(location=coords.mean(axis=0).tolist(), zoom_start=zoom)
+        addresses = locations_df['address'].astype(str).tolist() if 'address' in locations_df else [''] * len(coords)
         
         # Add markers for all locations
-        marker_cluster = MarkerCluster().add_to(m)
+        if lightweight:
+            data = [[lat, lng, f"<b>{html.escape(address)}</b>"]
+                    for (lat, lng), address in zip(coords.tolist(), addresses)]
+            FastMarkerCluster(data, callback=FAST_MARKER_CALLBACK).add_to(m)
+        else:
+            marker_cluster = MarkerCluster().add_to(m)
+            for (lat, lng), address in zip(coords.tolist(), addresses):
+                folium.Marker(
+                    location=[lat, lng],
+                    popup=f"<b>{html.escape(address)}</b>",
+                    icon=folium.Icon(icon="globe", prefix="fa")
+                ).add_to(marker_cluster)
         
-        for idx, row in locations_df.iterrows():
-            popup_text = f"<b>{row['address']}</b>"
-            folium.Marker(
-                location=[row['lat'], row['lng']],
-                popup=popup_text,
-                icon=folium.Icon(icon="globe", prefix="fa")
-            ).add_to(marker_cluster)
+        tolerance = pixel_tolerance(zoom, coords[:, 0].mean(), simplify_pixels)
+        points_before = points_after = straight_legs = 0
         
-        # Add routes for each algorithm using road-aligned paths
+        # Add routes for each algorithm
         for result in algorithm_results:
             algorithm_name = result['algorithm']
-            path = result['path']
+            path = list(result['path'])
             color = self.color_map.get(algorithm_name, 'purple')
             
-            # Add the road-aligned route
-            self._add_road_route(m, path, locations_df, color)
+            # Multi-vehicle results are drawn one line per vehicle route
+            for route in result.get('routes') or [path]:
+                if lightweight:
+                    before, after, straight = self._add_merged_route(m, list(route), coords, color, road_aligned,
+                                                                     tolerance, max_route_points)
+                    points_before += before
+                    points_after += after
+                    straight_legs += straight
+                elif road_aligned:
+                    self._add_road_route(m, list(route), locations_df, color)
+                else:
+                    folium.PolyLine(coords[list(route)].tolist(), color=color, weight=4, opacity=0.8).add_to(m)
             
             # Add start and end markers with algorithm name
             start_idx = path[0]
@@ -112,14 +214,14 @@ class MapVisualization:
             
             # Start marker
             folium.Marker(
-                [locations_df.iloc[start_idx]['lat'], locations_df.iloc[start_idx]['lng']],
+                coords[start_idx].tolist(),
                 icon=folium.Icon(icon="play", prefix="fa", color=color),
                 popup=f"Start: {algorithm_name}"
             ).add_to(m)
             
             # End marker
             folium.Marker(
-                [locations_df.iloc[end_idx]['lat'], locations_df.iloc[end_idx]['lng']],
+                coords[end_idx].tolist(),
                 icon=folium.Icon(icon="flag", prefix="fa", color=color),
                 popup=f"End: {algorithm_name}, Distance: {result['distance']:.2f}m"
             ).add_to(m)
@@ -127,7 +229,7 @@ class MapVisualization:
         # Create a legend
         legend_html = '''
         <div style="position: fixed; 
-                    bottom: 50px; left: 50px; width: 200px; height: 130px; 
+                    bottom: 50px; left: 50px; width: 200px; height: auto; 
                     border:2px solid grey; z-index:9999; background-color:white;
                     padding: 10px; border-radius: 5px;">
         <h4 style="margin-top: 0;">Legend</h4>
@@ -146,10 +248,46 @@ class MapVisualization:
         
         m.get_root().html.add_child(folium.Element(legend_html))
         
+        m.fit_bounds(bounds)
+        
+        stats = {
+            'payload_bytes': len(m.get_root().render().encode('utf-8')),
+            'build_time': time.perf_counter() - start,
+            'route_points': points_before,
+            'route_points_drawn': points_after,
+            'straight_legs': straight_legs,
+            'road_aligned': road_aligned
+        }
+        return m, stats
+    
+    def visualize_routes(self, locations_df, algorithm_results, lightweight=True):
+        """
+        Visualize multiple algorithm routes on a single map.
+        
+        Args:
+            locations_df: DataFrame with location data (lat, lng, address)
+            algorithm_results: List of dictionaries with algorithm results
+            lightweight: Merged, simplified routes and a bulk marker layer
+                (see build_route_map)
+        """
+        if locations_df.empty or not algorithm_results:
+            st.warning("No data to visualize.")
+            return
+        
+        m, stats = self.build_route_map(locations_df, algorithm_results, lightweight=lightweight)
+        
         # Display the map
-        st.subheader("Route Visualization (Road-Aligned)")
+        if stats['road_aligned']:
+            st.subheader("Route Visualization (Road-Aligned)")
+        else:
+            st.subheader("Route Visualization")
         folium_static(m)
         
+        caption = f"Map size {stats['payload_bytes'] / 1024:.0f} KiB, built in {stats['build_time']:.2f} s"
+        if lightweight:
+            caption += f"; {stats['route_points_drawn']} of {stats['route_points']} route points drawn"
+        st.caption(caption)
+        
         return m
     
     def visualize_comparison(self, comparison_df):
@@ -157,7 +295,7 @@ class MapVisualization:
         Visualize algorithm performance comparison as a bar chart.
         
         Args:
-            comparison_df: DataFrame with algorithm comparison data
+            comparison_df: Numeric DataFrame from AlgorithmComparison.to_frame()
         """
         if comparison_df.empty:
             st.warning("No comparison data to visualize.")
@@ -165,11 +303,9 @@ class MapVisualization:
         
         st.subheader("Algorithm Performance Comparison")
         
-        # Convert string values back to float for plotting
+        # Durations are stored in seconds but plotted in minutes
         df_plot = comparison_df.copy()
-        df_plot['distance'] = df_plot['distance'].apply(lambda x: float(x.split()[0]))
-        df_plot['duration'] = df_plot['duration'].apply(lambda x: float(x.split()[0]))
-        df_plot['computation_time'] = df_plot['computation_time'].apply(lambda x: float(x.split()[0]))
+        df_plot['duration'] = df_plot['duration'] / 60
         
         # Set up 3 columns for charts
         col1, col2, col3 = st.columns(3)
@@ -180,7 +316,7 @@ class MapVisualization:
         fig3, ax3 = plt.subplots(figsize=(5, 3))
         
         # Plot distance
-        algorithms = df_plot['algorithm'].tolist()
+        algorithms = df_plot['algorithm'].astype(str).tolist()
         colors = [self.color_map.get(alg, 'purple') for alg in algorithms]
         
         ax1.bar(algorithms, df_plot['distance'], color=colors)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Generate route reports for a directory of address CSV files and project snapshots.
+
+Each input gets its own output directory with the comparison CSV, a PDF
+report and/or an HTML map. Reports run in parallel worker processes; a
+throughput summary is printed at the end and written to summary.json.
+
+Usage (from the path_finder directory):
+    python -m reports plans/ --output nightly/ --solvers astar ga
+    python -m reports plans/ --formats pdf html --workers 8 --road-aligned
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+try:
+    from path_finder.reports.batch import SOLVERS, FORMATS, find_inputs, run_batch, summarize
+except ImportError:
+    from reports.batch import SOLVERS, FORMATS, find_inputs, run_batch, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', help="directory with .csv (address column) and .npz snapshot files")
+    parser.add_argument('--output', default='reports_output', help="directory for the reports")
+    parser.add_argument('--solvers', nargs='+', choices=sorted(SOLVERS), default=['astar', 'ga'])
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--road-aligned', action='store_true',
+                        help="request road geometry for HTML maps (one Directions API call per leg)")
+    args = parser.parse_args()
+    
+    filepaths = find_inputs(args.inputs)
+    if not filepaths:
+        print(f"No .csv or .npz files in {args.inputs}")
+        sys.exit(1)
+    
+    os.makedirs(args.output, exist_ok=True)
+    workers = min(args.workers or os.cpu_count() or 1, len(filepaths))
+    print(f"{len(filepaths)} inputs, {workers} workers, solvers: {' '.join(args.solvers)}")
+    print(f"{'input':<32} {'status':<7} {'stops':>6} {'best':<20} {'distance':>12} {'solve s':>8} {'render s':>9}")
+    
+    def show(row):
+        name = os.path.basename(row['input'])
+        if row['status'] == 'done':
+            print(f"{name:<32} {row['status']:<7} {row['stops']:>6} {row['best_algorithm']:<20} "
+                  f"{row['best_distance']:>12.0f} {row['solve_time']:>8.2f} {row['render_time']:>9.2f}", flush=True)
+        else:
+            print(f"{name:<32} {row['status']:<7} {row['error']}", flush=True)
+    
+    rows, wall_time = run_batch(filepaths, args.output, args.solvers, args.formats, workers, args.seed,
+                                args.road_aligned, progress=show)
+    summary = summarize(rows, wall_time, workers)
+    
+    print()
+    print(f"{summary['succeeded']}/{summary['reports']} reports in {wall_time:.1f} s: "
+          f"{summary['reports_per_minute']:.1f} reports/min, {summary['stops_per_second']:.0f} stops/s")
+    if summary['succeeded']:
+        print(f"report time mean {summary['mean_report_time']:.2f} s, p95 {summary['p95_report_time']:.2f} s; "
+              f"solving {100 * summary['solve_share']:.0f}%, rendering {100 * summary['render_share']:.0f}%; "
+              f"parallel efficiency {100 * summary['parallel_efficiency']:.0f}%")
+    
+    with open(os.path.join(args.output, 'summary.json'), 'w') as f:
+        json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'summary': summary, 'rows': rows}, f, indent=2)
+    
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
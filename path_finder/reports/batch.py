@@ -0,0 +1,270 @@
+"""
+Batch report generation behind `python -m reports`.
+
+Every input file (a CSV of addresses or a project snapshot) becomes one
+report directory with CSV, PDF and/or HTML map outputs. Reports are
+independent, so they are generated in a process pool, one report per task,
+with Matplotlib on the non-interactive Agg backend.
+"""
+
+import matplotlib
+matplotlib.use('Agg')
+
+import os
+import random
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.utils.comparison import ALGORITHM_COLORS, AlgorithmComparison, format_comparison_dataframe
+    from path_finder.utils.export import ExportManager
+    from path_finder.utils.runner import (solve_genetic, solve_astar, solve_qlearning, solve_heldkarp,
+                                          solve_local_search, solve_simulated_annealing)
+    from path_finder.utils.snapshot import load_snapshot
+except ImportError:
+    from utils.graph import GraphBuilder
+    from utils.comparison import ALGORITHM_COLORS, AlgorithmComparison, format_comparison_dataframe
+    from utils.export import ExportManager
+    from utils.runner import (solve_genetic, solve_astar, solve_qlearning, solve_heldkarp,
+                              solve_local_search, solve_simulated_annealing)
+    from utils.snapshot import load_snapshot
+
+
+# name -> (solver function from utils.runner, parameters)
+SOLVERS = {
+    'astar': (solve_astar, {}),
+    'ga': (solve_genetic, {}),
+    'qlearning': (solve_qlearning, {'mask_visited': True}),
+    'linear-qlearning': (solve_qlearning, {'linear': True}),
+    'heldkarp': (solve_heldkarp, {}),
+    'localsearch': (solve_local_search, {}),
+    # Inputs already run in parallel; restarts share one process
+    'annealing': (solve_simulated_annealing, {'time_limit': 10.0, 'max_workers': 1}),
+}
+
+FORMATS = ('csv', 'pdf', 'html')
+
+INPUT_EXTENSIONS = ('.csv', '.npz')
+
+
+def find_inputs(directory):
+    """Address CSV files and snapshots (.npz) in a directory, sorted by name."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(INPUT_EXTENSIONS))
+
+
+def load_input(filepath):
+    """
+    Read one input file.
+    
+    Snapshots carry their own locations and matrices. CSV files need an
+    'address' column; they are geocoded unless they also have 'lat' and
+    'lng' columns, and their matrices are requested from the Distance Matrix API.
+    
+    Returns:
+        (locations_df, distance_matrix, duration_matrix)
+    """
+    if filepath.lower().endswith('.npz'):
+        with load_snapshot(filepath) as snapshot:
+            return snapshot.locations_df, snapshot.distances, snapshot.durations
+    
+    # The Google API clients are only needed (and only created) for CSV inputs
+    try:
+        from path_finder.api.geocoding import GeocodingAPI
+        from path_finder.api.distance_matrix import DistanceMatrixAPI
+    except ImportError:
+        from api.geocoding import GeocodingAPI
+        from api.distance_matrix import DistanceMatrixAPI
+    
+    addresses_df = pd.read_csv(filepath)
+    if 'address' not in addresses_df.columns:
+        raise ValueError("CSV file must contain a column named 'address'")
+    
+    if {'lat', 'lng'} <= set(addresses_df.columns):
+        locations_df = addresses_df.dropna(subset=['address', 'lat', 'lng']).reset_index(drop=True)
+    else:
+        locations_df = GeocodingAPI().batch_geocode(addresses_df['address'].dropna().tolist())
+    if len(locations_df) < 2:
+        raise ValueError("At least 2 locations are needed")
+    
+    dist_df, dur_df = DistanceMatrixAPI().get_distance_duration_dataframes(locations_df)
+    return locations_df, dist_df.values, dur_df.values
+
+
+def plot_routes(locations_df, algorithm_results, color_map, figsize=(10, 8)):
+    """Static plot of every route over the stops (for PDF reports)."""
+    fig, ax = plt.subplots(figsize=figsize)
+    lat = locations_df['lat'].to_numpy(dtype=np.float64)
+    lng = locations_df['lng'].to_numpy(dtype=np.float64)
+    
+    ax.scatter(lng, lat, s=12, color='black', zorder=3, label='Stops')
+    for result in algorithm_results:
+        label = f"{result['algorithm']} ({result['distance'] / 1000:.1f} km)"
+        # Multi-vehicle results are drawn one line per vehicle route
+        for route in result.get('routes') or [result['path']]:
+            route = np.asarray(route, dtype=np.intp)
+            ax.plot(lng[route], lat[route], color=color_map.get(result['algorithm'], 'purple'), linewidth=1.5,
+                    alpha=0.8, label=label)
+            label = None
+    
+    ax.set_title('Optimized Routes')
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    ax.legend()
+    fig.tight_layout()
+    
+    return fig
+
+
+def generate_report(filepath, output_dir, solvers, formats=FORMATS, seed=0, road_aligned=False):
+    """
+    Solve one input file and write its outputs to output_dir/<input name>/.
+    
+    Solvers that cannot handle the instance (e.g. Held-Karp above its stop
+    limit) are skipped. Errors are reported in the returned row rather than
+    raised, so one bad input does not stop a batch.
+    
+    Returns:
+        Dictionary with the input, status ('done' or 'error'), stops, the
+        solvers run and skipped, the best algorithm and distance, load, solve,
+        render and total times (s), the output files and the error message
+    """
+    start = time.perf_counter()
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    row = {'input': filepath, 'status': 'done', 'stops': 0, 'solved': [], 'skipped': [],
+           'best_algorithm': None, 'best_distance': None, 'load_time': 0.0, 'solve_time': 0.0,
+           'render_time': 0.0, 'wall_time': 0.0, 'outputs': [], 'error': None}
+    
+    try:
+        locations_df, distances, durations = load_input(filepath)
+        row['stops'] = len(locations_df)
+        row['load_time'] = time.perf_counter() - start
+        
+        solve_start = time.perf_counter()
+        results = []
+        for solver in solvers:
+            function, params = SOLVERS[solver]
+            random.seed(seed)
+            np.random.seed(seed)
+            try:
+                result, _ = function(GraphBuilder(locations_df, distances, durations), **params)
+            except ValueError as e:
+                row['skipped'].append(f"{solver}: {e}")
+                continue
+            results.append(result)
+            row['solved'].append(solver)
+        row['solve_time'] = time.perf_counter() - solve_start
+        
+        if not results:
+            raise ValueError("No solver could handle this input")
+        
+        render_start = time.perf_counter()
+        comparison = AlgorithmComparison()
+        comparison.add_results(results)
+        best_name, best = comparison.best_algorithm()
+        row['best_algorithm'] = str(best_name)
+        row['best_distance'] = float(best['distance'])
+        
+        export_manager = ExportManager(os.path.join(output_dir, name))
+        display_df = format_comparison_dataframe(comparison.to_frame())
+        
+        if 'csv' in formats:
+            row['outputs'].extend(export_manager.export_to_csv(display_df, locations_df, name))
+        
+        if 'pdf' in formats:
+            comparison_plot = comparison.plot_comparison()
+            route_plot = plot_routes(locations_df, results, ALGORITHM_COLORS)
+            row['outputs'].append(export_manager.export_to_pdf(display_df, locations_df, route_plot,
+                                                               comparison_plot, name))
+            plt.close(comparison_plot)
+            plt.close(route_plot)
+        
+        if 'html' in formats:
+            # Folium (and the dashboard modules around it) are only needed for HTML maps
+            try:
+                from path_finder.gui.map_visualization import MapVisualization
+            except ImportError:
+                from gui.map_visualization import MapVisualization
+            route_map, _ = MapVisualization().build_route_map(locations_df, results, road_aligned=road_aligned)
+            html_path = os.path.join(export_manager.output_dir, f"{name}_map.html")
+            route_map.save(html_path)
+            row['outputs'].append(html_path)
+        
+        row['render_time'] = time.perf_counter() - render_start
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = f"{type(e).__name__}: {e}"
+    
+    row['wall_time'] = time.perf_counter() - start
+    return row
+
+
+def _init_worker():
+    matplotlib.use('Agg')
+    # DEAP warns every time the GA registers its creator classes again
+    warnings.simplefilter('ignore', RuntimeWarning)
+
+
+def run_batch(filepaths, output_dir, solvers, formats=FORMATS, workers=None, seed=0, road_aligned=False,
+              progress=None):
+    """
+    Generate a report for every input file, in parallel.
+    
+    Args:
+        workers: Worker processes (default: os.cpu_count()); 1 runs in this process
+        progress: Optional callable receiving each row as its report finishes
+    
+    Returns:
+        (rows in input order, total wall time in seconds)
+    """
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, max(len(filepaths), 1))
+    rows = []
+    
+    if workers <= 1:
+        _init_worker()
+        for filepath in filepaths:
+            rows.append(generate_report(filepath, output_dir, solvers, formats, seed, road_aligned))
+            if progress is not None:
+                progress(rows[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = [executor.submit(generate_report, filepath, output_dir, solvers, formats, seed, road_aligned)
+                       for filepath in filepaths]
+            for future in as_completed(futures):
+                rows.append(future.result())
+                if progress is not None:
+                    progress(rows[-1])
+    
+    order = {filepath: index for index, filepath in enumerate(filepaths)}
+    rows.sort(key=lambda row: order[row['input']])
+    return rows, time.perf_counter() - start
+
+
+def summarize(rows, wall_time, workers):
+    """Throughput of a batch: reports per minute, stops per second and the report time distribution."""
+    done = [row for row in rows if row['status'] == 'done']
+    report_times = np.array([row['wall_time'] for row in done])
+    busy_time = sum(row['wall_time'] for row in rows)
+    
+    return {
+        'reports': len(rows),
+        'succeeded': len(done),
+        'failed': len(rows) - len(done),
+        'workers': workers,
+        'wall_time': wall_time,
+        'reports_per_minute': 60 * len(done) / wall_time if wall_time > 0 else 0.0,
+        'stops_per_second': sum(row['stops'] for row in done) / wall_time if wall_time > 0 else 0.0,
+        'mean_report_time': float(report_times.mean()) if len(done) else None,
+        'p95_report_time': float(np.quantile(report_times, 0.95)) if len(done) else None,
+        'solve_share': sum(row['solve_time'] for row in done) / busy_time if busy_time > 0 else 0.0,
+        'render_share': sum(row['render_time'] for row in done) / busy_time if busy_time > 0 else 0.0,
+        # Busy time of all workers relative to what they could have done in the wall time
+        'parallel_efficiency': busy_time / (wall_time * workers) if wall_time > 0 else 0.0
+    }
@@ -3,51 +3,262 @@ import time
 import matplotlib.pyplot as plt
 import numpy as np
 
+try:
+    from path_finder.utils.instrumentation import flatten_report
+except ImportError:
+    from utils.instrumentation import flatten_report
+
+# Numeric columns every result has; any other keyword passed to add_result()
+# becomes an extra float column (NaN for rows that do not set it)
+BASE_METRICS = ('distance', 'duration', 'computation_time')
+
+# Colour of every algorithm's route on maps and route plots (any colour name
+# folium and Matplotlib both know); unknown algorithms are drawn in purple
+ALGORITHM_COLORS = {
+    'Genetic Algorithm': 'blue',
+    'A* Search': 'red',
+    'Q-Learning': 'green',
+    'Q-Learning (Linear)': 'darkgreen',
+    'Held-Karp': 'orange',
+    'Local Search': 'cadetblue',
+    'Simulated Annealing': 'purple',
+    'Multi-Vehicle': 'darkblue'
+}
+
+
 class AlgorithmComparison:
-    def __init__(self):
-        self.results = {
-            'algorithm': [],
-            'distance': [],
-            'duration': [],
-            'computation_time': [],
-            'path': []
-        }
-    
-    def add_result(self, algorithm_name, path, distance, duration, computation_time):
-        """Add a single algorithm's result to the comparison."""
-        self.results['algorithm'].append(algorithm_name)
-        self.results['distance'].append(distance)
-        self.results['duration'].append(duration)
-        self.results['computation_time'].append(computation_time)
-        self.results['path'].append(path)
+    def __init__(self, initial_capacity=64):
+        """
+        Collect algorithm results for comparison.
+        
+        Results are stored column by column: raw float64 arrays for the metrics,
+        integer codes for the algorithm and instance labels and a list for the
+        paths. Arrays grow by doubling, so appending thousands of runs (several
+        seeds and instances per algorithm) stays cheap. Numbers are only turned
+        into strings by format_comparison_dataframe(), at display or export time.
+        """
+        self._size = 0
+        self._capacity = initial_capacity
+        self._metrics = {name: np.full(initial_capacity, np.nan) for name in BASE_METRICS}
+        self._labels = {name: np.zeros(initial_capacity, dtype=np.int32) for name in ('algorithm', 'instance')}
+        self._label_values = {name: [] for name in self._labels}
+        self._label_codes = {name: {} for name in self._labels}
+        self._seeds = np.zeros(initial_capacity, dtype=np.int64)
+        self._paths = []
+    
+    def __len__(self):
+        return self._size
+    
+    @property
+    def results(self):
+        """Results as a dictionary of lists (raw numbers), one entry per run."""
+        frame = self.to_frame()
+        return {column: frame[column].tolist() for column in frame.columns}
+    
+    def _grow(self, required):
+        capacity = self._capacity
+        while capacity < required:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        
+        for name, column in self._metrics.items():
+            grown = np.full(capacity, np.nan)
+            grown[:self._size] = column[:self._size]
+            self._metrics[name] = grown
+        for name, column in self._labels.items():
+            grown = np.zeros(capacity, dtype=np.int32)
+            grown[:self._size] = column[:self._size]
+            self._labels[name] = grown
+        grown = np.zeros(capacity, dtype=np.int64)
+        grown[:self._size] = self._seeds[:self._size]
+        self._seeds = grown
+        self._capacity = capacity
+    
+    def _code(self, label, value):
+        """Integer code of a label value, registering it on first use."""
+        codes = self._label_codes[label]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._label_values[label])
+            self._label_values[label].append(value)
+        return code
+    
+    def add_result(self, algorithm_name, path, distance, duration, computation_time,
+                   instance='', seed=0, **metrics):
+        """
+        Add a single algorithm's result to the comparison.
+        
+        Args:
+            instance: Label of the problem instance (for aggregating over instances)
+            seed: Random seed of the run
+            **metrics: Extra numeric values to store with the run (e.g. evaluations)
+        """
+        row = self._size
+        self._grow(row + 1)
+        
+        self._metrics['distance'][row] = distance
+        self._metrics['duration'][row] = duration
+        self._metrics['computation_time'][row] = computation_time
+        for name, value in metrics.items():
+            if name not in self._metrics:
+                self._metrics[name] = np.full(self._capacity, np.nan)
+            self._metrics[name][row] = np.nan if value is None else value
+        
+        self._labels['algorithm'][row] = self._code('algorithm', algorithm_name)
+        self._labels['instance'][row] = self._code('instance', instance)
+        self._seeds[row] = seed
+        self._paths.append(list(path))
+        self._size += 1
+    
+    def add_results(self, results, instance='', seed=0):
+        """
+        Add several result dictionaries (as returned by the solvers) in one call.
+        
+        Scalar numeric extras (e.g. episodes) and the solver's instrumentation
+        report (time_<phase>, counters, peak_memory_mib) become metric columns.
+        Multi-vehicle results keep their routes (a list of paths) as the path.
+        """
+        for result in results:
+            # Keep the scalar numeric extras (e.g. episodes, states_expanded)
+            extra = {key: value for key, value in result.items()
+                     if key not in BASE_METRICS and key != 'seed' and not isinstance(value, bool)
+                     and isinstance(value, (int, float, np.number))}
+            if result.get('instrumentation'):
+                extra.update(flatten_report(result['instrumentation']))
+            self.add_result(result['algorithm'], result.get('routes') or result['path'],
+                            result['distance'], result['duration'],
+                            result['computation_time'], instance=result.get('instance', instance),
+                            seed=result.get('seed', seed), **extra)
+    
+    def to_frame(self):
+        """
+        Results as a DataFrame of raw numbers (no formatting).
+        
+        Columns: algorithm, distance (m), duration (s), computation_time (s),
+        path, then instance and seed when more than one instance or seed was
+        added, then any extra metrics.
+        """
+        size = self._size
+        frame = pd.DataFrame({
+            'algorithm': pd.Categorical.from_codes(self._labels['algorithm'][:size],
+                                                   categories=self._label_values['algorithm'])
+                         if size else pd.Categorical([]),
+            'distance': self._metrics['distance'][:size],
+            'duration': self._metrics['duration'][:size],
+            'computation_time': self._metrics['computation_time'][:size],
+            'path': pd.Series(self._paths, dtype=object)
+        })
+        
+        if len(self._label_values['instance']) > 1:
+            frame['instance'] = np.array(self._label_values['instance'], dtype=object)[self._labels['instance'][:size]]
+        if size and np.any(self._seeds[:size] != self._seeds[0]):
+            frame['seed'] = self._seeds[:size]
+        for name, column in self._metrics.items():
+            if name not in BASE_METRICS:
+                frame[name] = column[:size]
+        return frame
     
     def get_comparison_dataframe(self):
-        """Convert results to a DataFrame for easy display and analysis."""
-        df = pd.DataFrame(self.results)
+        """Convert results to a formatted DataFrame for display."""
+        return format_comparison_dataframe(self.to_frame())
+    
+    def aggregate(self, metrics=BASE_METRICS, quantile=0.95):
+        """
+        Summarise the runs of every algorithm.
         
-        # Format the columns for better readability
-        df['distance'] = df['distance'].apply(lambda x: f"{x:.2f} meters")
-        df['duration'] = df['duration'].apply(lambda x: f"{x/60:.2f} minutes")
-        df['computation_time'] = df['computation_time'].apply(lambda x: f"{x:.4f} seconds")
+        Returns one row per algorithm with the number of runs, the mean,
+        median and given quantile of every metric, and the win rate: the
+        share of (instance, seed) groups in which the algorithm found the
+        shortest distance (ties count as a win for each tied algorithm).
+        """
+        if not self._size:
+            raise ValueError("No results to compare")
         
-        # Format path as node sequence
-        df['path'] = df['path'].apply(lambda x: ' → '.join(map(str, x)))
+        size = self._size
+        algorithm = self._labels['algorithm'][:size]
+        values = pd.DataFrame({name: self._metrics[name][:size] for name in metrics})
+        grouped = values.groupby(algorithm)
         
-        return df
+        summary = pd.concat({
+            'mean': grouped.mean(),
+            'median': grouped.median(),
+            f'p{int(round(quantile * 100))}': grouped.quantile(quantile)
+        }, axis=1)
+        # Flatten to 'distance_mean', 'distance_median', ...
+        summary.columns = [f"{metric}_{statistic}" for statistic, metric in summary.columns]
+        summary = summary[sorted(summary.columns, key=lambda name: (metrics.index(name.rsplit('_', 1)[0]), name))]
+        
+        # Win rate over (instance, seed) groups
+        _, group = np.unique(np.stack([self._labels['instance'][:size], self._seeds[:size]]), axis=1,
+                             return_inverse=True)
+        group = group.ravel()
+        distance = self._metrics['distance'][:size]
+        best = np.full(group.max() + 1, np.inf)
+        np.minimum.at(best, group, distance)
+        wins = distance <= best[group] * (1 + 1e-9)
+        
+        summary.insert(0, 'runs', np.bincount(algorithm)[summary.index])
+        summary['win_rate'] = np.bincount(algorithm, weights=wins)[summary.index] / summary['runs']
+        summary.index = [self._label_values['algorithm'][code] for code in summary.index]
+        summary.index.name = 'algorithm'
+        return summary
+    
+    def statistics(self, metrics=('distance', 'computation_time'), confidence=0.95, n_bootstrap=2000, seed=0):
+        """
+        Mean, standard deviation and confidence interval of the mean per algorithm.
+        
+        Meant for replicated runs (several seeds per algorithm). The interval
+        is a percentile bootstrap, so it makes no normality assumption about
+        the distances of stochastic solvers; with a single run it collapses
+        to that run and the standard deviation is NaN.
+        
+        Returns:
+            DataFrame indexed by algorithm with 'runs' and, per metric,
+            <metric>_mean, <metric>_std, <metric>_ci_low and <metric>_ci_high
+        """
+        if not self._size:
+            raise ValueError("No results to compare")
+        
+        size = self._size
+        algorithm = self._labels['algorithm'][:size]
+        rng = np.random.default_rng(seed)
+        tail = (1 - confidence) / 2
+        rows = {}
+        
+        for code in np.unique(algorithm):
+            selected = algorithm == code
+            row = {'runs': int(selected.sum())}
+            for metric in metrics:
+                values = self._metrics[metric][:size][selected]
+                values = values[~np.isnan(values)]
+                if not len(values):
+                    row.update({f"{metric}_{name}": np.nan for name in ('mean', 'std', 'ci_low', 'ci_high')})
+                    continue
+                # Resample all bootstrap replicates at once: n_bootstrap x runs
+                means = values[rng.integers(0, len(values), (n_bootstrap, len(values)))].mean(axis=1)
+                row[f"{metric}_mean"] = values.mean()
+                row[f"{metric}_std"] = values.std(ddof=1) if len(values) > 1 else np.nan
+                row[f"{metric}_ci_low"], row[f"{metric}_ci_high"] = np.quantile(means, [tail, 1 - tail])
+            rows[self._label_values['algorithm'][code]] = row
+        
+        summary = pd.DataFrame.from_dict(rows, orient='index')
+        summary.index.name = 'algorithm'
+        return summary
     
     def plot_comparison(self, figsize=(12, 6)):
         """Visualize the comparison between algorithms."""
-        if not self.results['algorithm']:
+        if not self._size:
             raise ValueError("No results to compare")
         
-        # Convert string values back to float for plotting
-        distances = [float(d.split()[0]) for d in self.results['distance']]
-        durations = [float(d.split()[0]) for d in self.results['duration']]
-        comp_times = [float(c.split()[0]) for c in self.results['computation_time']]
+        frame = self.to_frame()
+        distances = frame['distance']
+        durations = frame['duration'] / 60
+        comp_times = frame['computation_time']
         
         # Set up the figure with 3 subplots
         fig, axes = plt.subplots(1, 3, figsize=figsize)
-        algorithms = self.results['algorithm']
+        algorithms = frame['algorithm'].astype(str).tolist()
         
         # Plot distances
         axes[0].bar(algorithms, distances, color='skyblue')
@@ -74,23 +285,35 @@ class AlgorithmComparison:
     
     def best_algorithm(self, criterion='distance'):
         """Determine the best algorithm based on the given criterion."""
-        if not self.results['algorithm']:
+        if not self._size:
             raise ValueError("No results to compare")
-        
-        df = pd.DataFrame(self.results)
-        
-        # Convert string values back to float for comparison
-        if criterion == 'distance':
-            df['distance'] = df['distance'].apply(lambda x: float(x.split()[0]))
-            best_idx = df['distance'].idxmin()
-        elif criterion == 'duration':
-            df['duration'] = df['duration'].apply(lambda x: float(x.split()[0]))
-            best_idx = df['duration'].idxmin()
-        elif criterion == 'computation_time':
-            df['computation_time'] = df['computation_time'].apply(lambda x: float(x.split()[0]))
-            best_idx = df['computation_time'].idxmin()
-        else:
+        if criterion not in BASE_METRICS:
             raise ValueError("Criterion must be 'distance', 'duration', or 'computation_time'")
         
-        best_algorithm = df.iloc[best_idx]
-        return best_algorithm['algorithm'], best_algorithm 
\ No newline at end of file
+        best_idx = int(np.argmin(self._metrics[criterion][:self._size]))
+        best_algorithm = self.to_frame().iloc[best_idx]
+        return best_algorithm['algorithm'], best_algorithm
+
+
+def format_comparison_dataframe(comparison_df):
+    """
+    Human-readable copy of a numeric comparison DataFrame (from AlgorithmComparison.to_frame()).
+    
+    Distances are shown in meters, durations in minutes, computation times in
+    seconds and paths as node sequences (one per vehicle for multi-vehicle results).
+    """
+    df = comparison_df.copy()
+    if df.empty:
+        return df
+    
+    df['algorithm'] = df['algorithm'].astype(str)
+    df['distance'] = [f"{x:.2f} meters" for x in df['distance']]
+    df['duration'] = [f"{x/60:.2f} minutes" for x in df['duration']]
+    df['computation_time'] = [f"{x:.4f} seconds" for x in df['computation_time']]
+    
+    # Format path as node sequence, vehicle routes separated by ' | '
+    df['path'] = [' | '.join(' → '.join(map(str, route)) for route in path)
+                  if len(path) and isinstance(path[0], (list, tuple)) else ' → '.join(map(str, path))
+                  for path in df['path']]
+    
+    return df
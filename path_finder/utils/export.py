@@ -1,4 +1,12 @@
 import os
+import hashlib
+import itertools
+import json
+import math
+import weakref
+import zlib
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from fpdf import FPDF
@@ -6,10 +14,51 @@ import matplotlib.pyplot as plt
 import base64
 from io import BytesIO
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for Parquet/Arrow datasets
+    pa = pq = None
+
+# Columns shown in the PDF comparison table
+TABLE_COLUMNS = ('algorithm', 'distance', 'duration', 'computation_time', 'path')
+
+# Location table layout: (header, column, cell width in mm)
+LOCATION_COLUMNS = (('#', None, 12), ('Address', 'address', 118), ('Latitude', 'lat', 30), ('Longitude', 'lng', 30))
+
+# Dataset tables and their column types. The schemas are fixed, so every
+# export (and every chunk of one) has the same columns in the same order.
+DATASET_SCHEMAS = {
+    'locations': (('index', 'int32'), ('address', 'string'), ('lat', 'float64'), ('lng', 'float64')),
+    'routes': (('algorithm', 'string'), ('vehicle', 'int32'), ('distance', 'float64'), ('duration', 'float64'),
+               ('computation_time', 'float64'), ('stops', 'int32'), ('path', 'list<int32>')),
+    'legs': (('algorithm', 'string'), ('vehicle', 'int32'), ('leg', 'int32'),
+             ('from_node', 'int32'), ('to_node', 'int32'),
+             ('distance', 'float64'), ('duration', 'float64'),
+             ('cumulative_distance', 'float64'), ('cumulative_duration', 'float64')),
+    'matrices': (('origin', 'int32'), ('distance', 'list<float64>'), ('duration', 'list<float64>')),
+}
+
+DATASET_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow', 'ndjson': '.ndjson'}
+
 class ExportManager:
-    def __init__(self, output_dir="exports"):
-        """Initialize the export manager with an output directory."""
+    def __init__(self, output_dir="exports", dpi=150, image_cache_size=32):
+        """
+        Initialize the export manager with an output directory.
+        
+        Args:
+            dpi: Resolution at which figures are rendered into PDFs
+            image_cache_size: Number of encoded figures kept between exports;
+                a figure that has not changed since it was last exported is
+                neither rendered nor encoded again, and one whose pixels are
+                unchanged is not encoded again
+        """
         self.output_dir = output_dir
+        self.dpi = dpi
+        self.image_cache_size = image_cache_size
+        self._image_cache = OrderedDict()
+        # Figure -> (dpi, cache key) of its last render
+        self._figure_keys = weakref.WeakKeyDictionary()
         
         # Create output directory if it doesn't exist
         if not os.path.exists(output_dir):
@@ -37,6 +86,69 @@ class ExportManager:
         
         return filepath, locations_filepath
     
+    def export_dataset(self, locations_df, algorithm_results, distance_matrix, duration_matrix, name=None,
+                       format='parquet', include_matrices=False, chunk_size=50000):
+        """
+        Export locations, routes, per-leg costs and optionally the matrices as a columnar dataset.
+        
+        Every table is written in chunks of about chunk_size rows to its own
+        file in a new directory, next to a dataset.json manifest listing the
+        files, row counts and column types (see DATASET_SCHEMAS). Routes keep
+        their node indices as integer lists, one row per vehicle route for
+        multi-vehicle results (numbered in the vehicle column, 0 otherwise);
+        legs hold the distance and duration of every step of every route with
+        running totals per route, read from the upper
+        triangle of the matrices for both directions like the solvers do (see
+        GraphBuilder.get_weight_matrix), so they add up to the route totals.
+        Matrices are stored as given, one row per origin.
+        
+        Args:
+            format: 'parquet' or 'arrow' (both need pyarrow) or 'ndjson'
+            include_matrices: Also write the distance and duration matrices
+        
+        Returns:
+            Path of the dataset directory
+        """
+        if format not in DATASET_FORMATS:
+            raise ValueError(f"Unknown dataset format '{format}', expected one of {sorted(DATASET_FORMATS)}")
+        if format != 'ndjson' and pa is None:
+            raise ImportError(f"The {format} format needs pyarrow (pip install pyarrow); use format='ndjson' without it")
+        
+        if name is None:
+            name = f"path_finder_dataset_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        directory = os.path.join(self.output_dir, name)
+        os.makedirs(directory, exist_ok=True)
+        
+        distance_matrix = np.asarray(distance_matrix, dtype=np.float64)
+        duration_matrix = np.asarray(duration_matrix, dtype=np.float64)
+        tables = {
+            'locations': _location_chunks(locations_df, chunk_size),
+            'routes': _route_chunks(algorithm_results, chunk_size),
+            'legs': _leg_chunks(algorithm_results, distance_matrix, duration_matrix, chunk_size)
+        }
+        if include_matrices:
+            tables['matrices'] = _matrix_chunks(distance_matrix, duration_matrix, chunk_size)
+        
+        manifest = {'format': format, 'created': datetime.now().isoformat(timespec='seconds'), 'tables': {}}
+        for table, chunks in tables.items():
+            filename = table + DATASET_FORMATS[format]
+            writer = _DatasetWriter(os.path.join(directory, filename), DATASET_SCHEMAS[table], format)
+            try:
+                for chunk in chunks:
+                    writer.write(chunk)
+            finally:
+                writer.close()
+            manifest['tables'][table] = {
+                'file': filename,
+                'rows': writer.rows,
+                'columns': [list(column) for column in DATASET_SCHEMAS[table]]
+            }
+        
+        with open(os.path.join(directory, 'dataset.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        
+        return directory
+    
     def export_to_pdf(self, comparison_df, locations_df, route_map=None, comparison_plot=None, filename=None):
         """Export the algorithm comparison, location data, and visualizations to PDF."""
         if filename is None:
@@ -49,8 +161,22 @@ class ExportManager:
         
         filepath = os.path.join(self.output_dir, filename)
         
+        with open(filepath, 'wb') as f:
+            f.write(self.render_pdf(comparison_df, locations_df, route_map, comparison_plot))
+        
+        return filepath
+    
+    def render_pdf(self, comparison_df, locations_df, route_map=None, comparison_plot=None):
+        """
+        Build the PDF report in memory and return its bytes.
+        
+        Figures are rendered straight into the PDF without temporary files.
+        Every location is listed; tables continue over as many pages as
+        needed with the header repeated on each page.
+        """
         # Create PDF instance
         pdf = FPDF()
+        pdf.set_auto_page_break(True, margin=15)
         pdf.add_page()
         
         # Title
@@ -66,58 +192,44 @@ class ExportManager:
         # Algorithm Comparison Table
         pdf.set_font("Arial", "B", 12)
         pdf.cell(0, 10, "Algorithm Comparison", ln=True)
-        pdf.set_font("Arial", "", 8)
-        
-        # Table header
-        col_width = 40
-        row_height = 7
-        pdf.set_fill_color(200, 220, 255)
-        for header in comparison_df.columns:
-            pdf.cell(col_width, row_height, header, border=1, fill=True)
-        pdf.ln(row_height)
-        
-        # Table data
-        for _, row in comparison_df.iterrows():
-            for value in row:
-                pdf.cell(col_width, row_height, str(value)[:38], border=1)
-            pdf.ln(row_height)
         
+        # The main table keeps the columns every result has; instrumentation
+        # columns (phase times, counters) are listed per algorithm below it
+        main_columns = [column for column in TABLE_COLUMNS if column in comparison_df.columns]
+        extra_columns = [column for column in comparison_df.columns if column not in TABLE_COLUMNS]
+        
+        widths = [190 / max(len(main_columns), 1)] * len(main_columns)
+        self._write_table(pdf, main_columns, widths, [comparison_df[column].tolist() for column in main_columns])
         pdf.ln(10)
         
+        if extra_columns:
+            pdf.set_font("Arial", "B", 12)
+            pdf.cell(0, 10, "Instrumentation", ln=True)
+            for row in comparison_df.to_dict('records'):
+                pdf.set_font("Arial", "B", 8)
+                pdf.cell(0, 5, _pdf_text(row.get('algorithm', '')), ln=True)
+                pdf.set_font("Arial", "", 8)
+                values = [f"{column}: {row[column]:.4g}" for column in extra_columns
+                          if isinstance(row[column], (int, float)) and not pd.isna(row[column])]
+                pdf.multi_cell(0, 5, ", ".join(values) or "-")
+            pdf.ln(5)
+        
         # Location Data
         pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, "Delivery Locations", ln=True)
-        pdf.set_font("Arial", "", 8)
-        
-        # Table header
-        col_width = 40
-        for header in ['Address', 'Latitude', 'Longitude']:
-            if header in locations_df.columns:
-                pdf.cell(col_width, row_height, header, border=1, fill=True)
-        pdf.ln(row_height)
-        
-        # Table data (limit to first 20 locations for readability)
-        max_locations = min(20, len(locations_df))
-        for i in range(max_locations):
-            row = locations_df.iloc[i]
-            pdf.cell(col_width, row_height, str(row.get('address', ''))[:38], border=1)
-            pdf.cell(col_width, row_height, str(row.get('lat', ''))[:38], border=1)
-            pdf.cell(col_width, row_height, str(row.get('lng', ''))[:38], border=1)
-            pdf.ln(row_height)
+        pdf.cell(0, 10, f"Delivery Locations ({len(locations_df)})", ln=True)
         
-        pdf.ln(10)
+        headers = [header for header, column, _ in LOCATION_COLUMNS if column is None or column in locations_df.columns]
+        widths = [width for _, column, width in LOCATION_COLUMNS if column is None or column in locations_df.columns]
+        columns = [range(len(locations_df)) if column is None else locations_df[column].tolist()
+                   for _, column, _ in LOCATION_COLUMNS if column is None or column in locations_df.columns]
+        self._write_table(pdf, headers, widths, columns)
         
         # Add Comparison Plot if provided
         if comparison_plot:
             pdf.add_page()
             pdf.set_font("Arial", "B", 12)
             pdf.cell(0, 10, "Algorithm Performance Comparison", ln=True)
-            
-            img_file = os.path.join(self.output_dir, "temp_comparison_plot.png")
-            comparison_plot.savefig(img_file, dpi=300, bbox_inches='tight')
-            pdf.image(img_file, x=20, w=170)
-            os.remove(img_file)  # Clean up temp file
-            
+            self._add_figure(pdf, comparison_plot, x=20, w=170)
             pdf.ln(10)
         
         # Add Route Map if provided
@@ -125,21 +237,262 @@ class ExportManager:
             pdf.add_page()
             pdf.set_font("Arial", "B", 12)
             pdf.cell(0, 10, "Optimized Route Map", ln=True)
-            
-            img_file = os.path.join(self.output_dir, "temp_route_map.png")
-            route_map.savefig(img_file, dpi=300, bbox_inches='tight')
-            pdf.image(img_file, x=20, w=170)
-            os.remove(img_file)  # Clean up temp file
+            self._add_figure(pdf, route_map, x=20, w=170)
         
-        # Save the PDF
-        pdf.output(filepath)
+        # fpdf 1.7 returns the document as a latin-1 string
+        return pdf.output(dest='S').encode('latin-1')
+    
+    def _write_table(self, pdf, headers, widths, columns, row_height=7):
+        """
+        Write a table given column-wise values, one page at a time.
         
-        return filepath
+        Rows are written straight from the column lists (no per-row DataFrame
+        access); when a page is full a new one is started and the header is
+        repeated.
+        """
+        def header():
+            pdf.set_font("Arial", "B", 8)
+            pdf.set_fill_color(200, 220, 255)
+            for title, width in zip(headers, widths):
+                pdf.cell(width, row_height, title, border=1, fill=True)
+            pdf.ln(row_height)
+            pdf.set_font("Arial", "", 8)
+        
+        header()
+        # Characters that fit in each column at font size 8 (about 1.6 mm each)
+        limits = [max(int(width / 1.6), 4) for width in widths]
+        
+        for row in zip(*columns):
+            if pdf.get_y() + row_height > pdf.page_break_trigger:
+                pdf.add_page()
+                header()
+            for value, width, limit in zip(row, widths, limits):
+                pdf.cell(width, row_height, _pdf_text(value, limit), border=1)
+            pdf.ln(row_height)
+    
+    def _add_figure(self, pdf, fig, x, w):
+        """
+        Place a matplotlib figure in the PDF, rendering it only if it changed
+        since its last export and encoding it only if its pixels are new.
+        """
+        # Matplotlib marks a figure stale whenever one of its artists changes,
+        # so an unchanged figure that is still cached can be placed as it is
+        last = self._figure_keys.get(fig)
+        if last is not None and last[0] == self.dpi and not fig.stale and last[1] in self._image_cache:
+            key = last[1]
+            self._image_cache.move_to_end(key)
+        else:
+            rgb = _render_rgb(fig, self.dpi)
+            key = 'figure-' + hashlib.sha1(rgb.tobytes()).hexdigest()
+            # Rendering left every artist drawn; only restoring the DPI marked
+            # the figure itself stale, and any later change marks it again
+            fig.stale = False
+            self._figure_keys[fig] = (self.dpi, key)
+            
+            if key in self._image_cache:
+                self._image_cache.move_to_end(key)
+            else:
+                height, width = rgb.shape[:2]
+                self._image_cache[key] = {'w': width, 'h': height, 'cs': 'DeviceRGB', 'bpc': 8,
+                                          'f': 'FlateDecode', 'data': zlib.compress(rgb.tobytes(), 6)}
+                while len(self._image_cache) > self.image_cache_size:
+                    self._image_cache.popitem(last=False)
+        info = self._image_cache[key]
+        
+        # fpdf looks images up by name first, so a registered one is never read
+        # from disk; the same figure placed twice is stored once in the file
+        if key not in pdf.images:
+            pdf.images[key] = dict(info, i=len(pdf.images) + 1)
+        pdf.image(key, x=x, w=w)
     
     def fig_to_base64(self, fig):
         """Convert a matplotlib figure to a base64 encoded string for embedding in HTML."""
         buffer = BytesIO()
-        fig.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
+        fig.savefig(buffer, format='png', dpi=self.dpi, bbox_inches='tight')
         buffer.seek(0)
         image_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        return image_data 
\ No newline at end of file
+        return image_data
+
+
+def _render_rgb(fig, dpi):
+    """Render a figure at the given DPI to an (height, width, 3) uint8 array on white."""
+    original_dpi = fig.dpi
+    try:
+        fig.set_dpi(dpi)
+        fig.canvas.draw()
+        rgba = np.asarray(fig.canvas.buffer_rgba())
+    except AttributeError:
+        # Canvas without a pixel buffer (non-Agg backend): go through an in-memory PNG
+        buffer = BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi)
+        buffer.seek(0)
+        rgba = (plt.imread(buffer) * 255).round().astype(np.uint8)
+    finally:
+        fig.set_dpi(original_dpi)
+    
+    alpha = rgba[..., 3:4].astype(np.uint16)
+    if alpha.min() == 255:
+        return np.ascontiguousarray(rgba[..., :3])
+    # Composite transparent areas onto white, as a viewer would show them
+    rgb = (rgba[..., :3] * alpha + 255 * (255 - alpha)) // 255
+    return rgb.astype(np.uint8)
+
+
+def _pdf_text(value, limit=None):
+    """Text for the PDF core fonts (latin-1 only), cut to limit characters."""
+    text = str(value).replace('\u2192', '->')
+    if limit is not None and len(text) > limit:
+        text = text[:limit - 3] + '...'
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+class _DatasetWriter:
+    """Append column chunks of one table to a Parquet, Arrow IPC or NDJSON file."""
+    
+    def __init__(self, filepath, schema, format):
+        self.columns = [name for name, _ in schema]
+        self.format = format
+        self.rows = 0
+        
+        if format == 'ndjson':
+            self._file = open(filepath, 'w')
+            return
+        
+        self._schema = pa.schema([(name, _arrow_type(kind)) for name, kind in schema])
+        if format == 'parquet':
+            self._writer = pq.ParquetWriter(filepath, self._schema)
+        else:
+            self._sink = pa.OSFile(filepath, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, self._schema)
+    
+    def write(self, chunk):
+        """Write a chunk given as {column: list or array}, all of the same length."""
+        length = len(chunk[self.columns[0]])
+        if not length:
+            return
+        self.rows += length
+        
+        if self.format == 'ndjson':
+            values = [_json_values(chunk[name]) for name in self.columns]
+            self._file.writelines(json.dumps(dict(zip(self.columns, row))) + '\n' for row in zip(*values))
+        else:
+            self._writer.write_table(pa.Table.from_pydict({name: chunk[name] for name in self.columns},
+                                                          schema=self._schema))
+    
+    def close(self):
+        if self.format == 'ndjson':
+            self._file.close()
+            return
+        self._writer.close()
+        if self.format == 'arrow':
+            self._sink.close()
+
+
+def _arrow_type(kind):
+    if kind.startswith('list<'):
+        return pa.list_(_arrow_type(kind[5:-1]))
+    return {'int32': pa.int32(), 'float64': pa.float64(), 'string': pa.string()}[kind]
+
+
+def _json_values(column):
+    """Plain Python values for json.dumps, with NaN written as null."""
+    values = column.tolist() if isinstance(column, np.ndarray) else list(column)
+    if values and isinstance(values[0], float):
+        return [None if math.isnan(value) else value for value in values]
+    if values and isinstance(values[0], list) and values[0] and isinstance(values[0][0], float):
+        return [[None if math.isnan(value) else value for value in row] for row in values]
+    return values
+
+
+def _location_chunks(locations_df, chunk_size):
+    n = len(locations_df)
+    columns = {
+        'address': locations_df['address'].astype(str).tolist() if 'address' in locations_df else [None] * n,
+        'lat': locations_df['lat'].to_numpy(dtype=np.float64) if 'lat' in locations_df else np.full(n, np.nan),
+        'lng': locations_df['lng'].to_numpy(dtype=np.float64) if 'lng' in locations_df else np.full(n, np.nan)
+    }
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk = {name: values[start:stop] for name, values in columns.items()}
+        chunk['index'] = np.arange(start, stop, dtype=np.int32)
+        yield chunk
+
+
+def _result_routes(result):
+    """
+    (route, distance, duration) of every vehicle of a result.
+    
+    Multi-vehicle results list their routes separately; their path is only
+    the routes one after another, whose joins are not driven.
+    """
+    routes = result.get('routes')
+    if not routes:
+        return [(result['path'], result['distance'], result['duration'])]
+    return list(zip(routes, result['route_distances'], result['route_durations']))
+
+
+def _route_chunks(algorithm_results, chunk_size):
+    rows = ((result, vehicle, route, distance, duration) for result in algorithm_results
+            for vehicle, (route, distance, duration) in enumerate(_result_routes(result)))
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        results, vehicles, routes, distances, durations = zip(*chunk)
+        yield {
+            'algorithm': [str(result['algorithm']) for result in results],
+            'vehicle': np.array(vehicles, dtype=np.int32),
+            'distance': [float(distance) for distance in distances],
+            'duration': [float(duration) for duration in durations],
+            'computation_time': [float(result.get('computation_time', np.nan)) for result in results],
+            'stops': [len(route) for route in routes],
+            'path': [[int(node) for node in route] for route in routes]
+        }
+
+
+def _leg_chunks(algorithm_results, distance_matrix, duration_matrix, chunk_size):
+    """
+    Per-leg costs of every route, looked up in the matrices with one fancy index per route.
+    
+    Costs come from the upper triangle (matrix[min(a, b), max(a, b)]), the
+    value the solvers use for both directions of an edge. Legs are numbered
+    and accumulated per vehicle route.
+    """
+    for result in algorithm_results:
+        for vehicle, (route, _, _) in enumerate(_result_routes(result)):
+            path = np.asarray(route, dtype=np.intp)
+            if len(path) < 2:
+                continue
+            origins, destinations = path[:-1], path[1:]
+            rows, columns = np.minimum(origins, destinations), np.maximum(origins, destinations)
+            distances = distance_matrix[rows, columns]
+            durations = duration_matrix[rows, columns]
+            cumulative_distances = np.cumsum(distances)
+            cumulative_durations = np.cumsum(durations)
+            
+            for start in range(0, len(distances), chunk_size):
+                stop = min(start + chunk_size, len(distances))
+                yield {
+                    'algorithm': [str(result['algorithm'])] * (stop - start),
+                    'vehicle': np.full(stop - start, vehicle, dtype=np.int32),
+                    'leg': np.arange(start, stop, dtype=np.int32),
+                    'from_node': origins[start:stop].astype(np.int32),
+                    'to_node': destinations[start:stop].astype(np.int32),
+                    'distance': distances[start:stop],
+                    'duration': durations[start:stop],
+                    'cumulative_distance': cumulative_distances[start:stop],
+                    'cumulative_duration': cumulative_durations[start:stop]
+                }
+
+
+def _matrix_chunks(distance_matrix, duration_matrix, chunk_size):
+    """Matrix rows, about chunk_size cells per chunk so memory stays bounded for any n."""
+    n = len(distance_matrix)
+    rows_per_chunk = max(1, chunk_size // max(n, 1))
+    for start in range(0, n, rows_per_chunk):
+        stop = min(start + rows_per_chunk, n)
+        yield {
+            'origin': np.arange(start, stop, dtype=np.int32),
+            'distance': distance_matrix[start:stop].tolist(),
+            'duration': duration_matrix[start:stop].tolist()
+        }
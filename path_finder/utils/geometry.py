@@ -0,0 +1,95 @@
+import math
+
+import numpy as np
+
+# Web map tiles are 256 pixels wide and cover 360 degrees of longitude at zoom 0
+TILE_SIZE = 256
+
+
+def fit_zoom(bounds, width=800, height=500, max_zoom=18):
+    """
+    Largest web-map zoom level at which the bounds fit in a viewport of the given size (pixels).
+    
+    Args:
+        bounds: [[south, west], [north, east]] in degrees
+    """
+    (south, west), (north, east) = bounds
+    latitude = math.radians((south + north) / 2)
+    # Spans in longitude degrees; a latitude degree is 1 / cos(latitude) times longer on the map
+    spans = (max(east - west, 1e-9) / width, max(north - south, 1e-9) / math.cos(latitude) / height)
+    zoom = math.floor(math.log2(360 / (TILE_SIZE * max(spans))))
+    return int(min(max(zoom, 0), max_zoom))
+
+
+def pixel_tolerance(zoom, latitude, pixels=1.0):
+    """Simplification tolerance (in degrees of latitude) equal to the given number of pixels at a zoom level."""
+    return pixels * 360 * math.cos(math.radians(latitude)) / (TILE_SIZE * 2 ** zoom)
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm.
+    
+    Every point of the original line lies within tolerance of the simplified
+    line, whose points are a subset of the original ones (first and last
+    always kept). Iterative, with the distances of each segment computed in
+    one NumPy expression, so long lines neither recurse deeply nor loop per point.
+    
+    Args:
+        points: (n, 2) array-like of planar coordinates
+        tolerance: Maximum distance, in the units of the coordinates
+    
+    Returns:
+        Boolean mask of the points to keep
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if tolerance <= 0:
+        keep[:] = True
+        return keep
+    
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        
+        # Distance to the segment, not the infinite line: a point beyond either
+        # end (a route doubling back) is measured to that end
+        segment = points[last] - points[first]
+        inner = points[first + 1:last] - points[first]
+        squared = segment @ segment
+        if squared == 0:
+            offsets = inner
+        else:
+            along = np.clip(inner @ segment / squared, 0.0, 1.0)
+            offsets = inner - along[:, None] * segment
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    
+    return keep
+
+
+def simplify_latlng(coords, tolerance):
+    """
+    Douglas-Peucker on [lat, lng] coordinates, with tolerance in degrees of latitude.
+    
+    Longitudes are scaled by the cosine of the mean latitude first, so the
+    tolerance means the same ground distance in every direction.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    if len(coords) < 3:
+        return coords
+    scale = math.cos(math.radians(coords[:, 0].mean()))
+    planar = np.column_stack([coords[:, 1] * scale, coords[:, 0]])
+    return coords[douglas_peucker(planar, tolerance)]
@@ -16,7 +16,9 @@ class GraphBuilder:
         
         self.distance_matrix = distance_matrix
         self.duration_matrix = duration_matrix
+        self.weight_type = 'distance'
         self.graph = None
+        self._matrix_cache = {}
     
     def build_complete_graph(self, weight_type='distance'):
         """
@@ -58,9 +60,45 @@ class GraphBuilder:
                           distance=self.distance_matrix[i, j], 
                           duration=self.duration_matrix[i, j])
         
+        self.weight_type = weight_type
+        self._matrix_cache = {}
         self.graph = G
         return G
     
+    def get_weight_matrix(self, attribute='weight'):
+        """
+        Get an edge attribute of the complete graph as a dense NumPy matrix.
+        
+        The values mirror what build_complete_graph stores on the edges: the
+        upper triangle of the source matrix is used for both directions, so
+        matrix[i, j] == graph[i][j][attribute]. The graph itself does not need
+        to be built, which lets the array-based solvers skip networkx entirely.
+        
+        Parameters:
+            attribute (str): 'weight', 'distance' or 'duration'
+        
+        Returns:
+            numpy.ndarray: (n, n) float64 matrix with a zero diagonal
+        """
+        if attribute == 'weight':
+            attribute = self.weight_type
+        
+        if attribute not in self._matrix_cache:
+            if attribute == 'distance':
+                source = self.distance_matrix
+            elif attribute == 'duration':
+                source = self.duration_matrix
+            else:
+                raise ValueError("attribute must be 'weight', 'distance' or 'duration'")
+            
+            if source is None:
+                raise ValueError(f"The {attribute} matrix must be set before requesting it")
+            
+            upper = np.triu(np.asarray(source, dtype=np.float64), k=1)
+            self._matrix_cache[attribute] = upper + upper.T
+        
+        return self._matrix_cache[attribute]
+    
     def get_node_positions(self):
         """Get node positions for visualization."""
         if self.graph is None:
@@ -0,0 +1,168 @@
+import cProfile
+import functools
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class Instrumentation:
+    def __init__(self, trace_memory=False, profile_dir=None):
+        """
+        Collect a per-run breakdown of where a solver spends its time.
+        
+        Solvers call start() when a run begins and stop() when it ends, time
+        their phases with `with instrumentation.phase('name'):` and record
+        counters (evaluations, expanded nodes, episodes, table sizes) with
+        count() and gauge(). Phases are timed with time.perf_counter and may
+        nest, so a phase can be part of an enclosing one. Nested runs (a
+        solver calling another solver method) count towards the outer run.
+        
+        Args:
+            trace_memory: Record the peak traced memory of the run with
+                tracemalloc (slows allocation-heavy Python code)
+            profile_dir: If set, run cProfile and dump the stats of every run
+                to a .prof file in this directory
+        """
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.phases = {}
+        self.counters = {}
+        self.peak_memory_mib = None
+        self.profile_path = None
+        self._depth = 0
+        self._profiler = None
+        self._started_tracing = False
+    
+    def start(self):
+        """Begin a run; resets the previous run's data unless this run is nested."""
+        self._depth += 1
+        if self._depth > 1:
+            return
+        
+        self.phases = {}
+        self.counters = {}
+        self.peak_memory_mib = None
+        self.profile_path = None
+        
+        if self.trace_memory:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        
+        if self.profile_dir:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+    
+    def stop(self, label='run'):
+        """
+        End a run and return its report.
+        
+        Args:
+            label: Used in the name of the cProfile dump (e.g. the algorithm name)
+        """
+        if self._depth == 0:
+            return self.report()
+        self._depth -= 1
+        if self._depth > 0:
+            return self.report()
+        
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            slug = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_').lower() or 'run'
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            self.profile_path = os.path.join(self.profile_dir, f"{slug}_{timestamp}.prof")
+            self._profiler.dump_stats(self.profile_path)
+            self._profiler = None
+        
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory_mib = tracemalloc.get_traced_memory()[1] / 2**20
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        
+        return self.report()
+    
+    def abandon(self, depth=0):
+        """
+        Close the runs started since the given nesting depth without reporting
+        them, e.g. after the solver raised between start() and stop().
+        """
+        if self._depth <= depth:
+            return
+        self._depth = depth
+        if depth > 0:
+            return
+        
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+    
+    @contextmanager
+    def phase(self, name):
+        """Time a block of code and add it to the named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+    
+    def add_time(self, name, seconds):
+        """Add time measured by the caller to the named phase (for hot loops)."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+    
+    def count(self, name, amount=1):
+        """Increase a counter."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def gauge(self, name, value):
+        """Set a counter to a value (e.g. the final Q-table size)."""
+        self.counters[name] = value
+    
+    def report(self):
+        """Phases (seconds), counters, peak memory (MiB or None) and cProfile dump path (or None)."""
+        return {
+            'phases': dict(self.phases),
+            'counters': dict(self.counters),
+            'peak_memory_mib': self.peak_memory_mib,
+            'profile_path': self.profile_path
+        }
+
+
+def guarded(method):
+    """
+    Decorator for solver methods that call self.instrumentation.start() and stop().
+    
+    If the method raises in between, the runs it started are abandoned, so a
+    shared Instrumentation is not left nested (which would turn every later
+    run into a nested one whose report is never produced).
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        instrumentation = self.instrumentation
+        depth = instrumentation._depth
+        try:
+            return method(self, *args, **kwargs)
+        except BaseException:
+            instrumentation.abandon(depth)
+            raise
+    return wrapper
+
+
+def flatten_report(report):
+    """
+    Flatten a report to numeric columns: time_<phase> (s), one column per
+    counter and peak_memory_mib when it was measured.
+    """
+    flat = {f"time_{name}": seconds for name, seconds in report.get('phases', {}).items()}
+    flat.update(report.get('counters', {}))
+    if report.get('peak_memory_mib') is not None:
+        flat['peak_memory_mib'] = report['peak_memory_mib']
+    return flat
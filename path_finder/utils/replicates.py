@@ -0,0 +1,171 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.utils.comparison import AlgorithmComparison
+except ImportError:
+    from utils.graph import GraphBuilder
+    from utils.comparison import AlgorithmComparison
+
+
+# Instance shared by the replicate workers, set once per process by _init_worker
+_INSTANCE = None
+
+
+def _init_worker(locations_df, distance_matrix, duration_matrix):
+    global _INSTANCE
+    _INSTANCE = (locations_df, distance_matrix, duration_matrix)
+
+
+def _run_replicate(name, solver, params, seed):
+    """Run one solver once with the given seed on the worker's instance."""
+    random.seed(seed)
+    np.random.seed(seed)
+    graph_builder = GraphBuilder(*_INSTANCE)
+    result, progress = solver(graph_builder, **params)
+    return name, seed, result, _trace(result, progress)
+
+
+def _trace(result, progress):
+    """
+    Best distance found so far over the run, as (times, distances) arrays.
+    
+    The GA reports the best of every generation and simulated annealing the
+    best of every epoch, with timestamps; solvers without an anytime history
+    contribute a single point at their end.
+    """
+    history = progress.get('history') or progress.get('anneal_history')
+    if history and history.get('time'):
+        times = np.asarray(history['time'], dtype=float)
+        distances = np.minimum.accumulate(np.asarray(history['best'], dtype=float))
+        # The returned route (hall of fame) can beat the last population minimum
+        distances[-1] = min(distances[-1], result['distance'])
+        return times, distances
+    return np.array([result['computation_time']]), np.array([float(result['distance'])])
+
+
+def _independent(params):
+    """Job parameters with Q-table warm starts disabled, also for the per-cluster route solver."""
+    params = dict(params)
+    if params.get('warm_start'):
+        params['warm_start'] = False
+    if (params.get('route_params') or {}).get('warm_start'):
+        params['route_params'] = dict(params['route_params'], warm_start=False)
+    return params
+
+
+def run_replicates(locations_df, distance_matrix, duration_matrix, jobs, replicates=10, base_seed=0,
+                   max_workers=None, progress=None):
+    """
+    Run every job several times with controlled seeds in a process pool.
+    
+    Replicate r of every solver uses seed base_seed + r, so all solvers see the
+    same seeds (common random numbers) and a rerun reproduces the study. The
+    matrices are sent to each worker process once, not once per run.
+    
+    Q-learning warm starts are switched off: every replicate would otherwise
+    load and overwrite the same QTableStore file, so runs would race on it and
+    stop being independent of each other.
+    
+    Args:
+        jobs: {name: (solver function, params dict)} as for ConcurrentRunner.run()
+        replicates: Runs per solver
+        max_workers: Worker processes (default: os.cpu_count()); 1 runs in this process
+        progress: Optional callable receiving (finished runs, total runs)
+    
+    Returns:
+        (AlgorithmComparison with one row per run, with its seed,
+         list of traces: dicts with algorithm, seed, times and distances)
+    """
+    tasks = [(name, solver, _independent(params), base_seed + r) for name, (solver, params) in jobs.items()
+             for r in range(replicates)]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    outcomes = []
+    
+    if max_workers <= 1:
+        _init_worker(locations_df, distance_matrix, duration_matrix)
+        for task in tasks:
+            outcomes.append(_run_replicate(*task))
+            if progress is not None:
+                progress(len(outcomes), len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(locations_df, distance_matrix, duration_matrix)) as executor:
+            futures = [executor.submit(_run_replicate, *task) for task in tasks]
+            for future in as_completed(futures):
+                outcomes.append(future.result())
+                if progress is not None:
+                    progress(len(outcomes), len(tasks))
+    
+    # Completion order varies between runs; store in (job, seed) order
+    order = {name: index for index, name in enumerate(jobs)}
+    outcomes.sort(key=lambda outcome: (order[outcome[0]], outcome[1]))
+    
+    comparison = AlgorithmComparison()
+    traces = []
+    for name, seed, result, (times, distances) in outcomes:
+        comparison.add_results([result], seed=seed)
+        traces.append({'algorithm': result['algorithm'], 'seed': seed, 'times': times, 'distances': distances})
+    
+    return comparison, traces
+
+
+def representative_runs(comparison):
+    """Index of the median-distance run of every algorithm (to show one route per solver)."""
+    frame = comparison.to_frame()
+    indices = []
+    for _, group in frame.groupby('algorithm', observed=True, sort=False):
+        ranked = group['distance'].sort_values(kind='stable')
+        indices.append(int(ranked.index[(len(ranked) - 1) // 2]))
+    return sorted(indices)
+
+
+def default_target(traces, tolerance=0.05):
+    """Target distance: the best distance of any run, plus a relative tolerance."""
+    return min(trace['distances'].min() for trace in traces) * (1 + tolerance)
+
+
+def time_to_target(traces, target):
+    """
+    Time each run needed to reach the target distance.
+    
+    Returns:
+        {algorithm: sorted array of seconds, np.inf for runs that never reached it}
+    """
+    times = {}
+    for trace in traces:
+        reached = np.flatnonzero(trace['distances'] <= target)
+        times.setdefault(trace['algorithm'], []).append(trace['times'][reached[0]] if len(reached) else np.inf)
+    return {algorithm: np.sort(values) for algorithm, values in times.items()}
+
+
+def plot_time_to_target(ttt, target, figsize=(10, 6)):
+    """
+    Time-to-target plot: for every algorithm, the share of runs that reached
+    the target within a given time (empirical distribution function).
+    """
+    fig, ax = plt.subplots(figsize=figsize)
+    
+    for algorithm, times in ttt.items():
+        reached = times[np.isfinite(times)]
+        if not len(reached):
+            ax.plot([], [], label=f"{algorithm} (0/{len(times)} reached)")
+            continue
+        probability = np.arange(1, len(reached) + 1) / len(times)
+        ax.step(np.concatenate([[0], reached]), np.concatenate([[0], probability]), where='post',
+                label=f"{algorithm} ({len(reached)}/{len(times)} reached)")
+    
+    ax.set_title(f'Time to Target ({target:.0f} m)')
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Share of runs at or below target')
+    ax.set_ylim(0, 1.05)
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    
+    return fig
@@ -0,0 +1,245 @@
+import gc
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+try:
+    from path_finder.utils.graph import GraphBuilder
+    from path_finder.utils.instrumentation import Instrumentation
+    from path_finder.algorithms.genetic_algorithm import GeneticAlgorithm
+    from path_finder.algorithms.a_star import AStar
+    from path_finder.algorithms.q_learning import QLearning, QTableStore
+    from path_finder.algorithms.linear_q_learning import LinearQLearning
+    from path_finder.algorithms.held_karp import HeldKarp
+    from path_finder.algorithms.cluster_first import ClusterFirstPlanner
+    from path_finder.algorithms.local_search import LocalSearch
+    from path_finder.algorithms.simulated_annealing import SimulatedAnnealing
+except ImportError:
+    from utils.graph import GraphBuilder
+    from utils.instrumentation import Instrumentation
+    from algorithms.genetic_algorithm import GeneticAlgorithm
+    from algorithms.a_star import AStar
+    from algorithms.q_learning import QLearning, QTableStore
+    from algorithms.linear_q_learning import LinearQLearning
+    from algorithms.held_karp import HeldKarp
+    from algorithms.cluster_first import ClusterFirstPlanner
+    from algorithms.local_search import LocalSearch
+    from algorithms.simulated_annealing import SimulatedAnnealing
+
+
+# Solver functions. Each takes a GraphBuilder plus keyword parameters and
+# returns (result dict, progress dict). The progress dict carries what the
+# dashboard plots (GA history, Q-learning rewards), since the solver objects
+# themselves stay in the worker process. The optional instrument argument is
+# a dict of Instrumentation options, e.g. {'trace_memory': True, 'profile_dir': 'profiles'}.
+
+def _instrumentation(instrument):
+    return Instrumentation(**instrument) if instrument else None
+
+
+def solve_genetic(graph_builder, instrument=None, **params):
+    if graph_builder.graph is None:
+        graph_builder.build_complete_graph()
+    ga = GeneticAlgorithm(graph_builder, instrumentation=_instrumentation(instrument), **params)
+    return ga.optimize(), {'history': ga.history}
+
+
+def solve_astar(graph_builder, instrument=None, **params):
+    return AStar(graph_builder, instrumentation=_instrumentation(instrument)).find_optimal_path(**params), {}
+
+
+def solve_qlearning(graph_builder, linear=False, warm_start=False, instrument=None, **params):
+    if linear:
+        ql = LinearQLearning(graph_builder, instrumentation=_instrumentation(instrument), **params)
+        return ql.optimize(), {'reward_history': ql.reward_history, 'linear': True}
+    
+    ql = QLearning(graph_builder, instrumentation=_instrumentation(instrument), **params)
+    store = QTableStore() if warm_start else None
+    warm_states = store.warm_start(ql) if store is not None else 0
+    result = ql.optimize()
+    if store is not None:
+        store.save(ql)
+    return result, {'reward_history': ql.reward_history, 'linear': False, 'warm_start_states': warm_states}
+
+
+def solve_heldkarp(graph_builder, instrument=None, **params):
+    return HeldKarp(graph_builder, instrumentation=_instrumentation(instrument), **params).optimize(), {}
+
+
+def solve_local_search(graph_builder, instrument=None, **params):
+    return LocalSearch(graph_builder, instrumentation=_instrumentation(instrument), **params).optimize(), {}
+
+
+def solve_simulated_annealing(graph_builder, instrument=None, **params):
+    sa = SimulatedAnnealing(graph_builder, instrumentation=_instrumentation(instrument), **params)
+    return sa.optimize(), {'anneal_history': sa.history}
+
+
+def solve_multi_vehicle(graph_builder, num_vehicles, route_solver='astar', route_params=None, instrument=None,
+                        **params):
+    """
+    Plan num_vehicles routes with ClusterFirstPlanner.
+    
+    route_solver names the solver used inside each cluster: 'astar', 'genetic',
+    'qlearning' or 'localsearch', with route_params as its keyword parameters.
+    """
+    route_solvers = {'astar': solve_astar, 'genetic': solve_genetic, 'qlearning': solve_qlearning,
+                     'localsearch': solve_local_search}
+    planner = ClusterFirstPlanner(graph_builder, num_vehicles,
+                                  route_solver=(route_solvers[route_solver], route_params or {}),
+                                  instrumentation=_instrumentation(instrument), **params)
+    return planner.optimize(), {}
+
+
+def _worker(name, solver, params, locations_df, shm_name, shape, results):
+    """Process entry point: attach to the shared matrices, run one solver, report back."""
+    start = time.perf_counter()
+    shm = None
+    matrices = graph_builder = None
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        matrices = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        matrices.flags.writeable = False
+        
+        graph_builder = GraphBuilder(locations_df, matrices[0], matrices[1])
+        result, progress = solver(graph_builder, **params)
+        results.put((name, 'done', result, progress, None, time.perf_counter() - start))
+    except Exception as e:
+        results.put((name, 'error', None, {}, f"{e}\n{traceback.format_exc()}", time.perf_counter() - start))
+    finally:
+        # Views of the buffer must be gone before close(), which raises BufferError
+        # otherwise; a failed solver can still hold some in reference cycles
+        matrices = graph_builder = None
+        if shm is not None:
+            try:
+                shm.close()
+            except BufferError:
+                gc.collect()
+                shm.close()
+
+
+class ConcurrentRunner:
+    def __init__(self, locations_df, distance_matrix, duration_matrix, max_workers=None, start_method=None):
+        """
+        Run several solvers at once, each in its own process.
+        
+        The distance and duration matrices are copied once into a shared memory
+        block that every worker maps read-only, instead of being pickled per
+        solver. Each solver has its own time limit; a solver that exceeds it is
+        terminated. Results are yielded as soon as each solver finishes, so
+        the total wait is that of the slowest solver, not the sum of all.
+        
+        Args:
+            max_workers: Maximum number of solvers running at the same time
+                (default: all of them)
+            start_method: multiprocessing start method (default: the
+                platform default)
+        """
+        self.locations_df = locations_df
+        self.distance_matrix = np.asarray(distance_matrix, dtype=np.float64)
+        self.duration_matrix = np.asarray(duration_matrix, dtype=np.float64)
+        self.max_workers = max_workers
+        self.context = mp.get_context(start_method)
+        self._processes = {}
+    
+    def cancel(self, name=None):
+        """Terminate one running solver, or all of them if name is None."""
+        names = list(self._processes) if name is None else [name]
+        for job_name in names:
+            process = self._processes.pop(job_name, None)
+            if process is not None and process.is_alive():
+                process.terminate()
+                process.join()
+    
+    def run(self, jobs, time_limits=None, default_time_limit=None, poll_interval=0.1):
+        """
+        Run jobs concurrently and yield each outcome as soon as it is known.
+        
+        Args:
+            jobs: {name: (solver function, params dict)}; solver functions must
+                be module-level (e.g. solve_genetic) so they can be sent to a process
+            time_limits: Optional {name: seconds}
+            default_time_limit: Limit for jobs not in time_limits (None = no limit)
+        
+        Yields:
+            Dictionaries with name, status ('done', 'error' or 'timeout'),
+            result, progress, error and elapsed (seconds)
+        """
+        time_limits = time_limits or {}
+        max_workers = self.max_workers or max(1, len(jobs))
+        
+        shape = (2,) + self.distance_matrix.shape
+        shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+        results = self.context.Queue()
+        pending = list(jobs)
+        started = {}
+        deadlines = {}
+        
+        try:
+            matrices = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            matrices[0] = self.distance_matrix
+            matrices[1] = self.duration_matrix
+            del matrices
+            
+            while pending or self._processes:
+                # Start jobs while there are free slots
+                while pending and len(self._processes) < max_workers:
+                    name = pending.pop(0)
+                    solver, params = jobs[name]
+                    process = self.context.Process(
+                        target=_worker,
+                        args=(name, solver, params, self.locations_df, shm.name, shape, results),
+                        daemon=True
+                    )
+                    process.start()
+                    self._processes[name] = process
+                    started[name] = time.perf_counter()
+                    limit = time_limits.get(name, default_time_limit)
+                    deadlines[name] = None if limit is None else started[name] + limit
+                
+                try:
+                    name, status, result, progress, error, elapsed = results.get(timeout=poll_interval)
+                except queue.Empty:
+                    pass
+                else:
+                    process = self._processes.pop(name, None)
+                    if process is not None:
+                        process.join()
+                        yield {'name': name, 'status': status, 'result': result, 'progress': progress,
+                               'error': error, 'elapsed': elapsed}
+                
+                now = time.perf_counter()
+                for name, process in list(self._processes.items()):
+                    if deadlines[name] is not None and now >= deadlines[name]:
+                        self.cancel(name)
+                        yield {'name': name, 'status': 'timeout', 'result': None, 'progress': {},
+                               'error': None, 'elapsed': now - started[name]}
+                    elif not process.is_alive() and process.exitcode != 0:
+                        # Crashed (e.g. killed for memory) without reporting
+                        self._processes.pop(name)
+                        yield {'name': name, 'status': 'error', 'result': None, 'progress': {},
+                               'error': f"Solver process exited with code {process.exitcode}",
+                               'elapsed': now - started[name]}
+        finally:
+            # Also reached when the caller stops iterating (e.g. a Streamlit rerun)
+            self.cancel()
+            results.close()
+            shm.close()
+            shm.unlink()
+    
+    def run_serial(self, jobs):
+        """Run jobs one after another in this process, yielding the same dictionaries as run()."""
+        graph_builder = GraphBuilder(self.locations_df, self.distance_matrix, self.duration_matrix)
+        for name, (solver, params) in jobs.items():
+            start = time.perf_counter()
+            try:
+                result, progress = solver(graph_builder, **params)
+                yield {'name': name, 'status': 'done', 'result': result, 'progress': progress,
+                       'error': None, 'elapsed': time.perf_counter() - start}
+            except Exception as e:
+                yield {'name': name, 'status': 'error', 'result': None, 'progress': {},
+                       'error': f"{e}\n{traceback.format_exc()}", 'elapsed': time.perf_counter() - start}
@@ -0,0 +1,159 @@
+import json
+from datetime import datetime
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+# Version of the snapshot layout written by save_snapshot(). Bump it when the
+# layout changes and teach Snapshot to read the older versions.
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FORMAT = 'path_finder.snapshot'
+
+
+def save_snapshot(filepath, locations_df, distance_matrix, duration_matrix, algorithm_results=(),
+                  histories=None, metadata=None):
+    """
+    Save a whole plan to one compressed .npz file.
+
+    The file holds a JSON manifest (version, locations, result summaries,
+    metadata) plus one array entry per matrix, route and history, so a
+    Snapshot can read the manifest without decompressing the large arrays.
+    Matrices are stored in the smallest dtype that restores them exactly
+    (Google returns whole meters and seconds, which fit in int32).
+
+    Args:
+        algorithm_results: Result dictionaries as returned by the solvers
+        histories: Optional {name: {key: list of numbers}}, e.g.
+            {'genetic': ga.history, 'qlearning': {'reward_history': [...]}}
+        metadata: Optional JSON-serializable dictionary (e.g. the parameters used)
+    """
+    arrays = {
+        'distances': _compact(np.asarray(distance_matrix, dtype=np.float64)),
+        'durations': _compact(np.asarray(duration_matrix, dtype=np.float64))
+    }
+
+    results = []
+    for index, result in enumerate(algorithm_results):
+        arrays[f'path__{index}'] = np.asarray(result['path'], dtype=np.int32)
+        results.append({key: value for key, value in result.items() if key != 'path'})
+
+    history_keys = {}
+    for name, history in (histories or {}).items():
+        history_keys[name] = []
+        for key, values in history.items():
+            arrays[f'history__{name}__{key}'] = np.asarray(values, dtype=np.float64)
+            history_keys[name].append(key)
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'num_locations': len(locations_df),
+        'locations': locations_df.to_json(orient='split', index=False, double_precision=15),
+        'results': results,
+        'histories': history_keys,
+        'metadata': metadata or {}
+    }
+    manifest_bytes = json.dumps(manifest, default=_json_default).encode('utf-8')
+
+    np.savez_compressed(filepath, manifest=np.frombuffer(manifest_bytes, dtype=np.uint8), **arrays)
+
+
+def load_snapshot(filepath):
+    """Open a snapshot written by save_snapshot() (a path or a binary file object)."""
+    return Snapshot(filepath)
+
+
+class Snapshot:
+    def __init__(self, filepath):
+        """
+        Read access to a saved plan.
+
+        Only the manifest is read when the snapshot is opened; the matrices,
+        routes and histories are decompressed the first time they are used.
+        Keep the snapshot open (or use it as a context manager) until
+        everything needed has been read.
+        """
+        self._npz = np.load(filepath, allow_pickle=False)
+        manifest = json.loads(self._npz['manifest'].tobytes().decode('utf-8'))
+
+        if manifest.get('format') != SNAPSHOT_FORMAT:
+            self.close()
+            raise ValueError("Not a Path Finder snapshot")
+        if manifest['version'] > SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"Snapshot version {manifest['version']} is newer than this "
+                             f"Path Finder (reads up to {SNAPSHOT_VERSION})")
+
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.created = manifest['created']
+        self.metadata = manifest['metadata']
+        self.num_locations = manifest['num_locations']
+        self._cache = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._npz.close()
+
+    def _array(self, name):
+        if name not in self._cache:
+            self._cache[name] = self._npz[name]
+        return self._cache[name]
+
+    @property
+    def locations_df(self):
+        if 'locations' not in self._cache:
+            self._cache['locations'] = pd.read_json(StringIO(self.manifest['locations']), orient='split')
+        return self._cache['locations']
+
+    @property
+    def addresses(self):
+        return self.locations_df['address'].tolist() if 'address' in self.locations_df else []
+
+    @property
+    def distances(self):
+        """Distance matrix as float64 (decompressed on first access)."""
+        return self._array('distances').astype(np.float64)
+
+    @property
+    def durations(self):
+        """Duration matrix as float64 (decompressed on first access)."""
+        return self._array('durations').astype(np.float64)
+
+    @property
+    def results(self):
+        """Result dictionaries with their paths, in the order they were saved."""
+        return [dict(result, path=self._array(f'path__{index}').tolist())
+                for index, result in enumerate(self.manifest['results'])]
+
+    @property
+    def histories(self):
+        """{name: {key: list of numbers}} as passed to save_snapshot()."""
+        return {name: {key: self._array(f'history__{name}__{key}').tolist() for key in keys}
+                for name, keys in self.manifest['histories'].items()}
+
+
+def _compact(matrix):
+    """The smallest of int32, float32 and float64 that holds the matrix exactly."""
+    if np.all(np.isfinite(matrix)) and np.all(np.abs(matrix) < 2**31) and np.array_equal(matrix, np.round(matrix)):
+        return matrix.astype(np.int32)
+    single = matrix.astype(np.float32)
+    if np.array_equal(single, matrix, equal_nan=True):
+        return single
+    return matrix
+
+
+def _json_default(value):
+    """Make NumPy values in result dictionaries JSON-serializable."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,361 @@
+import numpy as np
+import pandas as pd
+
+# Optional columns of a locations DataFrame (or uploaded CSV) that define
+# time windows: clock times ("09:30") or seconds since midnight; service
+# time in seconds. A missing or empty value leaves that side unconstrained.
+WINDOW_COLUMNS = ('window_start', 'window_end', 'service_time')
+
+
+def has_time_windows(locations_df):
+    """True if the DataFrame has at least one time window column with a value."""
+    columns = [column for column in WINDOW_COLUMNS[:2] if column in locations_df]
+    return bool(columns) and bool(locations_df[columns].notna().any().any())
+
+
+def _seconds(values, default):
+    """Clock times, timedelta strings or numbers (seconds) as float seconds."""
+    seconds = []
+    for value in values:
+        if value is None or (isinstance(value, float) and np.isnan(value)) or value == '':
+            seconds.append(default)
+        elif isinstance(value, str):
+            text = value.strip()
+            if text.count(':') == 1:
+                text += ':00'
+            seconds.append(pd.to_timedelta(text).total_seconds())
+        else:
+            seconds.append(float(value))
+    return seconds
+
+
+class TimeWindows:
+    def __init__(self, earliest, latest, service_times=None, start_time=0.0):
+        """
+        Delivery time windows for every location, in seconds.
+        
+        Service at a stop may begin at the earliest time of its window
+        (arriving earlier means waiting) and should begin by the latest. A
+        late arrival is measured as time warp: the vehicle is assumed to go
+        back in time to the latest allowed start, and the total time warp
+        of a route is how late it runs overall (0 for a feasible route).
+        Penalizing time warp instead of lateness keeps one late stop from
+        also counting against every stop after it.
+        
+        Routes are checked per move by concatenating segment summaries
+        (Vidal et al.): a sequence of stops is summarized by its duration,
+        time warp, and the earliest and latest time it can be started, and
+        two summaries combine into the summary of the joined sequence without
+        looking at the stops inside. RouteTimes keeps the summaries of a
+        route's ranges in a segment tree, forward and reversed, so any
+        insertion, removal, segment move or 2-opt reversal is scored in
+        O(log n) and updated after a move in O(stops moved + log n).
+        
+        Args:
+            earliest, latest: Window of every location (-inf/inf for none)
+            service_times: Time spent at every location (default: 0)
+            start_time: Time the vehicle can leave the first stop at the earliest
+        """
+        n = len(earliest)
+        self.earliest = np.maximum(np.asarray(earliest, dtype=np.float64), start_time)
+        self.latest = np.asarray(latest, dtype=np.float64)
+        self.service_times = (np.zeros(n) if service_times is None
+                              else np.asarray(service_times, dtype=np.float64))
+        self.start_time = start_time
+        if np.any(self.earliest > self.latest):
+            raise ValueError("Every time window must end after it starts (and after the start time)")
+        
+        # Python lists make the per-stop loops below several times faster than NumPy scalars
+        self._earliest = self.earliest.tolist()
+        self._latest = self.latest.tolist()
+        self._service = self.service_times.tolist()
+    
+    @classmethod
+    def from_dataframe(cls, locations_df, start_time=0.0):
+        """Time windows from the WINDOW_COLUMNS of a locations DataFrame."""
+        n = len(locations_df)
+        
+        def column(name, default):
+            if name not in locations_df:
+                return [default] * n
+            return _seconds(locations_df[name].tolist(), default)
+        
+        return cls(column('window_start', -np.inf), column('window_end', np.inf),
+                   column('service_time', 0.0), start_time)
+    
+    def __len__(self):
+        return len(self.earliest)
+    
+    def node(self, node):
+        """Segment summary of a single stop."""
+        return (self._service[node], 0.0, self._earliest[node], self._latest[node], node, node)
+    
+    def time_warp(self, path, durations):
+        """
+        Total time warp of a path (0 if every window is met), by simulating it once.
+        
+        Args:
+            durations: (n, n) travel times, as a NumPy matrix or (faster) a list of lists
+        """
+        earliest, latest, service = self._earliest, self._latest, self._service
+        first = path[0]
+        begin = earliest[first]
+        warp = 0.0
+        previous = first
+        for node in path[1:]:
+            arrival = begin + service[previous] + durations[previous][node]
+            begin = arrival if arrival > earliest[node] else earliest[node]
+            if begin > latest[node]:
+                warp += begin - latest[node]
+                begin = latest[node]
+            previous = node
+        return warp
+    
+    def schedule(self, path, durations):
+        """
+        Arrival, service start, waiting and time warp at every stop of a path.
+        
+        Returns:
+            DataFrame with node, arrival, begin, wait, warp and the window
+        """
+        rows = []
+        begin = self._earliest[path[0]]
+        arrival = begin
+        for position, node in enumerate(path):
+            if position:
+                previous = path[position - 1]
+                arrival = begin + self._service[previous] + durations[previous][node]
+                begin = max(arrival, self._earliest[node])
+            warp = max(0.0, begin - self._latest[node])
+            begin -= warp
+            rows.append({'node': node, 'arrival': arrival, 'begin': begin,
+                         'wait': max(0.0, self._earliest[node] - arrival), 'warp': warp,
+                         'window_start': self._earliest[node], 'window_end': self._latest[node]})
+        return pd.DataFrame(rows)
+    
+    def route(self, path, durations):
+        """Segment summaries of a path for O(log n) move evaluation."""
+        return RouteTimes(self, path, durations)
+
+
+def join(durations, first, second):
+    """
+    Summary of the sequence `first` followed by `second`.
+    
+    Summaries are tuples (duration, time warp, earliest start, latest start,
+    first node, last node). Duration includes service and waiting.
+    """
+    duration1, warp1, earliest1, latest1, head, tail1 = first
+    duration2, warp2, earliest2, latest2, head2, tail = second
+    travel = durations[tail1][head2]
+    delta = duration1 - warp1 + travel
+    # Comparisons instead of max()/min(): this runs for every candidate move
+    wait = earliest2 - delta - latest1
+    if wait < 0.0:
+        wait = 0.0
+    extra_warp = earliest1 + delta - latest2
+    if extra_warp < 0.0:
+        extra_warp = 0.0
+    earliest = earliest2 - delta
+    if earliest < earliest1:
+        earliest = earliest1
+    latest = latest2 - delta
+    if latest > latest1:
+        latest = latest1
+    return (duration1 + duration2 + travel + wait, warp1 + warp2 + extra_warp,
+            earliest - wait, latest + extra_warp, head, tail)
+
+
+def _join_arrays(matrix, first, second):
+    """join() of many pairs at once; summaries as (count, 6) arrays, nodes stored as floats."""
+    heads, tails = second[:, 4].astype(np.intp), first[:, 5].astype(np.intp)
+    travel = matrix[tails, heads]
+    delta = first[:, 0] - first[:, 1] + travel
+    wait = np.maximum(second[:, 2] - delta - first[:, 3], 0.0)
+    extra_warp = np.maximum(first[:, 2] + delta - second[:, 3], 0.0)
+    return np.column_stack([
+        first[:, 0] + second[:, 0] + travel + wait,
+        first[:, 1] + second[:, 1] + extra_warp,
+        np.maximum(second[:, 2] - delta, first[:, 2]) - wait,
+        np.minimum(second[:, 3] - delta, first[:, 3]) + extra_warp,
+        first[:, 4], second[:, 5]])
+
+
+class RouteTimes:
+    # Tree levels with at least this many changed nodes are recomputed with NumPy
+    vectorize_from = 16
+    # Block summaries remembered until the next update
+    max_cached_blocks = 4096
+    
+    def __init__(self, windows, path, durations):
+        """
+        Segment summaries of a path, kept in a segment tree.
+        
+        Every tree node summarizes a contiguous range of the path both forward
+        and reversed, so the summary of any block, prefix or suffix (reversed
+        or not) is joined from O(log n) nodes and the time warp of a route
+        changed by a local move is known without simulating the stops it
+        shifts. Blocks are remembered until the route changes, as the scan
+        of one stop asks for the same prefixes, suffixes and segments with
+        every candidate. After applying a move, update() refreshes only the
+        stops it changed and their ancestors, a whole tree level at a time
+        with NumPy when a long reversal changed many of them.
+        
+        Args:
+            durations: (n, n) travel time matrix
+        """
+        self.windows = windows
+        self.path = list(path)
+        self._matrix = np.asarray(durations, dtype=np.float64)
+        # Nested lists index faster than a matrix in the scalar joins
+        self.durations = self._matrix.tolist() if len(self._matrix) <= 2000 else self._matrix
+        n = len(self.path)
+        
+        # Leaves at size..size + n - 1; node k covers the ranges of 2k and 2k + 1.
+        # Summaries are kept as tuples for the joins of single moves and as rows
+        # of an array (end nodes as floats) for recomputing whole levels.
+        self._size = size = 1 << max(n - 1, 0).bit_length()
+        self._forward = [None] * (2 * size)
+        self._backward = [None] * (2 * size)
+        self._forward_rows = np.zeros((2 * size, 6))
+        self._backward_rows = np.zeros((2 * size, 6))
+        self._set_leaves(0, self.path)
+        self._pull_levels(size >> 1, (size + max(n, 1) - 1) >> 1)
+        self._blocks = {}
+    
+    def _set_leaves(self, low, nodes):
+        start, stop = self._size + low, self._size + low + len(nodes)
+        windows = self.windows
+        indices = np.asarray(nodes, dtype=np.intp)
+        rows = np.column_stack([windows.service_times[indices], np.zeros(len(indices)), windows.earliest[indices],
+                                windows.latest[indices], indices, indices])
+        self._forward_rows[start:stop] = self._backward_rows[start:stop] = rows
+        # Same tuples as windows.node() gives
+        leaves = list(zip(*rows[:, :4].T.tolist(), nodes, nodes))
+        self._forward[start:stop] = self._backward[start:stop] = leaves
+    
+    def _pull(self, k):
+        left, right = 2 * k, 2 * k + 1
+        self._forward[k] = self._forward_rows[k] = self.combine(self._forward[left], self._forward[right])
+        self._backward[k] = self._backward_rows[k] = self.combine(self._backward[right], self._backward[left])
+    
+    def _pull_levels(self, lo, hi):
+        """Recompute nodes lo..hi and their ancestors, level by level."""
+        while lo:
+            # Only the last node of a level can lack a right child (past the path's end)
+            if hi - lo >= self.vectorize_from and self._forward[2 * hi + 1] is None:
+                self._pull(hi)
+                self._pull_range(lo, hi - 1)
+            elif hi - lo >= self.vectorize_from:
+                self._pull_range(lo, hi)
+            else:
+                for k in range(lo, hi + 1):
+                    self._pull(k)
+            lo >>= 1
+            hi >>= 1
+    
+    def _pull_range(self, lo, hi):
+        """_pull() of nodes lo..hi, all with two children, as one NumPy join per direction."""
+        for summaries, rows, forward in ((self._forward, self._forward_rows, True),
+                                         (self._backward, self._backward_rows, False)):
+            left, right = rows[2 * lo:2 * hi + 2:2], rows[2 * lo + 1:2 * hi + 2:2]
+            joined = _join_arrays(self._matrix, left, right) if forward else _join_arrays(self._matrix, right, left)
+            rows[lo:hi + 1] = joined
+            summaries[lo:hi + 1] = zip(*joined[:, :4].T.tolist(), *joined[:, 4:].astype(np.intp).T.tolist())
+    
+    @property
+    def time_warp(self):
+        return self._forward[1][1]
+    
+    @property
+    def duration(self):
+        """Duration of the route, including service and waiting."""
+        return self._forward[1][0]
+    
+    def combine(self, *segments):
+        """Join several summaries left to right; None entries (empty parts) are skipped."""
+        total = None
+        for segment in segments:
+            if segment is None:
+                continue
+            total = segment if total is None else join(self.durations, total, segment)
+        return total
+    
+    def block(self, i, j, reverse=False):
+        """Summary of path[i..j] (inclusive), reversed if reverse, or None if empty; O(log n)."""
+        if i > j:
+            return None
+        key = (i, j, reverse)
+        summary = self._blocks.get(key)
+        if summary is not None:
+            return summary
+        
+        # Fold the nodes covering the range while walking up: the ones met
+        # from the left end go after those already met there, the ones met
+        # from the right end before (the other way round when reversed)
+        durations = self.durations
+        summaries = self._backward if reverse else self._forward
+        lo, hi = i + self._size, j + self._size + 1
+        head = tail = None
+        while lo < hi:
+            if lo & 1:
+                node = summaries[lo]
+                if head is None:
+                    head = node
+                else:
+                    head = join(durations, node, head) if reverse else join(durations, head, node)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                node = summaries[hi]
+                if tail is None:
+                    tail = node
+                else:
+                    tail = join(durations, tail, node) if reverse else join(durations, node, tail)
+            lo >>= 1
+            hi >>= 1
+        summary = self.combine(tail, head) if reverse else self.combine(head, tail)
+        if len(self._blocks) < self.max_cached_blocks:
+            self._blocks[key] = summary
+        return summary
+    
+    def before(self, i):
+        """Summary of path[:i], or None if empty."""
+        return self.block(0, i - 1)
+    
+    def after(self, i):
+        """Summary of path[i:], or None if empty."""
+        return self.block(i, len(self.path) - 1)
+    
+    def update(self, low, nodes):
+        """Replace path[low:low + len(nodes)] by nodes after a move, in O(len(nodes) + log n)."""
+        size = self._size
+        self.path[low:low + len(nodes)] = nodes
+        self._set_leaves(low, nodes)
+        self._pull_levels((size + low) >> 1, (size + low + len(nodes) - 1) >> 1)
+        self._blocks.clear()
+    
+    def insertion_warp(self, position, node):
+        """Time warp of the route with node inserted before path[position] (len(path) appends)."""
+        return self.combine(self.before(position), self.windows.node(node), self.after(position))[1]
+    
+    def removal_warp(self, position):
+        """Time warp of the route without path[position]."""
+        return self.combine(self.before(position), self.after(position + 1))[1]
+    
+    def reversal_warps(self, i):
+        """
+        Time warp after reversing path[i..j], for every j > i, in O(log n) each.
+        
+        The reversed block grows by one stop per step: reverse(path[i..j]) is
+        path[j] followed by reverse(path[i..j - 1]).
+        
+        Yields:
+            (j, time warp)
+        """
+        windows = self.windows
+        head = self.before(i)
+        reversed_block = windows.node(self.path[i])
+        for j in range(i + 1, len(self.path)):
+            reversed_block = join(self.durations, windows.node(self.path[j]), reversed_block)
+            yield j, self.combine(head, reversed_block, self.after(j + 1))[1]